@@ -0,0 +1,80 @@
+"""Metrics over several horizons: one run with checkpoints against one run per horizon.
+
+The shipped multi_world_nasdaqx2 strategy is simulated (GBM, streamed
+metrics) once per horizon of --horizons, then once over the longest
+horizon with the others as horizons_years checkpoints. The table reports
+both times and the largest gap between the two sets of summary statistics.
+
+Usage: python benchmarks/bench_horizons.py [--horizons 5 10 20 30] [--n-paths 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from invest_sim.config import load_cost_model, load_market_model, load_simulation, load_strategy, load_universe
+from invest_sim.config.schemas import SimulationConfig
+from invest_sim.experiments.run import _market_model_from_config
+from invest_sim.metrics import compute_metrics, horizon_summary
+from invest_sim.portfolio import simulate_portfolio
+
+CONFIGS = Path(__file__).resolve().parents[1] / "configs"
+
+
+def _summary(model, market_config, universe, strategy, cost_model, sim_config):
+    fitted = model.fit(universe, market_config, sim_config)
+    portfolio_paths = simulate_portfolio(model.iter_paths(fitted, sim_config), universe, strategy, cost_model, sim_config)
+    return compute_metrics(portfolio_paths, sim_config)[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--horizons", type=int, nargs="+", default=[5, 10, 20, 30])
+    parser.add_argument("--n-paths", type=int, default=2000)
+    args = parser.parse_args()
+
+    base = load_simulation(CONFIGS / "base.yaml").model_dump()
+    base.update(n_paths=args.n_paths)
+    base["output"].update(save_nav_paths=False, save_weights_paths=False, save_turnover_paths=False)
+    universe = load_universe(CONFIGS / "universe.yaml")
+    cost_model = load_cost_model(CONFIGS / "cost_model.yaml")
+    market_config = load_market_model(CONFIGS / "market_models" / "gbm.yaml")
+    strategy = load_strategy(CONFIGS / "strategies" / "multi" / "multi_world_nasdaqx2.yaml")
+    model = _market_model_from_config(market_config)
+    horizons = sorted(args.horizons)
+
+    start = time.perf_counter()
+    separate = pd.concat(
+        {
+            years: _summary(
+                model, market_config, universe, strategy, cost_model, SimulationConfig(**{**base, "n_years": years})
+            )
+            for years in horizons
+        },
+        names=["horizon_years", "statistic"],
+    )
+    separate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sim_config = SimulationConfig(**{**base, "n_years": horizons[-1], "horizons_years": horizons})
+    combined = horizon_summary(_summary(model, market_config, universe, strategy, cost_model, sim_config), sim_config)
+    combined_seconds = time.perf_counter() - start
+
+    gap = np.abs(combined.to_numpy() / separate.to_numpy() - 1.0)
+    table = pd.DataFrame(
+        [
+            {"mode": "one run per horizon", "seconds": separate_seconds, "simulated_years": sum(horizons)},
+            {"mode": "checkpoints", "seconds": combined_seconds, "simulated_years": horizons[-1]},
+        ]
+    ).set_index("mode")
+    with pd.option_context("display.float_format", "{:.2f}".format, "display.width", 120):
+        print(table)
+    print(f"largest relative gap between the summaries: {np.nanmax(gap):.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Convergence of the sobol sampler against plain Monte Carlo on the shipped configs.
+
+For each path count, every shipped strategy is simulated under the GBM and
+Student-t models with several seeds; the spread across seeds of the mean and
+median CAGR estimates is the Monte Carlo error of each sampler. Requires scipy.
+
+Usage: python benchmarks/bench_qmc_convergence.py [--n-paths 256 1024 4096] [--seeds 8] [--n-years 10]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from invest_sim.config import load_cost_model, load_market_model, load_simulation, load_strategy, load_universe
+from invest_sim.config.schemas import SimulationConfig
+from invest_sim.experiments.run import _market_model_from_config
+from invest_sim.metrics import compute_metrics
+from invest_sim.portfolio import simulate_strategies
+
+CONFIGS = Path(__file__).resolve().parents[1] / "configs"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-paths", type=int, nargs="+", default=[256, 1024, 4096])
+    parser.add_argument("--seeds", type=int, default=8)
+    parser.add_argument("--n-years", type=int, default=None)
+    args = parser.parse_args()
+
+    base = load_simulation(CONFIGS / "base.yaml").model_dump()
+    if args.n_years is not None:
+        base["n_years"] = args.n_years
+    base["output"].update(save_nav_paths=False, save_weights_paths=False, save_turnover_paths=False)
+    universe = load_universe(CONFIGS / "universe.yaml")
+    cost_model = load_cost_model(CONFIGS / "cost_model.yaml")
+    strategies = [load_strategy(p) for p in sorted((CONFIGS / "strategies").rglob("*.yaml"))]
+
+    records = []
+    for market_name in ("gbm", "student_t"):
+        market_config = load_market_model(CONFIGS / "market_models" / f"{market_name}.yaml")
+        model = _market_model_from_config(market_config)
+        for n_paths in args.n_paths:
+            for sampler in ("mc", "sobol"):
+                estimates = []
+                start = time.perf_counter()
+                for seed in range(args.seeds):
+                    sim_config = SimulationConfig(**{**base, "n_paths": n_paths, "seed": seed, "sampler": sampler})
+                    fitted = model.fit(universe, market_config, sim_config)
+                    all_paths = simulate_strategies(
+                        model.iter_paths(fitted, sim_config), universe, strategies, cost_model, sim_config
+                    )
+                    for strategy, portfolio_paths in zip(strategies, all_paths):
+                        _, summary = compute_metrics(portfolio_paths, sim_config)
+                        estimates.append(
+                            {
+                                "strategy": strategy.name,
+                                "mean_cagr": summary.loc["mean", "cagr"],
+                                "median_cagr": summary.loc["median", "cagr"],
+                            }
+                        )
+                spread = pd.DataFrame(estimates).groupby("strategy").std()
+                records.append(
+                    {
+                        "market": market_name,
+                        "n_paths": n_paths,
+                        "sampler": sampler,
+                        "sd_mean_cagr_bp": 1e4 * spread["mean_cagr"].mean(),
+                        "sd_median_cagr_bp": 1e4 * spread["median_cagr"].mean(),
+                        "seconds_per_seed": (time.perf_counter() - start) / args.seeds,
+                    }
+                )
+                seconds = records[-1]["seconds_per_seed"]
+                print(f"{market_name:10s} {sampler:5s} n_paths={n_paths:6d}: {seconds:6.1f} s per seed")
+
+    table = pd.DataFrame(records).set_index(["market", "n_paths", "sampler"])
+    with pd.option_context("display.float_format", "{:.2f}".format, "display.width", 120):
+        print()
+        print("Standard deviation across seeds of the CAGR estimates, in basis points (mean over strategies):")
+        print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Racing against a plain comparison of many random candidate strategies.
+
+--n-strategies candidates with random target weights over the shipped
+universe, leveraged ETF and cash included, are compared once on all the paths and once with
+racing. The table reports the time of each, the number of strategy-path
+simulations, and whether the racing survivors contain the plain top-ranked
+strategy and the plain Pareto set.
+
+Usage: python benchmarks/bench_racing.py [--n-strategies 200] [--n-paths 4000] [--n-years 10]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from invest_sim.config import load_cost_model, load_market_model, load_simulation, load_universe
+from invest_sim.config.schemas import SimulationConfig, StrategyConfig
+from invest_sim.experiments.racing import race_strategies
+from invest_sim.experiments.run import _market_model_from_config
+from invest_sim.market.base import concat_market_paths
+from invest_sim.metrics import compute_metrics, pareto_set, select_ranking
+from invest_sim.portfolio import simulate_strategies
+
+CONFIGS = Path(__file__).resolve().parents[1] / "configs"
+
+
+def _candidates(asset_ids, n_strategies, rng):
+    return [
+        StrategyConfig(
+            name=f"candidate_{index:04d}",
+            target_weights={asset_id: float(weight) for asset_id, weight in zip(asset_ids, weights)},
+            constraints={"max_weight": 1.0, "allow_cash": "CASH" in asset_ids},
+            overlays={
+                "vol_targeting": {
+                    "enabled": False,
+                    "target_vol_annual": 0.12,
+                    "lookback_days": 63,
+                    "max_leverage_multiplier": 1.0,
+                    "min_leverage_multiplier": 0.0,
+                }
+            },
+        )
+        for index, weights in enumerate(rng.dirichlet(np.full(len(asset_ids), 0.5), n_strategies))
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-strategies", type=int, default=200)
+    parser.add_argument("--n-paths", type=int, default=4000)
+    parser.add_argument("--n-years", type=int, default=10)
+    args = parser.parse_args()
+
+    base = load_simulation(CONFIGS / "base.yaml").model_dump()
+    base.update(n_paths=args.n_paths, n_years=args.n_years)
+    base["output"].update(save_nav_paths=False, save_weights_paths=False, save_turnover_paths=False)
+    sim_config = SimulationConfig(**{**base, "racing": {"enabled": True}})
+    universe = load_universe(CONFIGS / "universe.yaml")
+    cost_model = load_cost_model(CONFIGS / "cost_model.yaml")
+    market_config = load_market_model(CONFIGS / "market_models" / "gbm.yaml")
+    model = _market_model_from_config(market_config)
+    fitted = model.fit(universe, market_config, sim_config)
+    market_paths = concat_market_paths(model.iter_paths(fitted, sim_config), sim_config.t_steps)
+    asset_ids = market_config.enabled_assets + [asset.id for asset in universe.leveraged_assets or []] + ["CASH"]
+    strategies = _candidates(asset_ids, args.n_strategies, np.random.default_rng(0))
+
+    start = time.perf_counter()
+    all_paths = simulate_strategies(market_paths, universe, strategies, cost_model, sim_config)
+    plain = {s.name: compute_metrics(paths, sim_config)[1] for s, paths in zip(strategies, all_paths)}
+    plain_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    race = race_strategies(market_paths, universe, strategies, cost_model, sim_config)
+    race_seconds = time.perf_counter() - start
+
+    best = select_ranking(plain)["strategy"].iloc[0]
+    plain_pareto = set(pareto_set(plain)["strategy"])
+    rounds = race.rounds
+    table = pd.DataFrame(
+        [
+            {"mode": "plain", "seconds": plain_seconds, "strategy_paths": args.n_strategies * args.n_paths,
+             "survivors": args.n_strategies},
+            {"mode": "racing", "seconds": race_seconds, "strategy_paths": int(rounds["n_paths"].sum()),
+             "survivors": len(race.metrics)},
+        ]
+    ).set_index("mode")
+    with pd.option_context("display.float_format", "{:.1f}".format, "display.width", 120):
+        print(table)
+    print()
+    print("eliminations per round:", rounds["eliminated_round"].value_counts().sort_index().to_dict())
+    print(f"plain best strategy kept: {best in race.metrics}")
+    print(f"plain Pareto set kept: {len(plain_pareto & set(race.metrics))} of {len(plain_pareto)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Parameter sweep with common random numbers against independent runs.
+
+The shipped multi_world_nasdaqx2 strategy is simulated under --n-cases
+values of the NASDAQ100 volatility (GBM, or Student-t with --model
+student_t): once with fresh draws per case, and once transforming the
+innovations drawn for the base case. The table reports the time spent
+sampling the market paths and simulating, and the mean standard error of
+the median CAGR and p95 max drawdown changes from the base case.
+
+Usage: python benchmarks/bench_sweep.py [--n-cases 8] [--n-paths 4000] [--n-years 10] [--model gbm]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from invest_sim.config import load_cost_model, load_market_model, load_simulation, load_strategy, load_universe
+from invest_sim.config.schemas import SimulationConfig, SweepCaseConfig
+from invest_sim.experiments.run import _market_model_from_config
+from invest_sim.experiments.sweep import apply_case, sweep_deltas
+from invest_sim.metrics import compute_metrics
+from invest_sim.portfolio import simulate_portfolio
+
+CONFIGS = Path(__file__).resolve().parents[1] / "configs"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-cases", type=int, default=8)
+    parser.add_argument("--n-paths", type=int, default=4000)
+    parser.add_argument("--n-years", type=int, default=10)
+    parser.add_argument("--model", choices=["gbm", "student_t"], default="gbm")
+    args = parser.parse_args()
+
+    base = load_simulation(CONFIGS / "base.yaml").model_dump()
+    base.update(n_paths=args.n_paths, n_years=args.n_years)
+    base["output"].update(save_nav_paths=False, save_weights_paths=False, save_turnover_paths=False)
+    sim_config = SimulationConfig(**base)
+    universe = load_universe(CONFIGS / "universe.yaml")
+    cost_model = load_cost_model(CONFIGS / "cost_model.yaml")
+    market_config = load_market_model(CONFIGS / "market_models" / f"{args.model}.yaml")
+    strategy = load_strategy(CONFIGS / "strategies" / "multi" / "multi_world_nasdaqx2.yaml")
+    model = _market_model_from_config(market_config)
+
+    cases = [("base", universe, market_config)]
+    for sigma in np.linspace(0.18, 0.26, args.n_cases):
+        case = SweepCaseConfig(name=f"sigma_{sigma:.3f}", assets={"NASDAQ100": {"sigma_annual": float(sigma)}})
+        cases.append((case.name, *apply_case(universe, market_config, case)))
+    fitted = [model.fit(case_universe, case_market, sim_config) for _, case_universe, case_market in cases]
+
+    rows = []
+    for mode in ("independent", "common"):
+        start = time.perf_counter()
+        if mode == "common":
+            innovations = list(model.iter_innovations(fitted[0], sim_config))
+        per_path = {}
+        for index, (name, case_universe, _) in enumerate(cases):
+            if mode == "common":
+                config = sim_config
+                market_paths = model.paths_from_innovations(fitted[index], innovations, sim_config)
+            else:
+                config = sim_config.model_copy(update={"seed": sim_config.seed + index})
+                market_paths = model.iter_paths(fitted[index], config)
+            portfolio_paths = simulate_portfolio(market_paths, case_universe, strategy, cost_model, config)
+            per_path[name] = compute_metrics(portfolio_paths, config)[0]
+        seconds = time.perf_counter() - start
+        table = sweep_deltas(per_path, sim_config)
+        table = table[table["case"] != "base"].set_index(["metric", "statistic"]).sort_index()
+        # the paired standard error only applies to common random numbers
+        column = "delta_se" if mode == "common" else "delta_se_independent"
+        rows.append(
+            {
+                "mode": mode,
+                "seconds": seconds,
+                "se_cagr_median_delta": table.loc[("cagr", "median"), column].mean(),
+                "se_p95_max_drawdown_delta": table.loc[("max_drawdown", "p95"), column].mean(),
+            }
+        )
+    with pd.option_context("display.float_format", "{:.5f}".format, "display.width", 120):
+        print(pd.DataFrame(rows).set_index("mode"))
+
+
+if __name__ == "__main__":
+    main()
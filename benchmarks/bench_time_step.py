@@ -0,0 +1,95 @@
+"""Speed and metric agreement of the weekly and monthly time steps against daily steps.
+
+Every shipped strategy that coarse steps accept (no daily-reset leveraged
+asset, no vol targeting) is simulated under the GBM model at time_step D, W
+and M with the same settings. The table reports the wall time of each step
+and, per metric, the largest gap to the daily estimate across strategies.
+
+Usage: python benchmarks/bench_time_step.py [--n-paths 2000] [--n-years 20] [--seed 0]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from invest_sim.config import check_time_step, load_cost_model, load_market_model, load_simulation, load_strategy, load_universe
+from invest_sim.config.schemas import SimulationConfig
+from invest_sim.experiments.run import _market_model_from_config
+from invest_sim.metrics import compute_metrics
+from invest_sim.portfolio import simulate_strategies
+
+CONFIGS = Path(__file__).resolve().parents[1] / "configs"
+METRICS = ("mean_cagr", "median_cagr", "p05_cagr", "mean_max_drawdown", "mean_annualized_vol")
+
+
+def _coarse_ok(sim_config: SimulationConfig, universe, strategy) -> bool:
+    try:
+        check_time_step(sim_config, universe, strategy)
+    except ValueError:
+        return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-paths", type=int, default=2000)
+    parser.add_argument("--n-years", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    base = load_simulation(CONFIGS / "base.yaml").model_dump()
+    base.update(n_paths=args.n_paths, n_years=args.n_years, seed=args.seed)
+    base["output"].update(save_nav_paths=False, save_weights_paths=False, save_turnover_paths=False)
+    universe = load_universe(CONFIGS / "universe.yaml")
+    cost_model = load_cost_model(CONFIGS / "cost_model.yaml")
+    market_config = load_market_model(CONFIGS / "market_models" / "gbm.yaml")
+    model = _market_model_from_config(market_config)
+    monthly = SimulationConfig(**{**base, "time_step": "M"})
+    strategies = [
+        strategy
+        for strategy in (load_strategy(p) for p in sorted((CONFIGS / "strategies").rglob("*.yaml")))
+        if _coarse_ok(monthly, universe, strategy)
+    ]
+
+    rows = {}
+    timings = {}
+    for time_step in ("D", "W", "M"):
+        sim_config = SimulationConfig(**{**base, "time_step": time_step})
+        start = time.perf_counter()
+        fitted = model.fit(universe, market_config, sim_config)
+        all_paths = simulate_strategies(model.iter_paths(fitted, sim_config), universe, strategies, cost_model, sim_config)
+        summaries = [compute_metrics(paths, sim_config)[1] for paths in all_paths]
+        timings[time_step] = time.perf_counter() - start
+        for strategy, summary in zip(strategies, summaries):
+            rows[(time_step, strategy.name)] = {
+                "mean_cagr": summary.loc["mean", "cagr"],
+                "median_cagr": summary.loc["median", "cagr"],
+                "p05_cagr": summary.loc["p05", "cagr"],
+                "mean_max_drawdown": summary.loc["mean", "max_drawdown"],
+                "mean_annualized_vol": summary.loc["mean", "annualized_vol"],
+            }
+        print(f"time_step {time_step}: {timings[time_step]:6.2f} s for {len(strategies)} strategies")
+
+    table = pd.DataFrame.from_dict(rows, orient="index")
+    records = []
+    for time_step in ("D", "W", "M"):
+        gap = (table.loc[time_step] - table.loc["D"]).abs().max()
+        records.append(
+            {
+                "time_step": time_step,
+                "seconds": timings[time_step],
+                "speedup": timings["D"] / timings[time_step],
+                **{f"max_gap_{metric}_bp": 1e4 * gap[metric] for metric in METRICS},
+            }
+        )
+    with pd.option_context("display.float_format", "{:.2f}".format, "display.width", 160):
+        print()
+        print("Wall time and largest gap to the daily estimates across strategies (basis points):")
+        print(pd.DataFrame(records).set_index("time_step").T)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Metric drift of the float32 simulation mode against float64 on the shipped configs.
+
+Both precisions share the same random stream (draws are made in float64 and
+cast), so the differences reported here are rounding only, not Monte Carlo noise.
+
+Usage: python benchmarks/precision_check.py [--n-paths 2000] [--n-years 10]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from invest_sim.config import load_cost_model, load_market_model, load_simulation, load_strategy, load_universe
+from invest_sim.experiments.run import _market_model_from_config
+from invest_sim.metrics import compute_metrics
+from invest_sim.portfolio import simulate_portfolio
+
+CONFIGS = Path(__file__).resolve().parents[1] / "configs"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-paths", type=int, default=2000)
+    parser.add_argument("--n-years", type=int, default=None)
+    args = parser.parse_args()
+
+    base = load_simulation(CONFIGS / "base.yaml")
+    update = {"n_paths": args.n_paths}
+    if args.n_years is not None:
+        update["n_years"] = args.n_years
+    base = base.model_copy(update=update)
+    universe = load_universe(CONFIGS / "universe.yaml")
+    cost_model = load_cost_model(CONFIGS / "cost_model.yaml")
+    strategies = [load_strategy(p) for p in sorted((CONFIGS / "strategies").rglob("*.yaml"))]
+
+    records = []
+    for market_file in sorted((CONFIGS / "market_models").glob("*.yaml")):
+        market_config = load_market_model(market_file)
+        model = _market_model_from_config(market_config)
+        summaries = {}
+        for precision in ("float64", "float32"):
+            sim_config = base.model_copy(update={"precision": precision})
+            fitted = model.fit(universe, market_config, sim_config)
+            start = time.perf_counter()
+            market_paths = model.sample_paths(fitted, sim_config)
+            for strategy in strategies:
+                portfolio_paths = simulate_portfolio(market_paths, universe, strategy, cost_model, sim_config)
+                _, summary = compute_metrics(portfolio_paths, sim_config)
+                summaries[(precision, strategy.name)] = summary
+            print(
+                f"{market_file.stem:10s} {precision}: {time.perf_counter() - start:6.1f} s, "
+                f"returns tensor {market_paths.returns.nbytes / 1e6:7.1f} MB"
+            )
+        for strategy in strategies:
+            double = summaries[("float64", strategy.name)]
+            single = summaries[("float32", strategy.name)]
+            drift = (single - double).abs()
+            for metric in drift.columns:
+                records.append(
+                    {
+                        "market": market_file.stem,
+                        "metric": metric,
+                        "max_abs_drift": drift[metric].max(),
+                        "max_rel_drift": (drift[metric] / double[metric].abs().replace(0.0, np.nan)).max(),
+                    }
+                )
+
+    table = pd.DataFrame(records).groupby(["market", "metric"]).max()
+    with pd.option_context("display.float_format", "{:.2e}".format, "display.width", 120):
+        print()
+        print("Worst drift over strategies and summary statistics (mean, median, p05, p25, p75, p95):")
+        print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import numpy as np
+
+from invest_sim.config.schemas import SimulationConfig
+
+DAYS_PER_MONTH = 21
+
+
+def _steps_per_month(sim_config: SimulationConfig) -> float:
+    # a month is DAYS_PER_MONTH trading days at a daily step, and a twelfth of
+    # a year (4.33 weeks, one month) at the coarse steps
+    if sim_config.time_step == "D":
+        return float(DAYS_PER_MONTH)
+    return sim_config.steps_per_year / 12.0
+
+
+def _month_starts(sim_config: SimulationConfig, t_steps: int) -> np.ndarray:
+    per_month = _steps_per_month(sim_config)
+    n_months = int(np.ceil(t_steps / per_month))
+    return np.round(np.arange(n_months) * per_month).astype(int)
+
+
+def rebalance_days(sim_config: SimulationConfig, t_steps: int) -> np.ndarray:
+    steps = np.arange(t_steps)
+    freq = sim_config.rebalancing.frequency
+    if freq == "annual":
+        return steps % sim_config.steps_per_year == 0
+    flags = np.zeros(t_steps, dtype=bool)
+    if freq in ("monthly", "quarterly"):
+        starts = _month_starts(sim_config, t_steps)
+        if freq == "quarterly":
+            starts = starts[::3]
+        flags[starts[starts < t_steps]] = True
+    return flags
+
+
+def contribution_days(sim_config: SimulationConfig, t_steps: int) -> np.ndarray:
+    flags = np.zeros(t_steps, dtype=bool)
+    if not sim_config.contributions.enabled:
+        return flags
+    day_index = min(sim_config.contributions.day_of_month - 1, DAYS_PER_MONTH - 1)
+    # the contribution lands on the step holding that trading day of the month
+    per_month = _steps_per_month(sim_config)
+    starts = _month_starts(sim_config, t_steps)
+    lengths = np.diff(np.append(starts, np.round(len(starts) * per_month)))
+    offsets = np.minimum(int(day_index * per_month / DAYS_PER_MONTH), lengths - 1)
+    days = (starts + offsets).astype(int)
+    flags[days[days < t_steps]] = True
+    return flags
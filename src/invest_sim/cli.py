@@ -1,12 +1,23 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Optional
 
 import typer
 
-from invest_sim.config import load_cost_model, load_market_model, load_simulation, load_strategy, load_universe
+from invest_sim.config import (
+    check_time_step,
+    load_cost_model,
+    load_market_model,
+    load_simulation,
+    load_strategy,
+    load_universe,
+)
 from invest_sim.experiments.compare import compare_strategies
+from invest_sim.experiments.optimize import optimize_strategy
 from invest_sim.experiments.run import run_experiment
+from invest_sim.experiments.store import ResultStore
+from invest_sim.experiments.sweep import run_sweep
 
 app = typer.Typer(help="PEA parametric Monte Carlo simulator")
 
@@ -18,12 +29,12 @@ def _validate_configs(
     market: Path,
     strategy: Path | None,
 ) -> None:
-    load_simulation(base)
-    load_universe(universe)
+    sim_config = load_simulation(base)
+    universe_config = load_universe(universe)
     load_cost_model(cost)
     load_market_model(market)
     if strategy is not None:
-        load_strategy(strategy)
+        check_time_step(sim_config, universe_config, load_strategy(strategy))
 
 
 @app.command()
@@ -63,9 +74,13 @@ def run(
     cost: Path = typer.Option(..., exists=True, dir_okay=False),
     market: Path = typer.Option(..., exists=True, dir_okay=False),
     strategy: Path = typer.Option(..., exists=True, dir_okay=False),
+    workers: Optional[int] = typer.Option(
+        None, min=1, help="Processes simulating path shards in parallel (any value shards the paths)."
+    ),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Sample market paths instead of using the path cache."),
 ) -> None:
     """Run a single strategy experiment."""
-    result = run_experiment(base, universe, cost, market, strategy)
+    result = run_experiment(base, universe, cost, market, strategy, workers=workers, use_cache=not no_cache)
     typer.echo(f"Run completed: {result.output_dir}")
 
 
@@ -76,11 +91,67 @@ def compare(
     cost: Path = typer.Option(..., exists=True, dir_okay=False),
     market: Path = typer.Option(..., exists=True, dir_okay=False),
     strategies_dir: Path = typer.Option(..., exists=True, file_okay=False),
+    workers: int = typer.Option(1, min=1, help="Processes sharing the market paths, each simulating a subset of strategies."),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Sample market paths instead of using the path cache."),
+    no_store: bool = typer.Option(False, "--no-store", help="Neither load nor save per-strategy results."),
+    refresh: bool = typer.Option(False, "--refresh", help="Re-simulate every strategy and overwrite stored results."),
 ) -> None:
     """Compare all strategies in a directory."""
-    result = compare_strategies(base, universe, cost, market, strategies_dir)
+    result = compare_strategies(
+        base,
+        universe,
+        cost,
+        market,
+        strategies_dir,
+        workers=workers,
+        use_cache=not no_cache,
+        use_store=not no_store,
+        refresh=refresh,
+    )
     typer.echo(f"Comparison completed: {result.output_dir}")
 
 
+@app.command()
+def optimize(
+    base: Path = typer.Option(..., exists=True, dir_okay=False),
+    universe: Path = typer.Option(..., exists=True, dir_okay=False),
+    cost: Path = typer.Option(..., exists=True, dir_okay=False),
+    market: Path = typer.Option(..., exists=True, dir_okay=False),
+    search: Path = typer.Option(..., exists=True, dir_okay=False, help="Search space and budget (optimize.yaml)."),
+    workers: int = typer.Option(1, min=1, help="Processes sharing the market paths, each simulating part of a batch."),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Sample market paths instead of using the path cache."),
+) -> None:
+    """Search target weights by Bayesian optimization."""
+    result = optimize_strategy(base, universe, cost, market, search, workers=workers, use_cache=not no_cache)
+    if result.best_strategy is None:
+        typer.echo("No candidate met the drawdown limit.")
+    else:
+        typer.echo(f"Best candidate: {result.best_strategy.name}")
+    typer.echo(f"Optimization completed: {result.output_dir}")
+
+
+@app.command()
+def sweep(
+    base: Path = typer.Option(..., exists=True, dir_okay=False),
+    universe: Path = typer.Option(..., exists=True, dir_okay=False),
+    cost: Path = typer.Option(..., exists=True, dir_okay=False),
+    market: Path = typer.Option(..., exists=True, dir_okay=False),
+    strategy: Path = typer.Option(..., exists=True, dir_okay=False),
+    cases: Path = typer.Option(..., exists=True, dir_okay=False, help="Parameter sets to compare (sweep.yaml)."),
+) -> None:
+    """Run one strategy under several market parameter sets with common random numbers."""
+    result = run_sweep(base, universe, cost, market, strategy, cases)
+    typer.echo(f"Sweep completed: {result.output_dir}")
+
+
+@app.command("clear-results")
+def clear_results(
+    base: Path = typer.Option(..., exists=True, dir_okay=False),
+) -> None:
+    """Delete the per-strategy results stored by compare."""
+    removed = ResultStore.from_config(load_simulation(base)).clear()
+    typer.echo(f"Removed {removed} stored strategy results.")
+
+
 if __name__ == "__main__":
     app()
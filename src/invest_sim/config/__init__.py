@@ -1,17 +1,22 @@
+from invest_sim.config.checks import check_time_step
 from invest_sim.config.load import (
     load_cost_model,
     load_market_model,
+    load_optimize,
     load_simulation,
     load_strategy,
+    load_sweep,
     load_universe,
 )
 from invest_sim.config.schemas import (
     CostModelConfig,
     MarketModelConfig,
     MarketPaths,
+    OptimizeConfig,
     PortfolioPaths,
     SimulationConfig,
     StrategyConfig,
+    SweepConfig,
     UniverseConfig,
 )
 
@@ -19,13 +24,18 @@ __all__ = [
     "CostModelConfig",
     "MarketModelConfig",
     "MarketPaths",
+    "OptimizeConfig",
     "PortfolioPaths",
     "SimulationConfig",
     "StrategyConfig",
+    "SweepConfig",
     "UniverseConfig",
+    "check_time_step",
     "load_cost_model",
     "load_market_model",
+    "load_optimize",
     "load_simulation",
     "load_strategy",
+    "load_sweep",
     "load_universe",
 ]
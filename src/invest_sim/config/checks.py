@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from invest_sim.config.schemas import SimulationConfig, StrategyConfig, UniverseConfig
+
+
+def check_time_step(sim_config: SimulationConfig, universe: UniverseConfig, strategy: StrategyConfig) -> None:
+    # Weekly and monthly steps compound the underlyings exactly, but a
+    # leveraged ETF resets its leverage every day and a volatility target is
+    # estimated on daily returns: both need daily steps.
+    if sim_config.time_step == "D":
+        return
+    leveraged_ids = {asset.id for asset in universe.leveraged_assets or []}
+    held = sorted(asset_id for asset_id, weight in strategy.target_weights.items() if asset_id in leveraged_ids and weight > 0)
+    if held:
+        raise ValueError(
+            f"strategy {strategy.name} holds daily-reset leveraged assets {held}, "
+            f"which require time_step 'D' (got '{sim_config.time_step}')"
+        )
+    if strategy.overlays.vol_targeting.enabled:
+        raise ValueError(
+            f"strategy {strategy.name} uses vol targeting, which requires time_step 'D' "
+            f"(got '{sim_config.time_step}')"
+        )
@@ -44,3 +44,11 @@ def load_market_model(path: Path) -> schemas.MarketModelConfig:
 
 def load_strategy(path: Path) -> schemas.StrategyConfig:
     return load_config(path, schemas.StrategyConfig)
+
+
+def load_optimize(path: Path) -> schemas.OptimizeConfig:
+    return load_config(path, schemas.OptimizeConfig)
+
+
+def load_sweep(path: Path) -> schemas.SweepConfig:
+    return load_config(path, schemas.SweepConfig)
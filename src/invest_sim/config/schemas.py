@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 from pydantic import BaseModel, Field, field_validator, model_validator
 
+if TYPE_CHECKING:
+    from invest_sim.metrics.accumulator import NavSummary
+
 
 class ContributionsConfig(BaseModel):
     enabled: bool
@@ -23,6 +26,56 @@ class OutputConfig(BaseModel):
     save_nav_paths: bool = True
     save_weights_paths: bool = False
     save_turnover_paths: bool = False
+    market_cache_dir: Optional[str] = None
+    market_cache_max_gb: float = Field(default=4.0, gt=0)
+    result_store_dir: Optional[str] = None
+
+
+# simulation steps per year for each time_step; daily steps follow
+# trading_days_per_year
+STEPS_PER_YEAR = {"D": None, "W": 52, "M": 12}
+
+
+class VarianceReductionConfig(BaseModel):
+    # antithetic: paths 2k and 2k+1 use opposite normal draws
+    antithetic: bool = False
+    # control_variate: buy-and-hold growth of the underlyings as control
+    control_variate: bool = False
+
+
+class RacingConfig(BaseModel):
+    # successive halving in compare: every strategy runs on the first
+    # initial_paths paths, the budget is multiplied by growth for the
+    # strategies whose confidence intervals are not dominated
+    enabled: bool = False
+    initial_paths: int = Field(default=250, ge=20)
+    growth: int = Field(default=4, ge=2)
+    confidence: float = Field(default=0.95, gt=0.5, lt=1)
+
+
+class PrecisionTargetConfig(BaseModel):
+    # standard error wanted on one summary statistic of a per-path metric
+    metric: str = Field(
+        pattern=r"^(final_value|cagr|annualized_vol|max_drawdown|time_underwater_fraction|worst_year_return|es_95)$"
+    )
+    statistic: str = Field(pattern=r"^(mean|median|p05|p25|p75|p95)$")
+    tolerance: float = Field(gt=0)
+
+
+def _default_precision_targets() -> List[PrecisionTargetConfig]:
+    return [
+        PrecisionTargetConfig(metric="cagr", statistic="median", tolerance=0.001),
+        PrecisionTargetConfig(metric="max_drawdown", statistic="p95", tolerance=0.005),
+        PrecisionTargetConfig(metric="es_95", statistic="median", tolerance=0.0001),
+    ]
+
+
+class TargetPrecisionConfig(BaseModel):
+    # run: paths simulated shard by shard (shard_paths each) until every
+    # target's standard error is under its tolerance, n_paths being the cap
+    enabled: bool = False
+    method: str = Field(default="asymptotic", pattern=r"^(asymptotic|bootstrap)$")
+    targets: List[PrecisionTargetConfig] = Field(default_factory=_default_precision_targets, min_length=1)
 
 
 class SimulationConfig(BaseModel):
@@ -36,12 +89,26 @@ class SimulationConfig(BaseModel):
     contributions: ContributionsConfig
     rebalancing: RebalancingConfig
     output: OutputConfig
+    block_steps: int = Field(default=252, ge=1)
+    precision: str = Field(default="float64", pattern=r"^(float32|float64)$")
+    engine: str = Field(default="event", pattern=r"^(event|daily)$")
+    shard_paths: Optional[int] = Field(default=None, ge=1)
+    variance_reduction: VarianceReductionConfig = Field(default_factory=VarianceReductionConfig)
+    # sobol: scrambled Sobol normals with a Brownian-bridge time ordering
+    # (gbm and student_t), in qmc_replications independent scramblings
+    sampler: str = Field(default="mc", pattern=r"^(mc|sobol)$")
+    qmc_replications: int = Field(default=8, ge=2)
+    racing: RacingConfig = Field(default_factory=RacingConfig)
+    target_precision: TargetPrecisionConfig = Field(default_factory=TargetPrecisionConfig)
+    # shorter horizons (in years) whose metrics are also computed from the
+    # same NAV paths; n_years is the longest one
+    horizons_years: List[int] = Field(default_factory=list)
 
     @field_validator("time_step")
     @classmethod
     def validate_time_step(cls, value: str) -> str:
-        if value != "D":
-            raise ValueError("time_step must be 'D' for daily")
+        if value not in STEPS_PER_YEAR:
+            raise ValueError("time_step must be 'D' (daily), 'W' (weekly) or 'M' (monthly)")
         return value
 
     @model_validator(mode="after")
@@ -53,6 +120,55 @@ class SimulationConfig(BaseModel):
             self.seed = int(secrets.randbelow(2 ** 31 - 1))
         return self
 
+    @model_validator(mode="after")
+    def validate_antithetic_pairs(self) -> "SimulationConfig":
+        if self.variance_reduction.antithetic:
+            if self.n_paths % 2:
+                raise ValueError("n_paths must be even with antithetic sampling")
+            if self.shard_paths is not None and self.shard_paths % 2:
+                raise ValueError("shard_paths must be even with antithetic sampling")
+        return self
+
+    @model_validator(mode="after")
+    def validate_sobol_sampler(self) -> "SimulationConfig":
+        if self.sampler == "sobol":
+            if self.variance_reduction.antithetic:
+                raise ValueError("the sobol sampler cannot be combined with antithetic sampling")
+            if self.n_paths % self.qmc_replications:
+                raise ValueError("n_paths must be a multiple of qmc_replications with the sobol sampler")
+            if self.shard_paths is not None:
+                raise ValueError("the sobol sampler draws all paths at once and cannot be sharded")
+            if self.target_precision.enabled:
+                raise ValueError("the sobol sampler draws all paths at once and cannot target a precision")
+        return self
+
+    @model_validator(mode="after")
+    def validate_horizons(self) -> "SimulationConfig":
+        if any(years < 1 or years > self.n_years for years in self.horizons_years):
+            raise ValueError(f"horizons_years must be between 1 and n_years ({self.n_years})")
+        return self
+
+    @property
+    def steps_per_year(self) -> int:
+        return STEPS_PER_YEAR[self.time_step] or self.trading_days_per_year
+
+    @property
+    def days_per_step(self) -> float:
+        return self.trading_days_per_year / self.steps_per_year
+
+    @property
+    def t_steps(self) -> int:
+        return self.n_years * self.steps_per_year
+
+    @property
+    def horizon_checkpoints(self) -> List[int]:
+        # steps at which the metrics of the shorter horizons are taken
+        return sorted({years * self.steps_per_year for years in self.horizons_years if years < self.n_years})
+
+    @property
+    def float_dtype(self) -> np.dtype:
+        return np.dtype(self.precision)
+
 
 class BaseAssetConfig(BaseModel):
     id: str
@@ -87,9 +203,34 @@ class CorrelationConfig(BaseModel):
         return value
 
 
+class FactorModelConfig(BaseModel):
+    # returns = loadings @ factors + idiosyncratic_vol * noise, with independent
+    # standard normal factors; only the correlations are taken from this
+    # structure, each asset keeping its sigma_annual. Validation and sampling
+    # cost O(n_assets * n_factors), the dense matrix is never formed.
+    loadings: Dict[str, List[float]]
+    idiosyncratic_vol: Dict[str, float]
+
+    @model_validator(mode="after")
+    def validate_factors(self) -> "FactorModelConfig":
+        n_factors = {len(row) for row in self.loadings.values()}
+        if len(n_factors) != 1 or 0 in n_factors:
+            raise ValueError("factor loadings must give the same non-zero number of factors for every asset")
+        if set(self.loadings) != set(self.idiosyncratic_vol):
+            raise ValueError("factor loadings and idiosyncratic_vol must list the same assets")
+        for asset_id, vol in self.idiosyncratic_vol.items():
+            if vol < 0:
+                raise ValueError(f"idiosyncratic_vol of {asset_id} must be non-negative")
+            if vol == 0 and not any(self.loadings[asset_id]):
+                raise ValueError(f"asset {asset_id} has neither factor loadings nor idiosyncratic_vol")
+        return self
+
+
 class UniverseConfig(BaseModel):
     assets: List[BaseAssetConfig]
-    correlations: CorrelationConfig
+    # exactly one of a dense correlation matrix or a factor model
+    correlations: Optional[CorrelationConfig] = None
+    factor_model: Optional[FactorModelConfig] = None
     leveraged_assets: Optional[List[LeveragedAssetConfig]] = None
 
     @model_validator(mode="after")
@@ -103,6 +244,12 @@ class UniverseConfig(BaseModel):
                     raise ValueError(
                         f"leveraged asset {lev.id} references unknown underlying {lev.underlying_id}"
                     )
+        if (self.correlations is None) == (self.factor_model is None):
+            raise ValueError("universe needs exactly one of correlations or factor_model")
+        if self.factor_model is not None:
+            if set(self.factor_model.loadings) != set(asset_ids):
+                raise ValueError("factor loadings must be given for every asset and only for them")
+            return self
         n_assets = len(self.assets)
         corr = np.array(self.correlations.matrix)
         if corr.shape != (n_assets, n_assets):
@@ -110,10 +257,34 @@ class UniverseConfig(BaseModel):
         return self
 
 
+class BrokerTierConfig(BaseModel):
+    up_to_eur: Optional[float] = Field(default=None, gt=0)
+    bps: float = Field(ge=0)
+
+
 class BrokerConfig(BaseModel):
-    model: str = Field(pattern=r"^(fixed_per_order|bps_notional)$")
+    model: str = Field(pattern=r"^(fixed_per_order|bps_notional|tiered)$")
     fixed_fee_eur: float = Field(ge=0)
     bps: float = Field(ge=0)
+    tiers: Optional[List[BrokerTierConfig]] = None
+    min_fee_eur: float = Field(default=0.0, ge=0)
+
+    @model_validator(mode="after")
+    def validate_tiers(self) -> "BrokerConfig":
+        if self.model != "tiered":
+            # the other models would silently ignore them
+            if self.tiers or self.min_fee_eur > 0:
+                raise ValueError("tiers and min_fee_eur only apply to the tiered broker model")
+            return self
+        if not self.tiers:
+            raise ValueError("tiered broker model requires tiers")
+        bounds = [tier.up_to_eur for tier in self.tiers]
+        if any(bound is None for bound in bounds[:-1]):
+            raise ValueError("only the last tier may omit up_to_eur")
+        finite = [bound for bound in bounds if bound is not None]
+        if any(upper <= lower for lower, upper in zip(finite, finite[1:])):
+            raise ValueError("tier up_to_eur bounds must be increasing")
+        return self
 
 
 class CostModelConfig(BaseModel):
@@ -180,6 +351,8 @@ class VolTargetingConfig(BaseModel):
     lookback_days: int = Field(ge=20)
     max_leverage_multiplier: float = Field(ge=1)
     min_leverage_multiplier: float = Field(ge=0)
+    estimator: str = Field(default="window", pattern=r"^(window|ewma)$")
+    ewma_lambda: float = Field(default=0.94, gt=0, lt=1)
 
 
 class ConstraintsConfig(BaseModel):
@@ -214,6 +387,106 @@ class StrategyConfig(BaseModel):
         return self
 
 
+class VolTargetingSearchConfig(BaseModel):
+    # bounds of the searched vol-targeting parameters; the others are fixed
+    target_vol_annual: Tuple[float, float]
+    max_leverage_multiplier: Tuple[float, float] = (1.0, 1.0)
+    min_leverage_multiplier: float = Field(default=0.0, ge=0)
+    lookback_days: int = Field(default=63, ge=20)
+    estimator: str = Field(default="window", pattern=r"^(window|ewma)$")
+    ewma_lambda: float = Field(default=0.94, gt=0, lt=1)
+
+    @model_validator(mode="after")
+    def validate_bounds(self) -> "VolTargetingSearchConfig":
+        low, high = self.target_vol_annual
+        if not 0 < low <= high:
+            raise ValueError("target_vol_annual bounds must satisfy 0 < low <= high")
+        low, high = self.max_leverage_multiplier
+        if not 1 <= low <= high:
+            raise ValueError("max_leverage_multiplier bounds must satisfy 1 <= low <= high")
+        return self
+
+
+class OptimizeConfig(BaseModel):
+    # candidates are named {name}_{index:03d}
+    name: str = "optimized"
+    # search space: target weights of these assets within the constraints
+    # (and the vol-targeting parameters when vol_targeting is given)
+    assets: List[str]
+    constraints: ConstraintsConfig
+    vol_targeting: Optional[VolTargetingSearchConfig] = None
+    # objective: median CAGR subject to p95 max drawdown <= the limit
+    max_drawdown_p95_limit: float = Field(default=0.70, gt=0)
+    n_initial: int = Field(default=16, ge=2)
+    n_iterations: int = Field(default=8, ge=0)
+    batch_size: int = Field(default=8, ge=1)
+    # random candidates scored by the acquisition function per proposal
+    candidate_pool: int = Field(default=2000, ge=10)
+    seed: int = 0
+
+    @model_validator(mode="after")
+    def validate_space(self) -> "OptimizeConfig":
+        if not self.assets or len(self.assets) != len(set(self.assets)):
+            raise ValueError("assets must be a non-empty list of unique ids")
+        max_weight = self.constraints.max_weight
+        if max_weight <= 0:
+            raise ValueError("max_weight must be positive")
+        if not self.constraints.allow_cash and max_weight * len(self.assets) < 1.0 - 1e-9:
+            raise ValueError("max_weight is too small for the weights to sum to 1.0 without cash")
+        return self
+
+
+class SweepCaseConfig(BaseModel):
+    name: str
+    # universe overrides by asset id, e.g. {WORLD: {sigma_annual: 0.18}}
+    assets: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+    correlations: Optional[CorrelationConfig] = None
+    # market-model fields (df, transition_matrix, initial_probs, ...)
+    market: Dict[str, Any] = Field(default_factory=dict)
+    # regime overrides by regime name, e.g. {crisis: {sigma_multiplier: 2.5}}
+    regimes: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+
+    @field_validator("assets")
+    @classmethod
+    def validate_assets(cls, value: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        fields = {"mu_annual", "sigma_annual", "ter_annual"}
+        unknown = sorted({key for overrides in value.values() for key in overrides} - fields)
+        if unknown:
+            raise ValueError(f"unknown asset fields {unknown}, expected some of {sorted(fields)}")
+        return value
+
+    @field_validator("market")
+    @classmethod
+    def validate_market(cls, value: Dict[str, Any]) -> Dict[str, Any]:
+        # these would change the shape of the innovations
+        fixed = sorted({"model_type", "enabled_assets", "regimes"} & set(value))
+        if fixed:
+            raise ValueError(f"sweep cases cannot override {fixed}")
+        return value
+
+    @field_validator("regimes")
+    @classmethod
+    def validate_regimes(cls, value: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        fields = {"mu_multiplier", "sigma_multiplier", "corr_multiplier"}
+        unknown = sorted({key for overrides in value.values() for key in overrides} - fields)
+        if unknown:
+            raise ValueError(f"unknown regime fields {unknown}, expected some of {sorted(fields)}")
+        return value
+
+
+class SweepConfig(BaseModel):
+    # parameter sets simulated on the innovations of the unmodified configs
+    # (the "base" case)
+    cases: List[SweepCaseConfig] = Field(min_length=1)
+
+    @model_validator(mode="after")
+    def validate_names(self) -> "SweepConfig":
+        names = [case.name for case in self.cases]
+        if len(names) != len(set(names)) or "base" in names:
+            raise ValueError("sweep case names must be unique and differ from 'base'")
+        return self
+
+
 @dataclass
 class MarketPaths:
     returns: np.ndarray
@@ -223,7 +496,13 @@ class MarketPaths:
 
 @dataclass
 class PortfolioPaths:
-    nav: np.ndarray
+    # nav is None when output.save_nav_paths is false; the metrics are then
+    # accumulated during the simulation and carried by nav_summary
+    nav: Optional[np.ndarray]
     asset_ids: List[str]
     weights: Optional[np.ndarray] = None
     turnover: Optional[np.ndarray] = None
+    nav_summary: Optional[NavSummary] = None
+    # (underlying asset, path) growth of a buy-and-hold unit, tracked for the
+    # control-variate estimator
+    underlying_growth: Optional[np.ndarray] = None
@@ -1,4 +1,6 @@
 from invest_sim.experiments.compare import compare_strategies
+from invest_sim.experiments.optimize import optimize_strategy
 from invest_sim.experiments.run import run_experiment
+from invest_sim.experiments.sweep import run_sweep
 
-__all__ = ["compare_strategies", "run_experiment"]
+__all__ = ["compare_strategies", "optimize_strategy", "run_experiment", "run_sweep"]
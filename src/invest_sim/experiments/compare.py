@@ -2,16 +2,22 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import pandas as pd
 
 from invest_sim.config import load_cost_model, load_market_model, load_simulation, load_strategy, load_universe
+from invest_sim.experiments.parallel import simulate_strategies_shared
+from invest_sim.experiments.racing import race_strategies
+from invest_sim.experiments.store import ResultStore, strategy_result_key
+from invest_sim.market.base import concat_market_paths
+from invest_sim.market.cache import MarketPathCache, market_cache_key, sample_or_load
 from invest_sim.market.gbm import GBMModel
 from invest_sim.market.regimes import RegimeSwitchingModel
 from invest_sim.market.student_t import StudentTModel
-from invest_sim.metrics import compute_metrics, pareto_set, select_ranking
-from invest_sim.portfolio import simulate_portfolio
+from invest_sim.metrics import compute_metrics, horizon_summary, pareto_set, select_ranking
+from invest_sim.metrics.compute import METRICS
+from invest_sim.portfolio import simulate_strategies
 from invest_sim.reporting import plot_strategy_cdf, plot_strategy_scatter, write_comparison_report
 
 
@@ -37,6 +43,10 @@ def compare_strategies(
     cost_path: Path,
     market_path: Path,
     strategies_dir: Path,
+    workers: int = 1,
+    use_cache: bool = True,
+    use_store: bool = True,
+    refresh: bool = False,
 ) -> ComparisonResult:
     sim_config = load_simulation(base_path)
     universe = load_universe(universe_path)
@@ -45,7 +55,6 @@ def compare_strategies(
 
     model = _market_model_from_config(market_config.model_type)
     fitted = model.fit(universe, market_config, sim_config)
-    market_paths = model.sample_paths(fitted, sim_config)
 
     metrics_by_strategy: Dict[str, pd.DataFrame] = {}
     summary_by_strategy: Dict[str, pd.DataFrame] = {}
@@ -56,10 +65,63 @@ def compare_strategies(
     )
     if not strategy_files:
         raise ValueError(f"No strategy files found under {strategies_dir}")
-    for strategy_path in strategy_files:
-        strategy = load_strategy(strategy_path)
-        portfolio_paths = simulate_portfolio(market_paths, universe, strategy, cost_model, sim_config)
-        per_path, summary = compute_metrics(portfolio_paths, sim_config)
+    strategies = [load_strategy(strategy_path) for strategy_path in strategy_files]
+    # all strategies are simulated in a single pass over streamed market
+    # blocks; the comparison only needs metrics, which are accumulated
+    # during the simulation instead of keeping every NAV path
+    batch_config = sim_config.model_copy(
+        update={
+            "output": sim_config.output.model_copy(
+                update={"save_nav_paths": False, "save_weights_paths": False, "save_turnover_paths": False}
+            )
+        }
+    )
+    # results of unchanged strategies are loaded from the store; only new
+    # or edited ones (or all of them with refresh) are simulated
+    store = ResultStore.from_config(sim_config) if use_store else None
+    market_key = market_cache_key(universe, market_config, sim_config)
+    keys = [strategy_result_key(strategy, cost_model, sim_config, market_key) for strategy in strategies]
+    all_metrics = [None if store is None or refresh else store.load(key) for key in keys]
+    pending = [index for index, metrics in enumerate(all_metrics) if metrics is None]
+    racing_table: Optional[pd.DataFrame] = None
+    if pending:
+        to_simulate = [strategies[index] for index in pending]
+        cache = MarketPathCache.from_config(sim_config) if use_cache else None
+        market_paths = sample_or_load(model, fitted, universe, batch_config, cache)
+        if sim_config.racing.enabled:
+            # the rounds read nested prefixes of the paths: memory-mapped from
+            # the cache, or materialized when the cache is off; strategies
+            # loaded from the store race as already finished
+            if cache is None:
+                market_paths = concat_market_paths(market_paths, sim_config.t_steps)
+            finished = {
+                strategy.name: metrics
+                for strategy, metrics in zip(strategies, all_metrics)
+                if metrics is not None
+            }
+            race = race_strategies(
+                market_paths, universe, to_simulate, cost_model, batch_config, workers, finished=finished
+            )
+            racing_table = race.rounds
+            simulated = [race.metrics.get(strategy.name) for strategy in to_simulate]
+        elif workers > 1 and len(to_simulate) > 1:
+            # the paths are sampled once into shared memory (or mapped from
+            # the cache) and the strategies split across a process pool
+            simulated = simulate_strategies_shared(
+                market_paths, universe, to_simulate, cost_model, batch_config, workers
+            )
+        else:
+            all_paths = simulate_strategies(market_paths, universe, to_simulate, cost_model, batch_config)
+            simulated = [compute_metrics(portfolio_paths, sim_config) for portfolio_paths in all_paths]
+        for index, metrics in zip(pending, simulated):
+            all_metrics[index] = metrics
+            if store is not None and metrics is not None:
+                store.save(keys[index], *metrics)
+    # strategies eliminated by racing only appear in the racing table
+    for strategy, metrics in zip(strategies, all_metrics):
+        if metrics is None:
+            continue
+        per_path, summary = metrics
         metrics_by_strategy[strategy.name] = per_path
         summary_by_strategy[strategy.name] = summary
 
@@ -67,15 +129,26 @@ def compare_strategies(
     for name, summary in summary_by_strategy.items():
         row = {"strategy": name}
         for stat in summary.index:
-            for metric in summary.columns:
+            # the shorter horizons only appear in metrics_by_horizon.csv
+            for metric in METRICS:
                 row[f"{metric}_{stat}"] = summary.loc[stat, metric]
         summary_rows.append(row)
     summary_table = pd.DataFrame(summary_rows)
+    by_horizon = None
+    if sim_config.horizons_years:
+        by_horizon = pd.concat(
+            {name: horizon_summary(summary, sim_config) for name, summary in summary_by_strategy.items()},
+            names=["strategy"],
+        )
 
     output_dir = Path(sim_config.output.base_dir) / f"{pd.Timestamp.utcnow():%Y%m%d_%H%M%S}_compare_{sim_config.run_name}"
     output_dir.mkdir(parents=True, exist_ok=True)
 
     summary_table.to_csv(output_dir / "metrics_summary_all_strategies.csv", index=False)
+    if racing_table is not None:
+        racing_table.to_csv(output_dir / "racing.csv", index=False)
+    if by_horizon is not None:
+        by_horizon.to_csv(output_dir / "metrics_by_horizon.csv")
 
     plots_dir = output_dir / "plots"
     plots_dir.mkdir(exist_ok=True)
@@ -94,6 +167,14 @@ def compare_strategies(
 
     ranking = select_ranking(summary_by_strategy)
     pareto = pareto_set(summary_by_strategy)
-    write_comparison_report(output_dir, summary_table, ranking, pareto, sim_config.model_dump())
+    write_comparison_report(
+        output_dir,
+        summary_table,
+        ranking,
+        pareto,
+        sim_config.model_dump(),
+        racing=racing_table,
+        by_horizon=by_horizon,
+    )
 
     return ComparisonResult(output_dir=output_dir, metrics_summary=summary_table)
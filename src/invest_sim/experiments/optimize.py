@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from invest_sim.config import load_cost_model, load_market_model, load_optimize, load_simulation, load_universe
+from invest_sim.config.schemas import (
+    CostModelConfig,
+    MarketPaths,
+    OptimizeConfig,
+    SimulationConfig,
+    StrategyConfig,
+    UniverseConfig,
+)
+from invest_sim.experiments.parallel import SharedMarketPaths, shared_market_paths, simulate_on_shared_paths
+from invest_sim.experiments.run import _market_model_from_config
+from invest_sim.experiments.surrogate import (
+    GaussianProcess,
+    expected_improvement,
+    probability_below,
+    sample_capped_simplex,
+)
+from invest_sim.market.base import concat_market_paths
+from invest_sim.market.cache import MarketPathCache, sample_or_load
+from invest_sim.metrics import compute_metrics, pareto_set, select_ranking
+from invest_sim.portfolio import simulate_strategies
+from invest_sim.reporting import plot_optimization_progress, write_optimization_report
+
+# Dirichlet concentration of the candidates drawn around the incumbent
+LOCAL_CONCENTRATION = 50.0
+WEIGHT_DECIMALS = 4
+
+
+@dataclass
+class SearchHistory:
+    strategies: List[StrategyConfig]
+    summaries: Dict[str, pd.DataFrame]
+    evaluations: pd.DataFrame
+
+
+@dataclass
+class OptimizationResult:
+    output_dir: Path
+    evaluations: pd.DataFrame
+    best_strategy: Optional[StrategyConfig]
+
+
+class _SearchSpace:
+    # A candidate is a point of the unit cube for the surrogate: the asset
+    # weights (inside the capped simplex, cash being the slack when allowed)
+    # followed by the searched vol-targeting parameters rescaled to [0, 1].
+
+    def __init__(self, config: OptimizeConfig) -> None:
+        self.config = config
+        self.n_assets = len(config.assets)
+        caps = [config.constraints.max_weight] * self.n_assets
+        if config.constraints.allow_cash:
+            caps.append(1.0)
+        self.caps = np.array(caps)
+        vol = config.vol_targeting
+        self.vol_bounds: List[Tuple[str, Tuple[float, float]]] = []
+        if vol is not None:
+            self.vol_bounds = [
+                ("target_vol_annual", vol.target_vol_annual),
+                ("max_leverage_multiplier", vol.max_leverage_multiplier),
+            ]
+
+    def sample(self, rng: np.random.Generator, n_samples: int, around: Optional[np.ndarray] = None) -> np.ndarray:
+        concentration = None
+        if around is not None:
+            simplex = around[: self.n_assets]
+            if self.config.constraints.allow_cash:
+                simplex = np.append(simplex, max(1.0 - simplex.sum(), 0.0))
+            concentration = 1.0 + LOCAL_CONCENTRATION * simplex
+        weights = _round_weights(sample_capped_simplex(rng, n_samples, self.caps, concentration), self.caps)
+        if around is None:
+            vol = rng.random((n_samples, len(self.vol_bounds)))
+        else:
+            vol = around[self.n_assets :] + rng.normal(0.0, 0.1, (n_samples, len(self.vol_bounds)))
+        return np.hstack([weights[:, : self.n_assets], np.clip(vol, 0.0, 1.0)])
+
+    def parameters(self, point: np.ndarray) -> Dict[str, float]:
+        return {
+            name: round(low + unit * (high - low), WEIGHT_DECIMALS)
+            for (name, (low, high)), unit in zip(self.vol_bounds, point[self.n_assets :])
+        }
+
+    def strategy(self, point: np.ndarray, name: str) -> StrategyConfig:
+        vol = self.config.vol_targeting
+        if vol is None:
+            vol_targeting = {
+                "enabled": False,
+                "target_vol_annual": 0.12,
+                "lookback_days": 63,
+                "max_leverage_multiplier": 1.0,
+                "min_leverage_multiplier": 0.0,
+            }
+        else:
+            vol_targeting = {
+                "enabled": True,
+                "lookback_days": vol.lookback_days,
+                "min_leverage_multiplier": vol.min_leverage_multiplier,
+                "estimator": vol.estimator,
+                "ewma_lambda": vol.ewma_lambda,
+                **self.parameters(point),
+            }
+        return StrategyConfig(
+            name=name,
+            target_weights={asset: float(weight) for asset, weight in zip(self.config.assets, point[: self.n_assets])},
+            constraints=self.config.constraints,
+            overlays={"vol_targeting": vol_targeting},
+        )
+
+
+def _round_weights(weights: np.ndarray, caps: np.ndarray) -> np.ndarray:
+    # readable weights that still sum to one: the rounding residual goes to
+    # the coordinate with the most room (or the largest one when negative)
+    rounded = np.round(weights, WEIGHT_DECIMALS)
+    residual = 1.0 - rounded.sum(axis=1)
+    rows = np.arange(len(rounded))
+    target = np.where(residual > 0, np.argmax(caps - rounded, axis=1), np.argmax(rounded, axis=1))
+    rounded[rows, target] += residual
+    return np.round(rounded, WEIGHT_DECIMALS)
+
+
+def _evaluate(
+    market_paths: MarketPaths,
+    universe: UniverseConfig,
+    strategies: List[StrategyConfig],
+    cost_model: CostModelConfig,
+    sim_config: SimulationConfig,
+    workers: int,
+    spec: Optional[SharedMarketPaths] = None,
+) -> List[Tuple[pd.DataFrame, pd.DataFrame]]:
+    # one batched pass over the same market paths: every candidate sees the
+    # same scenarios (common random numbers); with workers, the batch is
+    # split across processes reading the paths shared once for the search
+    if spec is not None and len(strategies) > 1:
+        return simulate_on_shared_paths(spec, universe, strategies, cost_model, sim_config, workers)
+    all_paths = simulate_strategies(market_paths, universe, strategies, cost_model, sim_config)
+    return [compute_metrics(portfolio_paths, sim_config) for portfolio_paths in all_paths]
+
+
+def _propose(
+    rng: np.random.Generator,
+    space: _SearchSpace,
+    points: np.ndarray,
+    objective: np.ndarray,
+    drawdown: np.ndarray,
+    config: OptimizeConfig,
+) -> np.ndarray:
+    # Batch of candidates maximizing expected improvement of the median CAGR
+    # times the probability that the p95 drawdown meets the limit (only the
+    # latter until a feasible candidate is known). Each pick is added to the
+    # surrogates with its predicted values ("kriging believer") so that the
+    # rest of the batch explores elsewhere.
+    limit = config.max_drawdown_p95_limit
+    pool = space.sample(rng, config.candidate_pool)
+    feasible = drawdown <= limit
+    if feasible.any():
+        incumbent = points[feasible][np.argmax(objective[feasible])]
+        pool = np.vstack([pool, space.sample(rng, config.candidate_pool // 2, around=incumbent)])
+    chosen = []
+    for _ in range(min(config.batch_size, len(pool))):
+        mean_y, std_y = GaussianProcess().fit(points, objective).predict(pool)
+        mean_g, std_g = GaussianProcess().fit(points, drawdown).predict(pool)
+        score = probability_below(mean_g, std_g, limit)
+        feasible = drawdown <= limit
+        if feasible.any():
+            score = score * expected_improvement(mean_y, std_y, objective[feasible].max())
+        index = int(np.argmax(score))
+        chosen.append(pool[index])
+        points = np.vstack([points, pool[index]])
+        objective = np.append(objective, mean_y[index])
+        drawdown = np.append(drawdown, mean_g[index])
+        pool = np.delete(pool, index, axis=0)
+    return np.array(chosen)
+
+
+def search_strategies(
+    market_paths: MarketPaths,
+    universe: UniverseConfig,
+    cost_model: CostModelConfig,
+    sim_config: SimulationConfig,
+    optimize_config: OptimizeConfig,
+    workers: int = 1,
+) -> SearchHistory:
+    # Bayesian optimization of the target weights (and vol-targeting
+    # parameters) over fixed market paths: n_initial random candidates, then
+    # n_iterations batches proposed by the Gaussian-process surrogates.
+    known_assets = {asset.id for asset in universe.assets} | {asset.id for asset in universe.leveraged_assets or []}
+    unknown = sorted(set(optimize_config.assets) - known_assets)
+    if unknown:
+        raise ValueError(f"optimize assets not in the universe: {unknown}")
+    space = _SearchSpace(optimize_config)
+    rng = np.random.default_rng(optimize_config.seed)
+    batch_config = sim_config.model_copy(
+        update={
+            "output": sim_config.output.model_copy(
+                update={"save_nav_paths": False, "save_weights_paths": False, "save_turnover_paths": False}
+            )
+        }
+    )
+    limit = optimize_config.max_drawdown_p95_limit
+
+    strategies: List[StrategyConfig] = []
+    summaries: Dict[str, pd.DataFrame] = {}
+    rows = []
+    points = np.empty((0, space.n_assets + len(space.vol_bounds)))
+    objective = np.empty(0)
+    drawdown = np.empty(0)
+    # the paths go to shared memory once for all the batches
+    shared = shared_market_paths(market_paths, sim_config.t_steps) if workers > 1 else nullcontext()
+    with shared as spec:
+        batch_points = space.sample(rng, optimize_config.n_initial)
+        for iteration in range(optimize_config.n_iterations + 1):
+            if iteration > 0:
+                batch_points = _propose(rng, space, points, objective, drawdown, optimize_config)
+            batch = [
+                space.strategy(point, f"{optimize_config.name}_{len(strategies) + offset:03d}")
+                for offset, point in enumerate(batch_points)
+            ]
+            for strategy, point, (_, summary) in zip(
+                batch, batch_points, _evaluate(market_paths, universe, batch, cost_model, batch_config, workers, spec)
+            ):
+                strategies.append(strategy)
+                summaries[strategy.name] = summary
+                cagr_median = summary.loc["median", "cagr"]
+                p95_max_drawdown = summary.loc["p95", "max_drawdown"]
+                rows.append(
+                    {
+                        "iteration": iteration,
+                        "strategy": strategy.name,
+                        **{f"weight_{asset}": weight for asset, weight in strategy.target_weights.items()},
+                        **space.parameters(point),
+                        "cagr_median": cagr_median,
+                        "p95_max_drawdown": p95_max_drawdown,
+                        "median_es_95": summary.loc["median", "es_95"],
+                        "feasible": p95_max_drawdown <= limit,
+                    }
+                )
+                points = np.vstack([points, point])
+                objective = np.append(objective, cagr_median)
+                drawdown = np.append(drawdown, p95_max_drawdown)
+    return SearchHistory(strategies=strategies, summaries=summaries, evaluations=pd.DataFrame(rows))
+
+
+def optimize_strategy(
+    base_path: Path,
+    universe_path: Path,
+    cost_path: Path,
+    market_path: Path,
+    optimize_path: Path,
+    workers: int = 1,
+    use_cache: bool = True,
+) -> OptimizationResult:
+    sim_config = load_simulation(base_path)
+    universe = load_universe(universe_path)
+    cost_model = load_cost_model(cost_path)
+    market_config = load_market_model(market_path)
+    optimize_config = load_optimize(optimize_path)
+
+    model = _market_model_from_config(market_config)
+    fitted = model.fit(universe, market_config, sim_config)
+    # the paths are sampled once and reused by every batch: memory-mapped
+    # from the cache, or materialized when the cache is off
+    cache = MarketPathCache.from_config(sim_config) if use_cache else None
+    market_paths = sample_or_load(model, fitted, universe, sim_config, cache)
+    if cache is None:
+        market_paths = concat_market_paths(market_paths, sim_config.t_steps)
+
+    history = search_strategies(market_paths, universe, cost_model, sim_config, optimize_config, workers=workers)
+    limit = optimize_config.max_drawdown_p95_limit
+    ranking = select_ranking(history.summaries, max_drawdown_p95_limit=limit)
+    best_name = ranking["strategy"].iloc[0] if ranking["ranking"].notna().any() else None
+    best = next((strategy for strategy in history.strategies if strategy.name == best_name), None)
+
+    output_dir = Path(sim_config.output.base_dir) / f"{pd.Timestamp.utcnow():%Y%m%d_%H%M%S}_optimize_{sim_config.run_name}"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    history.evaluations.to_csv(output_dir / "evaluations.csv", index=False)
+    if best is not None:
+        output_dir.joinpath("best_strategy.yaml").write_text(
+            yaml.safe_dump(best.model_dump(), sort_keys=False), encoding="utf-8"
+        )
+    plots_dir = output_dir / "plots"
+    plots_dir.mkdir(exist_ok=True)
+    plot_optimization_progress(history.evaluations, plots_dir / "optimization_progress.png")
+    write_optimization_report(
+        output_dir,
+        history.evaluations,
+        ranking,
+        pareto_set(history.summaries),
+        best,
+        optimize_config.model_dump(),
+        sim_config.model_dump(),
+    )
+    return OptimizationResult(output_dir=output_dir, evaluations=history.evaluations, best_strategy=best)
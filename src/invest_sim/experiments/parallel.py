@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from invest_sim.config.schemas import (
+    CostModelConfig,
+    MarketPaths,
+    PortfolioPaths,
+    SimulationConfig,
+    StrategyConfig,
+    UniverseConfig,
+)
+from invest_sim.market.base import BuyAndHoldGrowth, FittedMarketModel, MarketModel
+from invest_sim.market.cache import MarketPathCache, sample_or_load
+from invest_sim.metrics import compute_metrics, precision_errors
+from invest_sim.metrics.accumulator import NavSummary
+from invest_sim.portfolio import simulate_portfolio, simulate_strategies
+
+# shard size used by --workers when the configuration does not set shard_paths
+DEFAULT_SHARD_PATHS = 1000
+
+
+def shard_configs(sim_config: SimulationConfig, shard_paths: int) -> List[SimulationConfig]:
+    # Shard i simulates up to shard_paths paths with its own seed, taken from
+    # the i-th child of SeedSequence(seed). The result only depends on seed
+    # and shard size, never on how many workers run the shards.
+    if sim_config.sampler == "sobol":
+        raise ValueError("the sobol sampler draws all paths at once and cannot be sharded")
+    n_shards = math.ceil(sim_config.n_paths / shard_paths)
+    children = np.random.SeedSequence(sim_config.seed).spawn(n_shards)
+    configs = []
+    for index, child in enumerate(children):
+        n_paths = min(shard_paths, sim_config.n_paths - index * shard_paths)
+        seed = int(child.generate_state(1, np.uint64)[0])
+        configs.append(sim_config.model_copy(update={"n_paths": n_paths, "seed": seed, "shard_paths": None}))
+    return configs
+
+
+def _run_shard(
+    task: Tuple[
+        MarketModel,
+        FittedMarketModel,
+        UniverseConfig,
+        StrategyConfig,
+        CostModelConfig,
+        SimulationConfig,
+        Optional[MarketPathCache],
+    ],
+) -> Tuple[PortfolioPaths, pd.DataFrame]:
+    model, fitted, universe, strategy, cost_model, shard_config, cache = task
+    # each shard has its own seed, hence its own cache entry
+    market_paths = sample_or_load(model, fitted, universe, shard_config, cache)
+    growth = None
+    if shard_config.variance_reduction.control_variate:
+        market_paths = growth = BuyAndHoldGrowth(market_paths, shard_config.block_steps)
+    portfolio_paths = simulate_portfolio(market_paths, universe, strategy, cost_model, shard_config)
+    if growth is not None:
+        portfolio_paths.underlying_growth = growth.growth
+    per_path, _ = compute_metrics(portfolio_paths, shard_config)
+    return portfolio_paths, per_path
+
+
+def _concat(arrays: List[Optional[np.ndarray]]) -> Optional[np.ndarray]:
+    if any(array is None for array in arrays):
+        return None
+    return np.concatenate(arrays, axis=-1)
+
+
+def simulate_sharded(
+    model: MarketModel,
+    fitted: FittedMarketModel,
+    universe: UniverseConfig,
+    strategy: StrategyConfig,
+    cost_model: CostModelConfig,
+    sim_config: SimulationConfig,
+    workers: int = 1,
+    cache: Optional[MarketPathCache] = None,
+) -> PortfolioPaths:
+    shard_paths = sim_config.shard_paths or DEFAULT_SHARD_PATHS
+    configs = shard_configs(sim_config, shard_paths)
+    tasks = [(model, fitted, universe, strategy, cost_model, shard_config, cache) for shard_config in configs]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_shard, tasks))
+    else:
+        results = [_run_shard(task) for task in tasks]
+    return _merge_shards(results, configs)
+
+
+def simulate_to_precision(
+    model: MarketModel,
+    fitted: FittedMarketModel,
+    universe: UniverseConfig,
+    strategy: StrategyConfig,
+    cost_model: CostModelConfig,
+    sim_config: SimulationConfig,
+    workers: int = 1,
+    cache: Optional[MarketPathCache] = None,
+) -> Tuple[PortfolioPaths, SimulationConfig, pd.DataFrame]:
+    # The shards of a sharded run capped at n_paths, simulated `workers` at a
+    # time, truncated at the first shard count where the standard error of
+    # every target_precision target is under its tolerance: the result is
+    # the sharded run of those shards whatever the number of workers (extra
+    # shards of the last batch are discarded). Returns the merged paths, the
+    # configuration with that path count, and the achieved precision.
+    precision = sim_config.target_precision
+    configs = shard_configs(sim_config, sim_config.shard_paths or DEFAULT_SHARD_PATHS)
+    results: List[Tuple[PortfolioPaths, pd.DataFrame]] = []
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()
+    with pool:
+        while len(results) < len(configs):
+            checked = len(results)
+            batch = configs[checked : checked + workers]
+            tasks = [(model, fitted, universe, strategy, cost_model, shard_config, cache) for shard_config in batch]
+            results.extend(pool.map(_run_shard, tasks) if workers > 1 else map(_run_shard, tasks))
+            # the stopping rule is evaluated shard by shard, in shard order
+            for n_shards in range(checked + 1, len(results) + 1):
+                n_paths = sum(config.n_paths for config in configs[:n_shards])
+                achieved = sim_config.model_copy(update={"n_paths": n_paths})
+                per_path = pd.concat([metrics for _, metrics in results[:n_shards]], ignore_index=True)
+                errors = precision_errors(per_path, precision.targets, achieved, precision.method)
+                if errors["met"].all():
+                    return _merge_shards(results[:n_shards], configs[:n_shards]), achieved, errors
+    return _merge_shards(results, configs), achieved, errors
+
+
+def _merge_shards(results: List[Tuple[PortfolioPaths, pd.DataFrame]], configs: List[SimulationConfig]) -> PortfolioPaths:
+    # shard outputs in shard order, as one set of portfolio paths
+    shards = [paths for paths, _ in results]
+    per_path = pd.concat([metrics for _, metrics in results], ignore_index=True)
+    nav_quantiles = None
+    if shards[0].nav is None and shards[0].nav_summary.nav_quantiles is not None:
+        # per-day quantiles cannot be merged exactly without the paths; the
+        # fan chart uses the path-weighted mean of the shard quantiles
+        sizes = np.array([config.n_paths for config in configs], dtype=float)
+        stacked = np.stack([paths.nav_summary.nav_quantiles for paths in shards])
+        nav_quantiles = np.tensordot(sizes / sizes.sum(), stacked, axes=1)
+    return PortfolioPaths(
+        nav=_concat([paths.nav for paths in shards]),
+        asset_ids=shards[0].asset_ids,
+        weights=_concat([paths.weights for paths in shards]),
+        turnover=_concat([paths.turnover for paths in shards]),
+        nav_summary=NavSummary(per_path=per_path, nav_quantiles=nav_quantiles),
+        underlying_growth=_concat([paths.underlying_growth for paths in shards]),
+    )
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    # enough to re-attach a shared-memory block (or, with path=True, a
+    # memory-mapped .npy file) as a NumPy array in a worker
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+    path: bool = False
+
+
+@dataclass(frozen=True)
+class SharedMarketPaths:
+    returns: SharedArray
+    asset_ids: List[str]
+    regime: Optional[SharedArray] = None
+    # workers only read the first n_paths paths (racing budgets)
+    n_paths: Optional[int] = None
+
+
+def _create_shared(shape: Tuple[int, ...], dtype: np.dtype) -> Tuple[SharedMemory, np.ndarray, SharedArray]:
+    size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+    memory = SharedMemory(create=True, size=size)
+    array = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+    return memory, array, SharedArray(name=memory.name, shape=shape, dtype=np.dtype(dtype).str)
+
+
+def _cached_spec(market_paths: MarketPaths) -> Optional[SharedMarketPaths]:
+    # paths loaded from the market cache are already shareable: workers map
+    # the same .npy files and read them through the page cache
+    arrays = [market_paths.returns] if market_paths.regime is None else [market_paths.returns, market_paths.regime]
+    if not all(isinstance(array, np.memmap) and array.filename for array in arrays):
+        return None
+    specs = [SharedArray(name=str(array.filename), shape=array.shape, dtype=array.dtype.str, path=True) for array in arrays]
+    return SharedMarketPaths(returns=specs[0], asset_ids=market_paths.asset_ids, regime=specs[1] if len(specs) > 1 else None)
+
+
+@contextmanager
+def shared_market_paths(
+    market_paths: Union[MarketPaths, Iterable[MarketPaths]], t_steps: int
+) -> Iterator[SharedMarketPaths]:
+    # Streamed blocks are written straight into shared memory, so the paths
+    # exist once in RAM whatever the number of workers; released on exit.
+    if isinstance(market_paths, MarketPaths):
+        spec = _cached_spec(market_paths)
+        if spec is not None:
+            yield spec
+            return
+        market_paths = [market_paths]
+    blocks = market_paths
+    memories: List[SharedMemory] = []
+    returns = None
+    regime = None
+    spec = None
+    offset = 0
+    try:
+        for block in blocks:
+            length = block.returns.shape[0]
+            if returns is None:
+                _, n_assets, n_paths = block.returns.shape
+                memory, returns, returns_spec = _create_shared((t_steps, n_assets, n_paths), block.returns.dtype)
+                memories.append(memory)
+                regime_spec = None
+                if block.regime is not None:
+                    memory, regime, regime_spec = _create_shared((t_steps, n_paths), block.regime.dtype)
+                    memories.append(memory)
+                spec = SharedMarketPaths(returns=returns_spec, asset_ids=list(block.asset_ids), regime=regime_spec)
+            returns[offset : offset + length] = block.returns
+            if regime is not None:
+                regime[offset : offset + length] = block.regime
+            offset += length
+        if spec is None or offset != t_steps:
+            raise ValueError(f"expected {t_steps} steps of market paths, got {offset}")
+        # the parent never reads the paths again: drop its views so the
+        # blocks can be closed
+        returns = regime = None
+        yield spec
+    finally:
+        returns = regime = None
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+
+def path_prefix(market_paths: MarketPaths, n_paths: int) -> MarketPaths:
+    # views on the first n_paths paths: nested samples of the same draws
+    return MarketPaths(
+        returns=market_paths.returns[:, :, :n_paths],
+        asset_ids=market_paths.asset_ids,
+        regime=None if market_paths.regime is None else market_paths.regime[:, :n_paths],
+    )
+
+
+def _attach(shared: SharedArray, memories: List[SharedMemory]) -> np.ndarray:
+    if shared.path:
+        return np.load(shared.name, mmap_mode="r")
+    memory = SharedMemory(name=shared.name)
+    memories.append(memory)
+    return np.ndarray(shared.shape, dtype=shared.dtype, buffer=memory.buf)
+
+
+def _run_strategy_subset(
+    task: Tuple[SharedMarketPaths, UniverseConfig, List[StrategyConfig], CostModelConfig, SimulationConfig],
+) -> List[Tuple[pd.DataFrame, pd.DataFrame]]:
+    spec, universe, strategies, cost_model, sim_config = task
+    memories: List[SharedMemory] = []
+    try:
+        # zero-copy views on the parent's blocks
+        market_paths = MarketPaths(
+            returns=_attach(spec.returns, memories),
+            asset_ids=spec.asset_ids,
+            regime=None if spec.regime is None else _attach(spec.regime, memories),
+        )
+        if spec.n_paths is not None:
+            market_paths = path_prefix(market_paths, spec.n_paths)
+        all_paths = simulate_strategies(market_paths, universe, strategies, cost_model, sim_config)
+        del market_paths
+        return [compute_metrics(portfolio_paths, sim_config) for portfolio_paths in all_paths]
+    finally:
+        for memory in memories:
+            memory.close()
+
+
+def simulate_strategies_shared(
+    market_paths: Union[MarketPaths, Iterable[MarketPaths]],
+    universe: UniverseConfig,
+    strategies: List[StrategyConfig],
+    cost_model: CostModelConfig,
+    sim_config: SimulationConfig,
+    workers: int,
+) -> List[Tuple[pd.DataFrame, pd.DataFrame]]:
+    # Each worker simulates a contiguous subset of the strategies on the same
+    # shared market paths; only the per-path and summary metric frames are
+    # sent back, in the order of `strategies`.
+    with shared_market_paths(market_paths, sim_config.t_steps) as spec:
+        return simulate_on_shared_paths(spec, universe, strategies, cost_model, sim_config, workers)
+
+
+def simulate_on_shared_paths(
+    spec: SharedMarketPaths,
+    universe: UniverseConfig,
+    strategies: List[StrategyConfig],
+    cost_model: CostModelConfig,
+    sim_config: SimulationConfig,
+    workers: int,
+) -> List[Tuple[pd.DataFrame, pd.DataFrame]]:
+    # for callers running several passes over paths shared once
+    n_subsets = min(workers, len(strategies))
+    bounds = np.linspace(0, len(strategies), n_subsets + 1).round().astype(int)
+    tasks = [
+        (spec, universe, strategies[start:stop], cost_model, sim_config)
+        for start, stop in zip(bounds[:-1], bounds[1:])
+    ]
+    with ProcessPoolExecutor(max_workers=n_subsets) as pool:
+        results = list(pool.map(_run_strategy_subset, tasks))
+    return [metrics for subset in results for metrics in subset]
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from contextlib import nullcontext
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from invest_sim.config.schemas import (
+    CostModelConfig,
+    MarketPaths,
+    RacingConfig,
+    SimulationConfig,
+    StrategyConfig,
+    UniverseConfig,
+)
+from invest_sim.experiments.parallel import path_prefix, shared_market_paths, simulate_on_shared_paths
+from invest_sim.metrics import (
+    bootstrap_indices,
+    bootstrap_quantiles,
+    compute_metrics,
+    pareto_set,
+    summarize_metrics,
+)
+from invest_sim.metrics.compute import BOOTSTRAP_RESAMPLES
+from invest_sim.portfolio import simulate_strategies
+
+
+@dataclass
+class RaceResult:
+    # full-budget metrics of the survivors, and one row per raced strategy
+    metrics: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]
+    rounds: pd.DataFrame
+
+
+def race_budgets(n_paths: int, racing: RacingConfig, antithetic: bool = False) -> List[int]:
+    # path budgets of the successive rounds, the last one being all paths;
+    # antithetic pairs are never split
+    budgets = []
+    budget = racing.initial_paths
+    while budget < n_paths:
+        budgets.append(budget - budget % 2 if antithetic else budget)
+        budget *= racing.growth
+    budgets.append(n_paths)
+    return budgets
+
+
+def _dominating(
+    per_paths: List[pd.DataFrame],
+    frontier: List[int],
+    n_raced: int,
+    indices: np.ndarray,
+    confidence: float,
+) -> np.ndarray:
+    # For each raced strategy off the frontier, a frontier strategy whose
+    # median CAGR is higher and p95 max drawdown lower at the confidence
+    # level, from the paired bootstrap of the differences (-1 if none): the
+    # strategy is then off the Pareto set and never ranks above it.
+    cagr = bootstrap_quantiles(np.column_stack([p["cagr"] for p in per_paths]), 0.5, indices)
+    drawdown = bootstrap_quantiles(np.column_stack([p["max_drawdown"] for p in per_paths]), 0.95, indices)
+    tail = (1.0 - confidence) / 2.0
+    cagr_gain = np.quantile(cagr[:, None, frontier] - cagr[:, :n_raced, None], tail, axis=0)
+    drawdown_gain = np.quantile(drawdown[:, None, frontier] - drawdown[:, :n_raced, None], 1.0 - tail, axis=0)
+    dominates = (cagr_gain > 0.0) & (drawdown_gain < 0.0)
+    return np.where(dominates.any(axis=1), np.asarray(frontier)[dominates.argmax(axis=1)], -1)
+
+
+def race_strategies(
+    market_paths: MarketPaths,
+    universe: UniverseConfig,
+    strategies: List[StrategyConfig],
+    cost_model: CostModelConfig,
+    sim_config: SimulationConfig,
+    workers: int = 1,
+    finished: Optional[Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]] = None,
+) -> RaceResult:
+    # Successive halving over nested path prefixes of the same sample: every
+    # round simulates the surviving strategies on the first `budget` paths
+    # and drops those dominated with confidence by a strategy of the Pareto
+    # set, raced or `finished` (metrics already computed on all paths, of
+    # which the same prefix is used). The survivors of the last round have
+    # run on all paths, with the metrics a plain comparison would give.
+    finished = finished or {}
+    racing = sim_config.racing
+    budgets = race_budgets(sim_config.n_paths, racing, sim_config.variance_reduction.antithetic)
+    rng = np.random.default_rng(sim_config.seed)
+
+    alive = list(range(len(strategies)))
+    rows: Dict[int, dict] = {}
+    metrics: Dict[str, Tuple[pd.DataFrame, pd.DataFrame]] = {}
+    # the paths go to shared memory once for all the rounds
+    shared = shared_market_paths(market_paths, sim_config.t_steps) if workers > 1 else nullcontext()
+    with shared as spec:
+        round_index = 0
+        while alive:
+            # a lone survivor has nothing left to race against
+            budget = budgets[round_index] if len(alive) > 1 or finished else budgets[-1]
+            last = budget == budgets[-1]
+            round_config = sim_config.model_copy(update={"n_paths": budget})
+            batch = [strategies[index] for index in alive]
+            if spec is not None and len(batch) > 1:
+                results = simulate_on_shared_paths(
+                    replace(spec, n_paths=budget), universe, batch, cost_model, round_config, workers
+                )
+            else:
+                all_paths = simulate_strategies(
+                    path_prefix(market_paths, budget), universe, batch, cost_model, round_config
+                )
+                results = [compute_metrics(portfolio_paths, round_config) for portfolio_paths in all_paths]
+
+            dominating = np.full(len(batch), -1)
+            names = [strategy.name for strategy in batch] + list(finished)
+            if not last:
+                per_paths = [per_path for per_path, _ in results]
+                per_paths += [per_path.iloc[:budget] for per_path, _ in finished.values()]
+                frontier = pareto_set({name: summarize_metrics(p) for name, p in zip(names, per_paths)})
+                frontier_positions = [names.index(name) for name in frontier["strategy"]]
+                indices = bootstrap_indices(budget, BOOTSTRAP_RESAMPLES, rng, sim_config)
+                dominating = _dominating(per_paths, frontier_positions, len(batch), indices, racing.confidence)
+
+            survivors = []
+            for position, (index, (per_path, summary)) in enumerate(zip(alive, results)):
+                eliminated = dominating[position] >= 0
+                rows[index] = {
+                    "strategy": strategies[index].name,
+                    "rounds": round_index + 1,
+                    "n_paths": budget,
+                    "eliminated_round": round_index + 1 if eliminated else None,
+                    "dominated_by": names[dominating[position]] if eliminated else None,
+                    "cagr_median": summary.loc["median", "cagr"],
+                    "p95_max_drawdown": summary.loc["p95", "max_drawdown"],
+                }
+                if last:
+                    metrics[strategies[index].name] = (per_path, summary)
+                elif not eliminated:
+                    survivors.append(index)
+            alive = [] if last else survivors
+            round_index += 1
+    return RaceResult(metrics=metrics, rounds=pd.DataFrame([rows[index] for index in range(len(strategies))]))
@@ -2,21 +2,33 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 from invest_sim.config import load_cost_model, load_market_model, load_simulation, load_strategy, load_universe
-from invest_sim.config.schemas import MarketModelConfig, PortfolioPaths
+from invest_sim.config.schemas import (
+    MarketModelConfig,
+    PortfolioPaths,
+    SimulationConfig,
+    StrategyConfig,
+    UniverseConfig,
+)
+from invest_sim.experiments.parallel import simulate_sharded, simulate_to_precision
+from invest_sim.market.base import BuyAndHoldGrowth, FittedMarketModel, MarketModel
+from invest_sim.market.cache import MarketPathCache, sample_or_load
 from invest_sim.market.gbm import GBMModel
+from invest_sim.market.leveraged import build_return_expansion
 from invest_sim.market.regimes import RegimeSwitchingModel
 from invest_sim.market.student_t import StudentTModel
-from invest_sim.metrics import compute_metrics, pareto_set, select_ranking
+from invest_sim.metrics import compute_metrics, horizon_summary, pareto_set, select_ranking, standard_errors
+from invest_sim.metrics.compute import METRICS
 from invest_sim.portfolio import simulate_portfolio
 from invest_sim.reporting import (
     plot_cdf,
     plot_nav_fanchart,
+    plot_nav_quantiles,
     plot_scatter_cagr_vs_dd,
     write_report,
 )
@@ -28,6 +40,7 @@ class RunResult:
     portfolio_paths: PortfolioPaths
     metrics_per_path: pd.DataFrame
     metrics_summary: pd.DataFrame
+    metrics_by_horizon: Optional[pd.DataFrame] = None
 
 
 def _market_model_from_config(config: MarketModelConfig):
@@ -47,12 +60,39 @@ def _snapshot_configs(output_dir: Path, config_paths: List[Path]) -> None:
         snapshot_dir.joinpath(path.name).write_text(path.read_text(encoding="utf-8"), encoding="utf-8")
 
 
+def _standard_errors(
+    model: MarketModel,
+    fitted: FittedMarketModel,
+    universe: UniverseConfig,
+    strategy: StrategyConfig,
+    portfolio_paths: PortfolioPaths,
+    metrics_per_path: pd.DataFrame,
+    sim_config: SimulationConfig,
+) -> Optional[pd.DataFrame]:
+    variance_reduction = sim_config.variance_reduction
+    if not (variance_reduction.antithetic or variance_reduction.control_variate or sim_config.sampler == "sobol"):
+        return None
+    control = None
+    expected_control = None
+    if portfolio_paths.underlying_growth is not None:
+        # control: buy-and-hold of the strategy's exposure to each underlying
+        # (leverage included), whose expectation the market model knows
+        expansion = build_return_expansion(universe, fitted.asset_ids, sim_config.steps_per_year)
+        weights = np.array([strategy.target_weights.get(asset_id, 0.0) for asset_id in expansion.asset_ids])
+        exposure = expansion.matrix.T @ weights
+        control = exposure @ portfolio_paths.underlying_growth
+        expected_control = float(exposure @ model.expected_growth(fitted, sim_config.t_steps))
+    return standard_errors(metrics_per_path, sim_config, control, expected_control)
+
+
 def run_experiment(
     base_path: Path,
     universe_path: Path,
     cost_path: Path,
     market_path: Path,
     strategy_path: Path,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
 ) -> RunResult:
     sim_config = load_simulation(base_path)
     universe = load_universe(universe_path)
@@ -62,10 +102,37 @@ def run_experiment(
 
     model = _market_model_from_config(market_config)
     fitted = model.fit(universe, market_config, sim_config)
-    market_paths = model.sample_paths(fitted, sim_config)
-    portfolio_paths = simulate_portfolio(market_paths, universe, strategy, cost_model, sim_config)
+    cache = MarketPathCache.from_config(sim_config) if use_cache else None
+    precision = None
+    if sim_config.target_precision.enabled:
+        # shards are added until the target standard errors are met; the
+        # rest of the run sees the path count actually simulated
+        portfolio_paths, sim_config, precision = simulate_to_precision(
+            model, fitted, universe, strategy, cost_model, sim_config, workers or 1, cache
+        )
+    elif workers is not None or sim_config.shard_paths is not None:
+        # paths are split into seed-derived shards, optionally run in a process
+        # pool; any worker count shards the same way, so that it never changes
+        # the paths (--workers 1 included)
+        portfolio_paths = simulate_sharded(
+            model, fitted, universe, strategy, cost_model, sim_config, workers or 1, cache
+        )
+    else:
+        market_paths = sample_or_load(model, fitted, universe, sim_config, cache)
+        growth = None
+        if sim_config.variance_reduction.control_variate:
+            market_paths = growth = BuyAndHoldGrowth(market_paths, sim_config.block_steps)
+        portfolio_paths = simulate_portfolio(market_paths, universe, strategy, cost_model, sim_config)
+        if growth is not None:
+            portfolio_paths.underlying_growth = growth.growth
 
     metrics_per_path, metrics_summary = compute_metrics(portfolio_paths, sim_config)
+    by_horizon = None
+    if sim_config.horizons_years:
+        # the shorter horizons only appear in their own table
+        by_horizon = horizon_summary(metrics_summary, sim_config)
+        metrics_summary = metrics_summary[list(METRICS)]
+    errors = _standard_errors(model, fitted, universe, strategy, portfolio_paths, metrics_per_path, sim_config)
 
     output_dir = Path(sim_config.output.base_dir) / f"{pd.Timestamp.utcnow():%Y%m%d_%H%M%S}_{sim_config.run_name}"
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -81,10 +148,19 @@ def run_experiment(
 
     metrics_per_path.to_csv(output_dir / "metrics_per_path.csv", index=False)
     metrics_summary.to_csv(output_dir / "metrics_summary.csv")
+    if errors is not None:
+        errors.to_csv(output_dir / "standard_errors.csv")
+    if precision is not None:
+        precision.to_csv(output_dir / "precision.csv", index=False)
+    if by_horizon is not None:
+        by_horizon.to_csv(output_dir / "metrics_by_horizon.csv")
 
     plots_dir = output_dir / "plots"
     plots_dir.mkdir(exist_ok=True)
-    plot_nav_fanchart(portfolio_paths.nav, plots_dir / "nav_fanchart.png")
+    if portfolio_paths.nav is not None:
+        plot_nav_fanchart(portfolio_paths.nav, plots_dir / "nav_fanchart.png")
+    else:
+        plot_nav_quantiles(portfolio_paths.nav_summary.nav_quantiles, plots_dir / "nav_fanchart.png")
     plot_cdf(
         metrics_per_path["final_value"].values,
         "Final value CDF",
@@ -116,6 +192,9 @@ def run_experiment(
         metrics_summary,
         ranking,
         pareto,
+        standard_errors=errors,
+        precision=precision,
+        by_horizon=by_horizon,
     )
 
     return RunResult(
@@ -123,4 +202,5 @@ def run_experiment(
         portfolio_paths=portfolio_paths,
         metrics_per_path=metrics_per_path,
         metrics_summary=metrics_summary,
+        metrics_by_horizon=by_horizon,
     )
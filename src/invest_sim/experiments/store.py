@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from invest_sim import __version__
+from invest_sim.config.schemas import CostModelConfig, SimulationConfig, StrategyConfig
+
+# bump when the stored frames or the way metrics are computed change
+STORE_VERSION = 1
+
+
+def strategy_result_key(
+    strategy: StrategyConfig,
+    cost_model: CostModelConfig,
+    sim_config: SimulationConfig,
+    market_key: str,
+) -> str:
+    # the strategy, costs and simulation settings plus the identity of the
+    # market paths (see market_cache_key); output options, racing and the
+    # run-only target precision do not change the metrics of a strategy run
+    # on all paths and are left out (horizons_years adds per-path columns
+    # and stays in)
+    content = {
+        "version": STORE_VERSION,
+        "package_version": __version__,
+        "strategy": strategy.model_dump(mode="json"),
+        "cost_model": cost_model.model_dump(mode="json"),
+        "simulation": sim_config.model_dump(mode="json", exclude={"output", "run_name", "shard_paths", "racing", "target_precision"}),
+        "market": market_key,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    # Per-strategy compare results (per-path metrics and summary), one
+    # directory per key, so that compare only simulates new or edited
+    # strategies.
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    @classmethod
+    def from_config(cls, sim_config: SimulationConfig) -> Optional["ResultStore"]:
+        # no store for an unseeded run: its metrics come from fresh paths
+        if sim_config.seed is None:
+            return None
+        output = sim_config.output
+        return cls(Path(output.result_store_dir) if output.result_store_dir else Path(output.base_dir) / ".compare_store")
+
+    def load(self, key: str) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+        entry = self.root / key
+        if not (entry / "summary.pkl").exists():
+            return None
+        return pd.read_pickle(entry / "per_path.pkl"), pd.read_pickle(entry / "summary.pkl")
+
+    def save(self, key: str, per_path: pd.DataFrame, summary: pd.DataFrame) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = self.root / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        try:
+            per_path.to_pickle(staging / "per_path.pkl")
+            summary.to_pickle(staging / "summary.pkl")
+            shutil.rmtree(self.root / key, ignore_errors=True)
+            os.rename(staging, self.root / key)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def clear(self) -> int:
+        # drop every stored result; returns the number of entries removed
+        if not self.root.exists():
+            return 0
+        entries = [entry for entry in self.root.iterdir() if entry.is_dir()]
+        for entry in entries:
+            shutil.rmtree(entry, ignore_errors=True)
+        return sum(1 for entry in entries if not entry.name.startswith("."))
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# grids searched by marginal likelihood; inputs live in the unit cube
+LENGTH_SCALES = (0.05, 0.1, 0.2, 0.4, 0.8, 1.6)
+NOISE_LEVELS = (1e-6, 1e-4, 1e-2)
+
+_erfc = np.vectorize(math.erfc, otypes=[float])
+
+
+def _normal_cdf(z: np.ndarray) -> np.ndarray:
+    return 0.5 * _erfc(-np.asarray(z) / math.sqrt(2.0))
+
+
+def _normal_pdf(z: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * np.asarray(z) ** 2) / math.sqrt(2.0 * math.pi)
+
+
+def _matern52(a: np.ndarray, b: np.ndarray, length_scale: float) -> np.ndarray:
+    sq_dist = (a**2).sum(axis=1)[:, None] + (b**2).sum(axis=1)[None, :] - 2.0 * a @ b.T
+    scaled = math.sqrt(5.0) * np.sqrt(np.maximum(sq_dist, 0.0)) / length_scale
+    return (1.0 + scaled + scaled**2 / 3.0) * np.exp(-scaled)
+
+
+class GaussianProcess:
+    # Zero-mean Gaussian-process regression on standardized targets with a
+    # Matern 5/2 kernel. The length scale and the noise level are picked on
+    # small grids by marginal likelihood at each fit.
+
+    def __init__(
+        self,
+        length_scales: Sequence[float] = LENGTH_SCALES,
+        noise_levels: Sequence[float] = NOISE_LEVELS,
+    ) -> None:
+        self.length_scales = tuple(length_scales)
+        self.noise_levels = tuple(noise_levels)
+        self.length_scale: Optional[float] = None
+        self.noise: Optional[float] = None
+
+    def fit(self, x: np.ndarray, y: np.ndarray) -> "GaussianProcess":
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self._offset = y.mean()
+        self._scale = y.std() if y.std() > 0 else 1.0
+        targets = (y - self._offset) / self._scale
+        best = None
+        for length_scale in self.length_scales:
+            kernel = _matern52(x, x, length_scale)
+            for noise in self.noise_levels:
+                try:
+                    chol = np.linalg.cholesky(kernel + noise * np.eye(len(x)))
+                except np.linalg.LinAlgError:
+                    continue
+                alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, targets))
+                log_likelihood = -0.5 * targets @ alpha - np.log(np.diag(chol)).sum()
+                if best is None or log_likelihood > best[0]:
+                    best = (log_likelihood, length_scale, noise, chol, alpha)
+        if best is None:
+            raise ValueError("no kernel on the grid gives a positive definite covariance")
+        _, self.length_scale, self.noise, self._chol, self._alpha = best
+        self._x = x
+        return self
+
+    def predict(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # posterior mean and standard deviation of the latent function
+        cross = _matern52(np.asarray(x, dtype=np.float64), self._x, self.length_scale)
+        mean = cross @ self._alpha
+        solved = np.linalg.solve(self._chol, cross.T)
+        variance = np.maximum(1.0 - (solved**2).sum(axis=0), 1e-12)
+        return self._offset + self._scale * mean, self._scale * np.sqrt(variance)
+
+
+def expected_improvement(mean: np.ndarray, std: np.ndarray, best: float) -> np.ndarray:
+    # for maximization
+    z = (mean - best) / std
+    return (mean - best) * _normal_cdf(z) + std * _normal_pdf(z)
+
+
+def probability_below(mean: np.ndarray, std: np.ndarray, limit: float) -> np.ndarray:
+    return _normal_cdf((limit - mean) / std)
+
+
+def sample_capped_simplex(
+    rng: np.random.Generator,
+    n_samples: int,
+    caps: np.ndarray,
+    concentration: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    # Dirichlet draws (flat by default) moved inside the per-coordinate caps:
+    # the excess above a cap goes to the other coordinates in proportion to
+    # their room, which keeps the sum at one in a single pass as long as the
+    # caps sum to at least one
+    caps = np.asarray(caps, dtype=np.float64)
+    alpha = np.ones(len(caps)) if concentration is None else np.asarray(concentration, dtype=np.float64)
+    weights = rng.dirichlet(alpha, size=n_samples)
+    excess = np.maximum(weights - caps, 0.0).sum(axis=1, keepdims=True)
+    weights = np.minimum(weights, caps)
+    room = caps - weights
+    total_room = room.sum(axis=1, keepdims=True)
+    weights += np.divide(excess * room, total_room, out=np.zeros_like(room), where=total_room > 0)
+    return weights
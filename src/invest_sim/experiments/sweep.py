@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Collection, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from invest_sim.config import (
+    check_time_step,
+    load_cost_model,
+    load_market_model,
+    load_simulation,
+    load_strategy,
+    load_sweep,
+    load_universe,
+)
+from invest_sim.config.schemas import (
+    CostModelConfig,
+    MarketModelConfig,
+    SimulationConfig,
+    StrategyConfig,
+    SweepCaseConfig,
+    SweepConfig,
+    UniverseConfig,
+)
+from invest_sim.experiments.run import _market_model_from_config
+from invest_sim.market.base import MarketModel
+from invest_sim.metrics import bootstrap_indices, bootstrap_quantiles, compute_metrics
+from invest_sim.metrics.compute import BOOTSTRAP_RESAMPLES, STATISTIC_LEVELS
+from invest_sim.portfolio import simulate_portfolio
+from invest_sim.reporting import write_sweep_report
+
+# statistics compared across the cases
+SWEEP_STATISTICS = (
+    ("cagr", "median"),
+    ("max_drawdown", "p95"),
+    ("es_95", "median"),
+    ("final_value", "mean"),
+)
+
+
+@dataclass
+class SweepResult:
+    output_dir: Path
+    table: pd.DataFrame
+
+
+def apply_case(
+    universe: UniverseConfig,
+    market_config: MarketModelConfig,
+    case: SweepCaseConfig,
+) -> Tuple[UniverseConfig, MarketModelConfig]:
+    # the configs of a sweep case, revalidated after the overrides
+    unknown = sorted(set(case.assets) - {asset.id for asset in universe.assets})
+    if unknown:
+        raise ValueError(f"sweep case {case.name!r}: assets not in the universe: {unknown}")
+    universe_data = universe.model_dump()
+    for asset in universe_data["assets"]:
+        asset.update(case.assets.get(asset["id"], {}))
+    if case.correlations is not None:
+        universe_data["correlations"] = case.correlations.model_dump()
+
+    unknown = sorted(set(case.market) - set(type(market_config).model_fields))
+    if unknown:
+        raise ValueError(f"sweep case {case.name!r}: fields not in the {market_config.model_type} model: {unknown}")
+    market_data = market_config.model_dump()
+    market_data.update(case.market)
+    if case.regimes:
+        regimes = market_data.get("regimes") or []
+        unknown = sorted(set(case.regimes) - {regime["name"] for regime in regimes})
+        if unknown:
+            raise ValueError(f"sweep case {case.name!r}: unknown regimes {unknown}")
+        for regime in regimes:
+            regime.update(case.regimes.get(regime["name"], {}))
+    return UniverseConfig.model_validate(universe_data), type(market_config).model_validate(market_data)
+
+
+def sweep_strategy(
+    model: MarketModel,
+    universe: UniverseConfig,
+    market_config: MarketModelConfig,
+    strategy: StrategyConfig,
+    cost_model: CostModelConfig,
+    sim_config: SimulationConfig,
+    sweep_config: SweepConfig,
+) -> Dict[str, pd.DataFrame]:
+    # Per-path metrics of the strategy for the base case and every sweep
+    # case. The innovations are drawn once, for the base parameters, and each
+    # case only transforms them (common random numbers): the differences
+    # between cases are not blurred by sampling noise. Every case is fitted
+    # before anything is simulated so that a bad override fails early.
+    fitted = model.fit(universe, market_config, sim_config)
+    cases: List[Tuple[str, UniverseConfig, object]] = [("base", universe, fitted)]
+    for case in sweep_config.cases:
+        case_universe, case_market = apply_case(universe, market_config, case)
+        cases.append((case.name, case_universe, model.fit(case_universe, case_market, sim_config)))
+
+    innovations = list(model.iter_innovations(fitted, sim_config))
+    metrics: Dict[str, pd.DataFrame] = {}
+    for name, case_universe, case_fitted in cases:
+        market_paths = model.paths_from_innovations(case_fitted, innovations, sim_config)
+        portfolio_paths = simulate_portfolio(market_paths, case_universe, strategy, cost_model, sim_config)
+        metrics[name] = compute_metrics(portfolio_paths, sim_config)[0]
+    return metrics
+
+
+def unpaired_cases(
+    model: MarketModel,
+    universe: UniverseConfig,
+    market_config: MarketModelConfig,
+    sweep_config: SweepConfig,
+) -> List[str]:
+    # cases that only share part of their random numbers with the base case
+    # (a Student-t df change redraws the chi2 draws)
+    return [
+        case.name
+        for case in sweep_config.cases
+        if model.redraws_innovations(market_config, apply_case(universe, market_config, case)[1])
+    ]
+
+
+def sweep_deltas(
+    per_path_by_case: Dict[str, pd.DataFrame],
+    sim_config: SimulationConfig,
+    unpaired: Collection[str] = (),
+) -> pd.DataFrame:
+    # Each statistic per case, its change from the base case and the
+    # bootstrap standard error of that change: paired (the same resampled
+    # paths in both cases, which share their random numbers) and, for
+    # comparison, as if the two cases had been sampled independently.
+    # Cases of `unpaired` are flagged (paired is False): they share only part
+    # of their random numbers with the base case, so their delta_se is not
+    # the common-random-numbers error the other cases get.
+    base = per_path_by_case["base"]
+    rng = np.random.default_rng(sim_config.seed)
+    indices = bootstrap_indices(len(base), BOOTSTRAP_RESAMPLES, rng, sim_config)
+    rows = []
+    for name, per_path in per_path_by_case.items():
+        for metric, statistic in SWEEP_STATISTICS:
+            values = np.column_stack([base[metric], per_path[metric]])
+            level = STATISTIC_LEVELS[statistic]
+            if level is None:
+                estimates = values.mean(axis=0)
+                replicates = values[indices].mean(axis=1)
+            else:
+                estimates = np.quantile(values, level, axis=0)
+                replicates = bootstrap_quantiles(values, level, indices)
+            rows.append(
+                {
+                    "case": name,
+                    "metric": metric,
+                    "statistic": statistic,
+                    "estimate": estimates[1],
+                    "delta": estimates[1] - estimates[0],
+                    "delta_se": (replicates[:, 1] - replicates[:, 0]).std(ddof=1),
+                    "delta_se_independent": np.sqrt(replicates.var(axis=0, ddof=1).sum()),
+                    "paired": name not in unpaired,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def run_sweep(
+    base_path: Path,
+    universe_path: Path,
+    cost_path: Path,
+    market_path: Path,
+    strategy_path: Path,
+    sweep_path: Path,
+) -> SweepResult:
+    sim_config = load_simulation(base_path)
+    universe = load_universe(universe_path)
+    cost_model = load_cost_model(cost_path)
+    market_config = load_market_model(market_path)
+    strategy = load_strategy(strategy_path)
+    sweep_config = load_sweep(sweep_path)
+    check_time_step(sim_config, universe, strategy)
+
+    model = _market_model_from_config(market_config)
+    per_path_by_case = sweep_strategy(
+        model, universe, market_config, strategy, cost_model, sim_config, sweep_config
+    )
+    table = sweep_deltas(
+        per_path_by_case, sim_config, unpaired_cases(model, universe, market_config, sweep_config)
+    )
+
+    output_dir = Path(sim_config.output.base_dir) / f"{pd.Timestamp.utcnow():%Y%m%d_%H%M%S}_sweep_{sim_config.run_name}"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_dir.joinpath("sweep.yaml").write_text(
+        yaml.safe_dump(sweep_config.model_dump(exclude_none=True), sort_keys=False), encoding="utf-8"
+    )
+    table.to_csv(output_dir / "sweep.csv", index=False)
+    write_sweep_report(output_dir, table, strategy.name, sim_config.model_dump())
+    return SweepResult(output_dir=output_dir, table=table)
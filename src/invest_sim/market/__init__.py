@@ -1,6 +1,18 @@
-from invest_sim.market.base import MarketModel
+from invest_sim.market.base import Innovations, MarketModel
+from invest_sim.market.cache import MarketPathCache, market_cache_key, sample_or_load
+from invest_sim.market.factors import FactorCovariance
 from invest_sim.market.gbm import GBMModel
 from invest_sim.market.regimes import RegimeSwitchingModel
 from invest_sim.market.student_t import StudentTModel
 
-__all__ = ["GBMModel", "MarketModel", "RegimeSwitchingModel", "StudentTModel"]
+__all__ = [
+    "FactorCovariance",
+    "GBMModel",
+    "Innovations",
+    "MarketModel",
+    "MarketPathCache",
+    "RegimeSwitchingModel",
+    "StudentTModel",
+    "market_cache_key",
+    "sample_or_load",
+]
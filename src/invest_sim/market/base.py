@@ -2,22 +2,118 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 
 from invest_sim.config.schemas import MarketModelConfig, MarketPaths, SimulationConfig, UniverseConfig
+from invest_sim.market.factors import Covariance, FactorCovariance
 
 
 @dataclass(frozen=True)
 class FittedMarketModel:
     asset_ids: List[str]
     mu_daily: np.ndarray
-    cov_daily: np.ndarray
+    # dense matrix, or FactorCovariance for universes given as a factor model
+    cov_daily: Covariance
     model_config: MarketModelConfig
     regime_params: Optional[dict] = None
 
 
+@dataclass
+class Innovations:
+    # Standardized draws of one block of steps, before any model parameter
+    # is applied: standard normals, (time, draw, path) or (time, path, draw)
+    # for the regime model, plus per (time, path) the Student-t chi-square
+    # mixing draws (of chi2_df degrees of freedom) and the regime-chain
+    # uniforms. Antithetic partners are derived, not stored.
+    normals: np.ndarray
+    chi2: Optional[np.ndarray] = None
+    chi2_df: Optional[float] = None
+    uniforms: Optional[np.ndarray] = None
+
+
+def _generators(seed: Optional[int], n_streams: int) -> List[np.random.Generator]:
+    # one independent stream per kind of draw so that the sequence of each
+    # stream does not depend on how the horizon is cut into blocks
+    children = np.random.SeedSequence(seed).spawn(n_streams)
+    return [np.random.default_rng(child) for child in children]
+
+
+def _drawn_paths(sim_config: SimulationConfig) -> int:
+    # with antithetic sampling only one path in two gets its own draws
+    return sim_config.n_paths // 2 if sim_config.variance_reduction.antithetic else sim_config.n_paths
+
+
+def _compound_moments(mu_daily: np.ndarray, cov_daily: Covariance, days: float) -> Tuple[np.ndarray, Covariance]:
+    # mean and covariance of the simple return compounded over `days` i.i.d.
+    # daily returns, so that coarse steps keep the expected growth and the
+    # variance of the daily model exactly
+    gross = 1.0 + mu_daily
+    mu_step = gross**days - 1.0
+    if isinstance(cov_daily, FactorCovariance):
+        # exact variances; the factor structure keeps the daily correlations
+        variances = cov_daily.variances()
+        step_variances = (gross**2 + variances) ** days - gross ** (2 * days)
+        return mu_step, cov_daily.scaled(np.sqrt(step_variances / variances))
+    second = (np.outer(gross, gross) + cov_daily) ** days
+    return mu_step, second - np.outer(gross**days, gross**days)
+
+
+def _check_noise_dimension(innovations: Innovations, axis: int, n_draws: int) -> None:
+    if innovations.normals.shape[axis] != n_draws:
+        raise ValueError(
+            f"innovations hold {innovations.normals.shape[axis]} normals per step, the model needs {n_draws}"
+        )
+
+
+def _require_daily_step(sim_config: SimulationConfig, model_name: str) -> None:
+    if sim_config.time_step != "D":
+        raise ValueError(f"the {model_name} model only supports time_step 'D' (got '{sim_config.time_step}')")
+
+
+def _antithetic(draws: np.ndarray, axis: int) -> np.ndarray:
+    # interleaved pairs along the path axis: path 2k takes the k-th draws and
+    # path 2k+1 their negation, so pairs survive any even-sized sharding
+    shape = list(draws.shape)
+    shape[axis] *= 2
+    paired = np.empty(shape, dtype=draws.dtype)
+    even = [slice(None)] * draws.ndim
+    odd = list(even)
+    even[axis] = slice(0, None, 2)
+    odd[axis] = slice(1, None, 2)
+    paired[tuple(even)] = draws
+    np.negative(draws, out=paired[tuple(odd)])
+    return paired
+
+
+def _block_bounds(t_steps: int, block_steps: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, t_steps, block_steps):
+        yield start, min(start + block_steps, t_steps)
+
+
+def concat_market_paths(blocks: Iterable[MarketPaths], t_steps: int) -> MarketPaths:
+    returns = None
+    regime = None
+    asset_ids: List[str] = []
+    offset = 0
+    for block in blocks:
+        length = block.returns.shape[0]
+        if returns is None:
+            _, n_assets, n_paths = block.returns.shape
+            returns = np.empty((t_steps, n_assets, n_paths), dtype=block.returns.dtype)
+            asset_ids = block.asset_ids
+            if block.regime is not None:
+                regime = np.empty((t_steps, n_paths), dtype=block.regime.dtype)
+        returns[offset : offset + length] = block.returns
+        if regime is not None:
+            regime[offset : offset + length] = block.regime
+        offset += length
+    if returns is None or offset != t_steps:
+        raise ValueError(f"expected {t_steps} steps of market paths, got {offset}")
+    return MarketPaths(returns=returns, asset_ids=asset_ids, regime=regime)
+
+
 class MarketModel(ABC):
     @abstractmethod
     def fit(
@@ -29,7 +125,77 @@ class MarketModel(ABC):
         raise NotImplementedError
 
     @abstractmethod
+    def iter_innovations(
+        self,
+        fitted_model: FittedMarketModel,
+        sim_config: SimulationConfig,
+        block_steps: Optional[int] = None,
+    ) -> Iterator[Innovations]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def paths_from_innovations(
+        self,
+        fitted_model: FittedMarketModel,
+        innovations: Iterable[Innovations],
+        sim_config: SimulationConfig,
+    ) -> Iterator[MarketPaths]:
+        # Returns of the fitted parameters from draws made by iter_innovations
+        # with the same simulation config, possibly for other parameters of
+        # the same shape: every parameter set sees the same random numbers.
+        raise NotImplementedError
+
+    def redraws_innovations(self, base_config: MarketModelConfig, case_config: MarketModelConfig) -> bool:
+        # Whether paths_from_innovations for case_config redraws part of the
+        # innovations drawn for base_config instead of transforming them.
+        return False
+
+    def iter_paths(
+        self,
+        fitted_model: FittedMarketModel,
+        sim_config: SimulationConfig,
+        block_steps: Optional[int] = None,
+    ) -> Iterator[MarketPaths]:
+        return self.paths_from_innovations(
+            fitted_model, self.iter_innovations(fitted_model, sim_config, block_steps), sim_config
+        )
+
+    def expected_growth(self, fitted_model: FittedMarketModel, t_steps: int) -> np.ndarray:
+        # E[prod_t (1 + r_t)] of each asset held over t_steps days; daily
+        # returns are independent across days with mean mu_daily
+        return (1.0 + fitted_model.mu_daily) ** t_steps
+
     def sample_paths(
         self, fitted_model: FittedMarketModel, sim_config: SimulationConfig
     ) -> MarketPaths:
-        raise NotImplementedError
+        return concat_market_paths(self.iter_paths(fitted_model, sim_config), sim_config.t_steps)
+
+
+class BuyAndHoldGrowth:
+    # Passes market blocks through unchanged while compounding, for every
+    # path, the growth of one unit held in each asset (the control of the
+    # control-variate estimator).
+
+    def __init__(self, market_paths: Union[MarketPaths, Iterable[MarketPaths]], block_steps: int) -> None:
+        self.market_paths = market_paths
+        self.block_steps = block_steps
+        self.growth: Optional[np.ndarray] = None
+
+    def __iter__(self) -> Iterator[MarketPaths]:
+        if isinstance(self.market_paths, MarketPaths):
+            returns = self.market_paths.returns
+            regime = self.market_paths.regime
+            blocks: Iterable[MarketPaths] = (
+                MarketPaths(
+                    returns=returns[start:stop],
+                    asset_ids=self.market_paths.asset_ids,
+                    regime=None if regime is None else regime[start:stop],
+                )
+                for start, stop in _block_bounds(returns.shape[0], self.block_steps)
+            )
+        else:
+            blocks = self.market_paths
+        for block in blocks:
+            block_growth = np.prod(1.0 + block.returns.astype(np.float64), axis=0)
+            self.growth = block_growth if self.growth is None else self.growth * block_growth
+            yield block
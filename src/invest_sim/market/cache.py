@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+from invest_sim.config.schemas import MarketModelConfig, MarketPaths, SimulationConfig, UniverseConfig
+from invest_sim.market.base import FittedMarketModel, MarketModel
+
+# bump when the layout of an entry or the way paths are sampled changes
+CACHE_VERSION = 1
+
+
+def market_cache_key(
+    universe_config: UniverseConfig,
+    market_model_config: MarketModelConfig,
+    sim_config: SimulationConfig,
+) -> str:
+    # everything the sampled returns depend on, and nothing else: strategies,
+    # costs and rebalancing can change without invalidating the paths
+    content = {
+        "version": CACHE_VERSION,
+        "universe": universe_config.model_dump(mode="json"),
+        "market_model": market_model_config.model_dump(mode="json"),
+        "time_step": sim_config.time_step,
+        "n_years": sim_config.n_years,
+        "trading_days_per_year": sim_config.trading_days_per_year,
+        "n_paths": sim_config.n_paths,
+        "seed": sim_config.seed,
+        "precision": sim_config.precision,
+        "antithetic": sim_config.variance_reduction.antithetic,
+        "sampler": sim_config.sampler,
+        "qmc_replications": sim_config.qmc_replications,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class MarketPathCache:
+    # One directory per key holding returns.npy (and regime.npy), read back
+    # with mmap_mode="r" so concurrent runs share the page cache. Entries are
+    # evicted least recently used first once the total exceeds max_bytes;
+    # the entry just written or read is always kept.
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(cls, sim_config: SimulationConfig) -> Optional["MarketPathCache"]:
+        # no cache for an unseeded run: its paths are drawn afresh every time
+        if sim_config.seed is None:
+            return None
+        output = sim_config.output
+        root = Path(output.market_cache_dir) if output.market_cache_dir else Path(output.base_dir) / ".market_cache"
+        return cls(root, int(output.market_cache_max_gb * 1024**3))
+
+    def load(self, key: str) -> Optional[MarketPaths]:
+        entry = self.root / key
+        if not (entry / "meta.json").exists():
+            return None
+        meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+        returns = np.load(entry / "returns.npy", mmap_mode="r")
+        regime = np.load(entry / "regime.npy", mmap_mode="r") if meta["has_regime"] else None
+        # the directory mtime is the LRU clock
+        os.utime(entry)
+        return MarketPaths(returns=returns, asset_ids=meta["asset_ids"], regime=regime)
+
+    def get_or_sample(
+        self, key: str, sample: Callable[[], Iterable[MarketPaths]], t_steps: int
+    ) -> MarketPaths:
+        cached = self.load(key)
+        if cached is not None:
+            return cached
+        self._store(key, sample(), t_steps)
+        self._evict(keep=key)
+        return self.load(key)
+
+    def _store(self, key: str, blocks: Iterable[MarketPaths], t_steps: int) -> None:
+        # written under a temporary name and renamed, so readers never see a
+        # partial entry and concurrent writers of the same key do not clash
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = self.root / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        returns = None
+        regime = None
+        asset_ids: List[str] = []
+        offset = 0
+        try:
+            for block in blocks:
+                length = block.returns.shape[0]
+                if returns is None:
+                    _, n_assets, n_paths = block.returns.shape
+                    asset_ids = list(block.asset_ids)
+                    returns = np.lib.format.open_memmap(
+                        staging / "returns.npy", mode="w+", dtype=block.returns.dtype, shape=(t_steps, n_assets, n_paths)
+                    )
+                    if block.regime is not None:
+                        regime = np.lib.format.open_memmap(
+                            staging / "regime.npy", mode="w+", dtype=block.regime.dtype, shape=(t_steps, n_paths)
+                        )
+                returns[offset : offset + length] = block.returns
+                if regime is not None:
+                    regime[offset : offset + length] = block.regime
+                offset += length
+            if returns is None or offset != t_steps:
+                raise ValueError(f"expected {t_steps} steps of market paths, got {offset}")
+            returns.flush()
+            if regime is not None:
+                regime.flush()
+            del returns, regime
+            meta = {"asset_ids": asset_ids, "has_regime": (staging / "regime.npy").exists(), "t_steps": t_steps}
+            (staging / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+            try:
+                os.rename(staging, self.root / key)
+            except OSError:
+                # another run stored the same key first
+                if not (self.root / key / "meta.json").exists():
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        for entry in self.root.iterdir():
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            size = sum(path.stat().st_size for path in entry.iterdir() if path.is_file())
+            entries.append((entry.stat().st_mtime, size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def sample_or_load(
+    model: MarketModel,
+    fitted_model: FittedMarketModel,
+    universe_config: UniverseConfig,
+    sim_config: SimulationConfig,
+    cache: Optional[MarketPathCache],
+) -> Union[MarketPaths, Iterator[MarketPaths]]:
+    # streamed blocks without a cache, memory-mapped paths with one; an
+    # unseeded run asks for fresh paths, which no cache entry can hold
+    if cache is None or sim_config.seed is None:
+        return model.iter_paths(fitted_model, sim_config)
+    key = market_cache_key(universe_config, fitted_model.model_config, sim_config)
+    return cache.get_or_sample(key, lambda: model.iter_paths(fitted_model, sim_config), sim_config.t_steps)
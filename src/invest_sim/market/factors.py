@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Union
+
+import numpy as np
+
+from invest_sim.config.schemas import UniverseConfig
+
+
+@dataclass(frozen=True)
+class FactorCovariance:
+    # covariance loadings @ loadings.T + diag(idiosyncratic**2), kept in this
+    # form: correlated draws take n_factors + n_assets normals per path-step
+    # and cost O(n_assets * n_factors)
+    loadings: np.ndarray
+    idiosyncratic: np.ndarray
+
+    @property
+    def n_factors(self) -> int:
+        return self.loadings.shape[1]
+
+    @property
+    def n_draws(self) -> int:
+        return self.loadings.shape[1] + self.loadings.shape[0]
+
+    def variances(self) -> np.ndarray:
+        return np.einsum("ik,ik->i", self.loadings, self.loadings) + self.idiosyncratic**2
+
+    def scaled(self, scale: np.ndarray) -> "FactorCovariance":
+        # diag(scale) @ cov @ diag(scale)
+        scale = np.asarray(scale, dtype=float)
+        return FactorCovariance(self.loadings * scale[:, None], self.idiosyncratic * scale)
+
+    def astype(self, dtype: np.dtype) -> "FactorCovariance":
+        return FactorCovariance(self.loadings.astype(dtype), self.idiosyncratic.astype(dtype))
+
+    def dense(self) -> np.ndarray:
+        # only for small universes and tests
+        return self.loadings @ self.loadings.T + np.diag(self.idiosyncratic**2)
+
+    def correlate(self, normals: np.ndarray, axis: int) -> np.ndarray:
+        # normals hold the factor draws then the idiosyncratic draws along
+        # `axis` (1 for (time, draw, path) blocks, -1 for (..., draw) cells)
+        k = self.n_factors
+        if axis == 1:
+            out = np.einsum("ik,tkp->tip", self.loadings, normals[:, :k])
+            out += self.idiosyncratic[:, None] * normals[:, k:]
+            return out
+        out = normals[..., :k] @ self.loadings.T
+        out += normals[..., k:] * self.idiosyncratic
+        return out
+
+
+Covariance = Union[np.ndarray, FactorCovariance]
+
+
+def asset_correlation(universe_config: UniverseConfig, asset_ids: List[str]) -> Covariance:
+    # correlation of the enabled assets: the dense matrix, or the factor model
+    # normalized to unit variance per asset
+    if universe_config.factor_model is None:
+        asset_order = [asset.id for asset in universe_config.assets]
+        indices = [asset_order.index(asset_id) for asset_id in asset_ids]
+        corr = np.array(universe_config.correlations.matrix)
+        return corr[np.ix_(indices, indices)]
+    factor_model = universe_config.factor_model
+    loadings = np.array([factor_model.loadings[asset_id] for asset_id in asset_ids], dtype=float)
+    idiosyncratic = np.array([factor_model.idiosyncratic_vol[asset_id] for asset_id in asset_ids], dtype=float)
+    factors = FactorCovariance(loadings, idiosyncratic)
+    return factors.scaled(1.0 / np.sqrt(factors.variances()))
+
+
+def scale_correlation(corr: Covariance, sigma: np.ndarray) -> Covariance:
+    if isinstance(corr, FactorCovariance):
+        return corr.scaled(sigma)
+    return np.outer(sigma, sigma) * corr
+
+
+def covariance_root(cov: Covariance) -> Covariance:
+    # what correlate() applies to standard normals: the Cholesky factor of a
+    # dense covariance, the factor structure itself otherwise
+    if isinstance(cov, FactorCovariance):
+        return cov
+    return np.linalg.cholesky(cov)
+
+
+def noise_dimension(root: Covariance) -> int:
+    # standard normals drawn per path-step
+    if isinstance(root, FactorCovariance):
+        return root.n_draws
+    return root.shape[0]
+
+
+def covariance_variances(cov: Covariance) -> np.ndarray:
+    if isinstance(cov, FactorCovariance):
+        return cov.variances()
+    return np.diag(cov)
+
+
+def correlate(root: Covariance, normals: np.ndarray, axis: int) -> np.ndarray:
+    if isinstance(root, FactorCovariance):
+        return root.correlate(normals, axis)
+    if axis == 1:
+        return np.einsum("ij,tjp->tip", root, normals)
+    return normals @ root.T
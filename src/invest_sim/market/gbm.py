@@ -1,9 +1,29 @@
 from __future__ import annotations
 
+from typing import Iterable, Iterator, Optional
+
 import numpy as np
 
 from invest_sim.config.schemas import MarketModelConfig, MarketPaths, SimulationConfig, UniverseConfig
-from invest_sim.market.base import FittedMarketModel, MarketModel
+from invest_sim.market.base import (
+    FittedMarketModel,
+    Innovations,
+    MarketModel,
+    _antithetic,
+    _block_bounds,
+    _check_noise_dimension,
+    _compound_moments,
+    _drawn_paths,
+    _generators,
+)
+from invest_sim.market.factors import (
+    asset_correlation,
+    correlate,
+    covariance_root,
+    noise_dimension,
+    scale_correlation,
+)
+from invest_sim.market.qmc import sobol_normal_blocks
 
 
 class GBMModel(MarketModel):
@@ -15,16 +35,16 @@ class GBMModel(MarketModel):
     ) -> FittedMarketModel:
         asset_ids = market_model_config.enabled_assets
         universe_assets = {asset.id: asset for asset in universe_config.assets}
-        asset_order = [asset.id for asset in universe_config.assets]
         mu_annual = np.array([universe_assets[asset].mu_annual for asset in asset_ids])
         sigma_annual = np.array([universe_assets[asset].sigma_annual for asset in asset_ids])
-        corr = np.array(universe_config.correlations.matrix)
-        indices = [asset_order.index(asset_id) for asset_id in asset_ids]
-        corr = corr[np.ix_(indices, indices)]
+        corr = asset_correlation(universe_config, asset_ids)
         trading_days = sim_config.trading_days_per_year
         mu_daily = mu_annual / trading_days
         sigma_daily = sigma_annual / np.sqrt(trading_days)
-        cov_daily = np.outer(sigma_daily, sigma_daily) * corr
+        cov_daily = scale_correlation(corr, sigma_daily)
+        if sim_config.time_step != "D":
+            # weekly and monthly steps draw the compounded daily returns
+            mu_daily, cov_daily = _compound_moments(mu_daily, cov_daily, sim_config.days_per_step)
         return FittedMarketModel(
             asset_ids=asset_ids,
             mu_daily=mu_daily,
@@ -32,14 +52,42 @@ class GBMModel(MarketModel):
             model_config=market_model_config,
         )
 
-    def sample_paths(
-        self, fitted_model: FittedMarketModel, sim_config: SimulationConfig
-    ) -> MarketPaths:
-        t_steps = sim_config.n_years * sim_config.trading_days_per_year
-        n_assets = len(fitted_model.asset_ids)
-        n_paths = sim_config.n_paths
-        rng = np.random.default_rng(sim_config.seed)
-        chol = np.linalg.cholesky(fitted_model.cov_daily)
-        normals = rng.standard_normal(size=(t_steps, n_assets, n_paths))
-        returns = np.einsum("ij,tjp->tip", chol, normals) + fitted_model.mu_daily[:, None]
-        return MarketPaths(returns=returns, asset_ids=fitted_model.asset_ids)
+    def iter_innovations(
+        self,
+        fitted_model: FittedMarketModel,
+        sim_config: SimulationConfig,
+        block_steps: Optional[int] = None,
+    ) -> Iterator[Innovations]:
+        block_steps = block_steps or sim_config.block_steps
+        n_paths = _drawn_paths(sim_config)
+        dtype = sim_config.float_dtype
+        (rng,) = _generators(sim_config.seed, 1)
+        n_draws = noise_dimension(fitted_model.cov_daily)
+        if sim_config.sampler == "sobol":
+            normal_blocks = sobol_normal_blocks(sim_config, n_draws, rng, block_steps)
+        else:
+            normal_blocks = (
+                rng.standard_normal(size=(stop - start, n_draws, n_paths))
+                for start, stop in _block_bounds(sim_config.t_steps, block_steps)
+            )
+        for normals in normal_blocks:
+            # draws stay float64 so both precisions share the same random stream
+            yield Innovations(normals=normals.astype(dtype, copy=False))
+
+    def paths_from_innovations(
+        self,
+        fitted_model: FittedMarketModel,
+        innovations: Iterable[Innovations],
+        sim_config: SimulationConfig,
+    ) -> Iterator[MarketPaths]:
+        antithetic = sim_config.variance_reduction.antithetic
+        dtype = sim_config.float_dtype
+        root = covariance_root(fitted_model.cov_daily).astype(dtype)
+        mu = fitted_model.mu_daily.astype(dtype)
+        for block in innovations:
+            _check_noise_dimension(block, 1, noise_dimension(root))
+            normals = block.normals
+            if antithetic:
+                normals = _antithetic(normals, axis=2)
+            returns = correlate(root, normals, axis=1) + mu[:, None]
+            yield MarketPaths(returns=returns, asset_ids=fitted_model.asset_ids)
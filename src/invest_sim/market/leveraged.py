@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import List, Optional
+
 import numpy as np
 
+from invest_sim.config.schemas import UniverseConfig
+
 
 def compute_leveraged_returns(
     underlying_returns: np.ndarray,
@@ -11,3 +16,45 @@ def compute_leveraged_returns(
 ) -> np.ndarray:
     fee_daily = fee_annual / trading_days_per_year
     return leverage * underlying_returns - fee_daily
+
+
+@dataclass(frozen=True)
+class ReturnExpansion:
+    # traded asset returns are an affine map of the simulated underlying
+    # returns: r_traded = matrix @ r_underlying - fee_daily
+    asset_ids: List[str]
+    matrix: np.ndarray
+    fee_daily: np.ndarray
+
+    def gross_returns(self, underlying_returns: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        # (time, underlying, path) -> (time, traded asset, path) growth factors
+        out = np.matmul(self.matrix, underlying_returns, out=out)
+        out -= self.fee_daily[:, None]
+        out += 1.0
+        return out
+
+
+def build_return_expansion(
+    universe: UniverseConfig,
+    base_asset_ids: List[str],
+    steps_per_year: int,
+    include_cash: bool = False,
+) -> ReturnExpansion:
+    asset_config = {asset.id: asset for asset in universe.assets}
+    base_index = {asset_id: idx for idx, asset_id in enumerate(base_asset_ids)}
+    leveraged_assets = universe.leveraged_assets or []
+    asset_ids = list(base_asset_ids) + [asset.id for asset in leveraged_assets]
+    if include_cash:
+        asset_ids.append("CASH")
+
+    matrix = np.zeros((len(asset_ids), len(base_asset_ids)))
+    fee_annual = np.zeros(len(asset_ids))
+    for row, asset_id in enumerate(base_asset_ids):
+        matrix[row, row] = 1.0
+        fee_annual[row] = asset_config[asset_id].ter_annual
+    for row, leveraged in enumerate(leveraged_assets, start=len(base_asset_ids)):
+        # the leveraged asset's declared TER replaces the underlying's
+        matrix[row, base_index[leveraged.underlying_id]] = leveraged.leverage
+        fee_annual[row] = leveraged.ter_annual
+    # CASH, when present, is an all-zero row: no return and no fee
+    return ReturnExpansion(asset_ids=asset_ids, matrix=matrix, fee_daily=fee_annual / steps_per_year)
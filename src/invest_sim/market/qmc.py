@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from invest_sim.config.schemas import SimulationConfig
+from invest_sim.market.base import _block_bounds
+
+
+def _scipy_qmc():
+    # scipy is an optional dependency, only needed by the sobol sampler
+    try:
+        from scipy.special import ndtri
+        from scipy.stats import qmc
+    except ImportError as exc:
+        raise ImportError(
+            "sampler 'sobol' requires scipy: pip install 'bayesian-optimize-invest[qmc]'"
+        ) from exc
+    return qmc, ndtri
+
+
+def bridge_order(n_points: int) -> List[Tuple[int, int, Optional[int]]]:
+    # Brownian-bridge construction order of the anchor points 1..n_points
+    # (point 0 is the origin): the end point first, then the midpoints level
+    # by level. Entries are (point, left, right); right is None for the end
+    # point, which only depends on the origin.
+    order: List[Tuple[int, int, Optional[int]]] = [(n_points, 0, None)]
+    intervals = [(0, n_points)]
+    while intervals:
+        next_level = []
+        for left, right in intervals:
+            if right - left < 2:
+                continue
+            middle = (left + right) // 2
+            order.append((middle, left, right))
+            next_level.extend([(left, middle), (middle, right)])
+        intervals = next_level
+    return order
+
+
+def _sobol_normals(n_paths: int, dimension: int, replications: int, rng: np.random.Generator) -> np.ndarray:
+    # (dimension, paths) standard normals: each replication is an
+    # independently scrambled Sobol point set over a contiguous path range
+    qmc, ndtri = _scipy_qmc()
+    per_replication = n_paths // replications
+    points = np.concatenate(
+        [qmc.Sobol(dimension, scramble=True, seed=rng).random(per_replication) for _ in range(replications)]
+    )
+    tiny = np.finfo(np.float64).tiny
+    return ndtri(np.clip(points, tiny, 1.0 - np.finfo(np.float64).epsneg)).T
+
+
+def _anchor_increments(
+    sim_config: SimulationConfig, n_assets: int, rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Brownian motion (in units of daily standard deviations) at one anchor
+    # per year, built from Sobol normals in bridge order so that the first
+    # coordinates drive the end point: returns the anchor days and the
+    # (anchor, asset, path) increments between consecutive anchors
+    t_steps = sim_config.t_steps
+    anchor_days = np.append(np.arange(0, t_steps, sim_config.steps_per_year), t_steps)
+    n_anchors = len(anchor_days) - 1
+    normals = _sobol_normals(sim_config.n_paths, n_anchors * n_assets, sim_config.qmc_replications, rng)
+    normals = normals.reshape(n_anchors, n_assets, sim_config.n_paths)
+
+    times = anchor_days.astype(np.float64)
+    brownian = np.zeros((n_anchors + 1, n_assets, sim_config.n_paths))
+    for node, (point, left, right) in enumerate(bridge_order(n_anchors)):
+        if right is None:
+            brownian[point] = np.sqrt(times[point]) * normals[node]
+            continue
+        span = times[right] - times[left]
+        before = times[point] - times[left]
+        after = times[right] - times[point]
+        brownian[point] = (after * brownian[left] + before * brownian[right]) / span
+        brownian[point] += np.sqrt(before * after / span) * normals[node]
+    return anchor_days, np.diff(brownian, axis=0)
+
+
+def sobol_normal_blocks(
+    sim_config: SimulationConfig,
+    n_assets: int,
+    rng: np.random.Generator,
+    block_steps: int,
+) -> Iterator[np.ndarray]:
+    # Daily (time, asset, path) standard normals for the sobol sampler. Within
+    # each year the path is a Brownian bridge between the QMC anchors, filled
+    # with pseudo-random draws: z_t - mean(z) + increment / days keeps every
+    # daily normal N(0, 1) and independent while summing to the increment.
+    anchor_days, increments = _anchor_increments(sim_config, n_assets, rng)
+
+    def years() -> Iterator[np.ndarray]:
+        for index, increment in enumerate(increments):
+            days = int(anchor_days[index + 1] - anchor_days[index])
+            noise = rng.standard_normal(size=(days, n_assets, sim_config.n_paths))
+            noise -= noise.mean(axis=0)
+            noise += increment / days
+            yield noise
+
+    # the year-long pieces are re-cut into the requested blocks
+    pieces = years()
+    pending = np.empty((0, n_assets, sim_config.n_paths))
+    for start, stop in _block_bounds(sim_config.t_steps, block_steps):
+        while pending.shape[0] < stop - start:
+            pending = np.concatenate([pending, next(pieces)])
+        yield pending[: stop - start]
+        pending = pending[stop - start :]
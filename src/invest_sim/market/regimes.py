@@ -1,9 +1,29 @@
 from __future__ import annotations
 
+from typing import Iterable, Iterator, Optional
+
 import numpy as np
 
 from invest_sim.config.schemas import MarketPaths, RegimesConfig, SimulationConfig, UniverseConfig
-from invest_sim.market.base import FittedMarketModel, MarketModel
+from invest_sim.market.base import (
+    FittedMarketModel,
+    Innovations,
+    MarketModel,
+    _antithetic,
+    _block_bounds,
+    _check_noise_dimension,
+    _drawn_paths,
+    _generators,
+    _require_daily_step,
+)
+from invest_sim.market.factors import (
+    FactorCovariance,
+    asset_correlation,
+    correlate,
+    covariance_root,
+    noise_dimension,
+    scale_correlation,
+)
 
 
 def _nearest_pd(matrix: np.ndarray, epsilon: float = 1e-6) -> np.ndarray:
@@ -30,6 +50,63 @@ def _adjust_corr(base_corr: np.ndarray, multiplier: float) -> np.ndarray:
     return corr
 
 
+def _adjust_factor_corr(base_corr: FactorCovariance, multiplier: float) -> FactorCovariance:
+    # loadings scaled by sqrt(multiplier) scale every correlation by the
+    # multiplier; each asset's factor share is capped at 0.99**2 so that the
+    # idiosyncratic part stays positive and the matrix definite
+    loadings = base_corr.loadings * np.sqrt(multiplier)
+    shares = np.einsum("ik,ik->i", loadings, loadings)
+    cap = np.minimum(1.0, 0.99 / np.sqrt(np.maximum(shares, 1e-300)))
+    loadings = loadings * cap[:, None]
+    idiosyncratic = np.sqrt(1.0 - np.einsum("ik,ik->i", loadings, loadings))
+    return FactorCovariance(loadings, idiosyncratic)
+
+
+def _cumulative_probs(probs: np.ndarray) -> np.ndarray:
+    cum = np.cumsum(probs, axis=-1)
+    cum[..., -1] = 1.0
+    return cum
+
+
+def _regime_dtype(n_regimes: int) -> type:
+    return np.int8 if n_regimes <= np.iinfo(np.int8).max else np.int16
+
+
+def _inverse_cdf(uniforms: np.ndarray, cum: np.ndarray, out: np.ndarray) -> np.ndarray:
+    out[...] = 0
+    for threshold in cum[:-1]:
+        out += uniforms >= threshold
+    return out
+
+
+def _sample_chain(
+    uniforms: np.ndarray,
+    initial_cum: np.ndarray,
+    transition_cum: np.ndarray,
+    prev: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    length, n_paths = uniforms.shape
+    n_regimes = transition_cum.shape[0]
+    states = np.empty((length, n_paths), dtype=_regime_dtype(n_regimes))
+    # next state of every (day, path) for each possible current state, resolved
+    # for the whole block at once; the sequential part is then a single gather
+    candidates = np.empty((length, n_regimes, n_paths), dtype=np.int32)
+    for k in range(n_regimes):
+        _inverse_cdf(uniforms, transition_cum[k], candidates[:, k])
+    path_offsets = np.arange(n_paths, dtype=np.int32)
+    first = 0
+    if prev is None:
+        prev = _inverse_cdf(uniforms[0], initial_cum, np.empty(n_paths, dtype=np.int32))
+        states[0] = prev
+        first = 1
+    else:
+        prev = prev.astype(np.int32)
+    for t in range(first, length):
+        prev = candidates[t].ravel().take(prev * n_paths + path_offsets)
+        states[t] = prev
+    return states
+
+
 class RegimeSwitchingModel(MarketModel):
     def fit(
         self,
@@ -37,25 +114,44 @@ class RegimeSwitchingModel(MarketModel):
         market_model_config: RegimesConfig,
         sim_config: SimulationConfig,
     ) -> FittedMarketModel:
+        _require_daily_step(sim_config, "regimes")
         asset_ids = market_model_config.enabled_assets
         universe_assets = {asset.id: asset for asset in universe_config.assets}
-        asset_order = [asset.id for asset in universe_config.assets]
         mu_annual = np.array([universe_assets[asset].mu_annual for asset in asset_ids])
         sigma_annual = np.array([universe_assets[asset].sigma_annual for asset in asset_ids])
-        corr = np.array(universe_config.correlations.matrix)
-        indices = [asset_order.index(asset_id) for asset_id in asset_ids]
-        corr = corr[np.ix_(indices, indices)]
+        corr = asset_correlation(universe_config, asset_ids)
+        factor_model = isinstance(corr, FactorCovariance)
         trading_days = sim_config.trading_days_per_year
         mu_daily = mu_annual / trading_days
         sigma_daily = sigma_annual / np.sqrt(trading_days)
-        cov_daily = np.outer(sigma_daily, sigma_daily) * corr
+        cov_daily = scale_correlation(corr, sigma_daily)
+        regime_corr = []
+        regime_chol = []
+        regime_mu = []
+        for regime in market_model_config.regimes:
+            if factor_model:
+                adjusted = _adjust_factor_corr(corr, regime.corr_multiplier)
+            else:
+                adjusted = _adjust_corr(corr, regime.corr_multiplier)
+            sigma_adj = sigma_daily * regime.sigma_multiplier
+            regime_corr.append(adjusted)
+            regime_chol.append(covariance_root(scale_correlation(adjusted, sigma_adj)))
+            regime_mu.append(mu_daily * regime.mu_multiplier)
+        transition = np.array(market_model_config.transition_matrix, dtype=float)
+        initial_probs = np.array(market_model_config.initial_probs, dtype=float)
         regime_params = {
             "regimes": market_model_config.regimes,
-            "transition_matrix": np.array(market_model_config.transition_matrix, dtype=float),
-            "initial_probs": np.array(market_model_config.initial_probs, dtype=float),
+            "transition_matrix": transition,
+            "initial_probs": initial_probs,
+            "transition_cum": _cumulative_probs(transition).astype(np.float32),
+            "initial_cum": _cumulative_probs(initial_probs).astype(np.float32),
             "base_corr": corr,
             "mu_daily": mu_daily,
             "sigma_daily": sigma_daily,
+            # per-regime factor structures are kept as lists
+            "corr": regime_corr if factor_model else np.stack(regime_corr),
+            "chol": regime_chol if factor_model else np.stack(regime_chol),
+            "mu": np.stack(regime_mu),
         }
         return FittedMarketModel(
             asset_ids=asset_ids,
@@ -65,44 +161,72 @@ class RegimeSwitchingModel(MarketModel):
             regime_params=regime_params,
         )
 
-    def sample_paths(
-        self, fitted_model: FittedMarketModel, sim_config: SimulationConfig
-    ) -> MarketPaths:
-        t_steps = sim_config.n_years * sim_config.trading_days_per_year
-        n_assets = len(fitted_model.asset_ids)
-        n_paths = sim_config.n_paths
-        rng = np.random.default_rng(sim_config.seed)
+    def expected_growth(self, fitted_model: FittedMarketModel, t_steps: int) -> np.ndarray:
+        # E[prod_t (1 + r_t)] through the chain: weighted[k] is the expected
+        # growth so far restricted to paths currently in regime k
         params = fitted_model.regime_params
-        regimes = params["regimes"]
-        transition = params["transition_matrix"]
-        initial_probs = params["initial_probs"]
-        mu_daily = params["mu_daily"]
-        sigma_daily = params["sigma_daily"]
-        base_corr = params["base_corr"]
-
-        regime_index = np.zeros((t_steps, n_paths), dtype=int)
-        regime_index[0] = rng.choice(len(regimes), size=n_paths, p=initial_probs)
-        for t in range(1, t_steps):
-            prev = regime_index[t - 1]
-            for k in range(len(regimes)):
-                mask = prev == k
-                if np.any(mask):
-                    regime_index[t, mask] = rng.choice(len(regimes), size=mask.sum(), p=transition[k])
-
-        returns = np.zeros((t_steps, n_assets, n_paths))
-        for k, regime in enumerate(regimes):
-            corr = _adjust_corr(base_corr, regime.corr_multiplier)
-            sigma_adj = sigma_daily * regime.sigma_multiplier
-            mu_adj = mu_daily * regime.mu_multiplier
-            cov = np.outer(sigma_adj, sigma_adj) * corr
-            chol = np.linalg.cholesky(cov)
-            normals = rng.standard_normal(size=(t_steps, n_assets, n_paths))
-            regime_mask = regime_index == k
-            if not np.any(regime_mask):
-                continue
-            day_indices = np.where(regime_mask)
-            returns[day_indices[0], :, day_indices[1]] = (
-                np.einsum("ij,tjp->tip", chol, normals)[day_indices[0], :, day_indices[1]]
-                + mu_adj[None, :]
-            )
-        return MarketPaths(returns=returns, asset_ids=fitted_model.asset_ids, regime=regime_index)
+        gross_mean = 1.0 + params["mu"]
+        weighted = params["initial_probs"][:, None] * gross_mean
+        for _ in range(t_steps - 1):
+            weighted = (params["transition_matrix"].T @ weighted) * gross_mean
+        return weighted.sum(axis=0)
+
+    def iter_innovations(
+        self,
+        fitted_model: FittedMarketModel,
+        sim_config: SimulationConfig,
+        block_steps: Optional[int] = None,
+    ) -> Iterator[Innovations]:
+        if sim_config.sampler != "mc":
+            raise ValueError("the regime model only supports the mc sampler")
+        block_steps = block_steps or sim_config.block_steps
+        n_paths = _drawn_paths(sim_config)
+        dtype = sim_config.float_dtype
+        n_draws = noise_dimension(fitted_model.regime_params["chol"][0])
+        chain_rng, normal_rng = _generators(sim_config.seed, 2)
+        for start, stop in _block_bounds(sim_config.t_steps, block_steps):
+            length = stop - start
+            uniforms = chain_rng.random(size=(length, n_paths), dtype=np.float32)
+            # one normal per (day, path, asset) whatever the regime
+            normals = normal_rng.standard_normal(size=(length, n_paths, n_draws)).astype(dtype, copy=False)
+            yield Innovations(normals=normals, uniforms=uniforms)
+
+    def paths_from_innovations(
+        self,
+        fitted_model: FittedMarketModel,
+        innovations: Iterable[Innovations],
+        sim_config: SimulationConfig,
+    ) -> Iterator[MarketPaths]:
+        antithetic = sim_config.variance_reduction.antithetic
+        dtype = sim_config.float_dtype
+        params = fitted_model.regime_params
+        chols = [root.astype(dtype) for root in params["chol"]]
+        mus = params["mu"].astype(dtype)
+
+        prev = None
+        for block in innovations:
+            _check_noise_dimension(block, 2, noise_dimension(chols[0]))
+            regime_index = _sample_chain(block.uniforms, params["initial_cum"], params["transition_cum"], prev)
+            prev = regime_index[-1]
+            normals = block.normals
+            if antithetic:
+                # both paths of a pair follow the same regime sequence
+                regime_index = np.repeat(regime_index, 2, axis=1)
+                normals = _antithetic(normals, axis=1)
+
+            # every regime writes into the one (time, asset, path) output,
+            # through its (time, path, asset) view: the block's most populated
+            # regime step by step over all the cells, the other regimes only
+            # on the cells they own (gather, transform, scatter)
+            returns = np.empty((normals.shape[0], mus.shape[1], normals.shape[1]), dtype=dtype)
+            cells = returns.transpose(0, 2, 1)
+            counts = np.bincount(regime_index.ravel(), minlength=len(chols))
+            dominant = int(np.argmax(counts))
+            for step in range(len(returns)):
+                np.add(correlate(chols[dominant], normals[step], axis=-1), mus[dominant], out=cells[step])
+            for k in np.flatnonzero(counts):
+                if k == dominant:
+                    continue
+                regime_mask = regime_index == k
+                cells[regime_mask] = correlate(chols[k], normals[regime_mask], axis=-1) + mus[k]
+            yield MarketPaths(returns=returns, asset_ids=fitted_model.asset_ids, regime=regime_index)
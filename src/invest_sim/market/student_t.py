@@ -1,9 +1,30 @@
 from __future__ import annotations
 
+from typing import Iterable, Iterator, Optional
+
 import numpy as np
 
 from invest_sim.config.schemas import MarketPaths, SimulationConfig, StudentTConfig, UniverseConfig
-from invest_sim.market.base import FittedMarketModel, MarketModel
+from invest_sim.market.base import (
+    FittedMarketModel,
+    Innovations,
+    MarketModel,
+    _antithetic,
+    _block_bounds,
+    _check_noise_dimension,
+    _drawn_paths,
+    _generators,
+    _require_daily_step,
+)
+from invest_sim.market.factors import (
+    FactorCovariance,
+    asset_correlation,
+    correlate,
+    covariance_root,
+    noise_dimension,
+    scale_correlation,
+)
+from invest_sim.market.qmc import sobol_normal_blocks
 
 
 class StudentTModel(MarketModel):
@@ -13,18 +34,16 @@ class StudentTModel(MarketModel):
         market_model_config: StudentTConfig,
         sim_config: SimulationConfig,
     ) -> FittedMarketModel:
+        _require_daily_step(sim_config, "student_t")
         asset_ids = market_model_config.enabled_assets
         universe_assets = {asset.id: asset for asset in universe_config.assets}
-        asset_order = [asset.id for asset in universe_config.assets]
         mu_annual = np.array([universe_assets[asset].mu_annual for asset in asset_ids])
         sigma_annual = np.array([universe_assets[asset].sigma_annual for asset in asset_ids])
-        corr = np.array(universe_config.correlations.matrix)
-        indices = [asset_order.index(asset_id) for asset_id in asset_ids]
-        corr = corr[np.ix_(indices, indices)]
+        corr = asset_correlation(universe_config, asset_ids)
         trading_days = sim_config.trading_days_per_year
         mu_daily = mu_annual / trading_days
         sigma_daily = sigma_annual / np.sqrt(trading_days)
-        cov_daily = np.outer(sigma_daily, sigma_daily) * corr
+        cov_daily = scale_correlation(corr, sigma_daily)
         return FittedMarketModel(
             asset_ids=asset_ids,
             mu_daily=mu_daily,
@@ -32,20 +51,65 @@ class StudentTModel(MarketModel):
             model_config=market_model_config,
         )
 
-    def sample_paths(
-        self, fitted_model: FittedMarketModel, sim_config: SimulationConfig
-    ) -> MarketPaths:
-        t_steps = sim_config.n_years * sim_config.trading_days_per_year
+    def iter_innovations(
+        self,
+        fitted_model: FittedMarketModel,
+        sim_config: SimulationConfig,
+        block_steps: Optional[int] = None,
+    ) -> Iterator[Innovations]:
+        block_steps = block_steps or sim_config.block_steps
+        n_paths = _drawn_paths(sim_config)
+        dtype = sim_config.float_dtype
+        normal_rng, chi2_rng = _generators(sim_config.seed, 2)
+        df = fitted_model.model_config.df
+        n_draws = noise_dimension(fitted_model.cov_daily)
+        if sim_config.sampler == "sobol":
+            # quasi-random normals; the chi2 mixing variables stay pseudo-random
+            normal_blocks = sobol_normal_blocks(sim_config, n_draws, normal_rng, block_steps)
+        else:
+            normal_blocks = (
+                normal_rng.standard_normal(size=(stop - start, n_draws, n_paths))
+                for start, stop in _block_bounds(sim_config.t_steps, block_steps)
+            )
+        for normals in normal_blocks:
+            normals = normals.astype(dtype, copy=False)
+            chi2 = chi2_rng.chisquare(df, size=(normals.shape[0], n_paths))
+            yield Innovations(normals=normals, chi2=chi2, chi2_df=df)
+
+    def redraws_innovations(self, base_config: StudentTConfig, case_config: StudentTConfig) -> bool:
+        return case_config.df != base_config.df
+
+    def paths_from_innovations(
+        self,
+        fitted_model: FittedMarketModel,
+        innovations: Iterable[Innovations],
+        sim_config: SimulationConfig,
+    ) -> Iterator[MarketPaths]:
         n_assets = len(fitted_model.asset_ids)
-        n_paths = sim_config.n_paths
-        rng = np.random.default_rng(sim_config.seed)
+        antithetic = sim_config.variance_reduction.antithetic
+        dtype = sim_config.float_dtype
         df = fitted_model.model_config.df
         scale = (df - 2) / df
-        cov_scaled = fitted_model.cov_daily * scale
-        chol = np.linalg.cholesky(cov_scaled)
-        normals = rng.standard_normal(size=(t_steps, n_assets, n_paths))
-        chi2 = rng.chisquare(df, size=(t_steps, n_paths))
-        t_samples = normals / np.sqrt(chi2 / df)[:, None, :]
-        correlated = np.einsum("ij,tjp->tip", chol, t_samples)
-        returns = correlated + fitted_model.mu_daily[:, None]
-        return MarketPaths(returns=returns, asset_ids=fitted_model.asset_ids)
\ No newline at end of file
+        if isinstance(fitted_model.cov_daily, FactorCovariance):
+            cov_scaled = fitted_model.cov_daily.scaled(np.full(n_assets, np.sqrt(scale)))
+        else:
+            cov_scaled = fitted_model.cov_daily * scale
+        root = covariance_root(cov_scaled).astype(dtype)
+        mu = fitted_model.mu_daily.astype(dtype)
+        # mixing draws of other degrees of freedom cannot be transformed: they
+        # are redrawn from the chi2 stream, as a fresh run with this df would
+        _, chi2_rng = _generators(sim_config.seed, 2)
+        for block in innovations:
+            _check_noise_dimension(block, 1, noise_dimension(root))
+            normals = block.normals
+            chi2 = block.chi2
+            if block.chi2_df != df:
+                chi2 = chi2_rng.chisquare(df, size=chi2.shape)
+            if antithetic:
+                # both paths of a pair share the mixing variable: t draws are mirrored
+                normals = _antithetic(normals, axis=2)
+                chi2 = np.repeat(chi2, 2, axis=1)
+            t_samples = normals / np.sqrt(chi2 / df).astype(dtype, copy=False)[:, None, :]
+            correlated = correlate(root, t_samples, axis=1)
+            returns = correlated + mu[:, None]
+            yield MarketPaths(returns=returns, asset_ids=fitted_model.asset_ids)
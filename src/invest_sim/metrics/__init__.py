@@ -1,3 +1,23 @@
-from invest_sim.metrics.compute import compute_metrics, pareto_set, select_ranking
+from invest_sim.metrics.compute import (
+    bootstrap_indices,
+    bootstrap_quantiles,
+    compute_metrics,
+    horizon_summary,
+    pareto_set,
+    precision_errors,
+    select_ranking,
+    standard_errors,
+    summarize_metrics,
+)
 
-__all__ = ["compute_metrics", "pareto_set", "select_ranking"]
+__all__ = [
+    "bootstrap_indices",
+    "bootstrap_quantiles",
+    "compute_metrics",
+    "horizon_summary",
+    "pareto_set",
+    "precision_errors",
+    "select_ranking",
+    "standard_errors",
+    "summarize_metrics",
+]
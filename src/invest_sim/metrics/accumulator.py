@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from invest_sim.calendar import contribution_days
+from invest_sim.config.schemas import SimulationConfig
+from invest_sim.metrics.compute import _quantile_position, _tail_mean, horizon_suffix
+
+NAV_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+ES_ALPHA = 0.05
+
+
+@dataclass
+class NavSummary:
+    # what compute_metrics and the fan chart need when NAV paths are not kept
+    per_path: pd.DataFrame
+    nav_quantiles: Optional[np.ndarray] = None
+
+
+class MetricsAccumulator:
+    # Streaming version of compute_metrics: NAV rows are fed in time order
+    # (each row covering every path, optionally for several strategies) and
+    # only O(paths) state is kept, plus the smallest ~5% daily returns for ES.
+    # All metrics except the volatility (Welford instead of two-pass) and ES
+    # ties beyond the tail buffer match compute_metrics on the full matrix.
+    # The metrics of the shorter horizons are snapshots of the state taken
+    # at their checkpoint steps.
+
+    def __init__(
+        self,
+        sim_config: SimulationConfig,
+        t_steps: int,
+        initial_nav: np.ndarray,
+        track_quantiles: bool = False,
+        checkpoints: Sequence[int] = (),
+    ) -> None:
+        self.dtype = sim_config.float_dtype
+        self.t_steps = t_steps
+        self.steps_per_year = sim_config.steps_per_year
+        self._row = 0
+        self._checkpoints = sorted(checkpoints)
+        self._snapshots: Dict[int, dict] = {}
+        self._cashflow = np.zeros(t_steps)
+        if sim_config.contributions.enabled:
+            self._cashflow[contribution_days(sim_config, t_steps)] = sim_config.contributions.monthly_amount_eur
+
+        initial = np.asarray(initial_nav).astype(self.dtype)
+        shape = initial.shape
+        self._initial = initial
+        self._prev = initial
+        self._running_max = initial.copy()
+        self._min_ratio = np.ones(shape, dtype=self.dtype)
+        self._underwater = np.zeros(shape, dtype=np.int64)
+        self._twr_growth = np.ones(shape)
+        self._count = 0
+        self._mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+        self._anchor = initial
+        self._worst_year = np.full(shape, np.inf)
+
+        # ES needs the order statistics `lower` and `lower + 1` of each path's
+        # daily returns, so only the `lower + 2` smallest are ever kept
+        self._es_position = _quantile_position(t_steps, ES_ALPHA)
+        self._tail_size = self._es_position[1] + 1
+        # the tail lives in the first rows of a fixed buffer; new returns fill
+        # the rest and an in-place partition folds them back into the tail
+        self._tail_buffer: Optional[np.ndarray] = None
+        self._tail_rows = 0
+
+        self._quantiles = (
+            np.empty((len(NAV_QUANTILES), t_steps + 1) + shape[:-1]) if track_quantiles else None
+        )
+        if self._quantiles is not None:
+            self._quantiles[:, 0] = np.quantile(initial, NAV_QUANTILES, axis=-1)
+
+    def update(self, nav_rows: np.ndarray) -> None:
+        # nav_rows: (days, ..., paths), the NAV at the end of each new day;
+        # the rows are split at the checkpoints so that every snapshot sees
+        # exactly the NAV up to its horizon
+        rows = np.asarray(nav_rows)
+        while len(rows):
+            pending = [step for step in self._checkpoints if step > self._row]
+            length = min(len(rows), pending[0] - self._row) if pending else len(rows)
+            self._update(rows[:length])
+            rows = rows[length:]
+            if self._row in self._checkpoints:
+                self._snapshots[self._row] = self._metrics(self._row)
+
+    def _update(self, nav_rows: np.ndarray) -> None:
+        rows = np.asarray(nav_rows).astype(self.dtype, copy=False)
+        length = rows.shape[0]
+        first = self._row
+        previous = np.concatenate([self._prev[None], rows[:-1]])
+
+        daily_returns = rows / previous - 1.0
+        self._merge_moments(daily_returns)
+        self._push_tail(daily_returns)
+
+        positive = previous > 0
+        cashflow = self._cashflow[first : first + length].reshape((length,) + (1,) * (rows.ndim - 1))
+        period_returns = np.subtract(rows, cashflow)
+        np.divide(period_returns, previous, out=period_returns, where=positive)
+        period_returns -= 1.0
+        period_returns[~positive] = 0.0
+        growth = 1.0 + period_returns.astype(self.dtype, copy=False)
+        for day in growth:
+            self._twr_growth *= day
+
+        for day in rows:
+            np.maximum(self._running_max, day, out=self._running_max)
+            np.minimum(self._min_ratio, day / self._running_max, out=self._min_ratio)
+            self._underwater += day < self._running_max
+
+        year_ends = np.arange(first + 1, first + length + 1)
+        for index in np.flatnonzero(year_ends % self.steps_per_year == 0):
+            np.minimum(self._worst_year, rows[index] / self._anchor - 1.0, out=self._worst_year)
+            self._anchor = rows[index].copy()
+
+        if self._quantiles is not None:
+            self._quantiles[:, first + 1 : first + length + 1] = np.quantile(rows, NAV_QUANTILES, axis=-1)
+
+        self._prev = rows[-1].copy()
+        self._row += length
+
+    def _merge_moments(self, returns: np.ndarray) -> None:
+        # Chan et al. parallel update of Welford's running mean and M2
+        length = returns.shape[0]
+        block_mean = returns.mean(axis=0, dtype=np.float64)
+        block_m2 = np.square(returns - block_mean, dtype=np.float64).sum(axis=0)
+        total = self._count + length
+        delta = block_mean - self._mean
+        self._mean = self._mean + delta * (length / total)
+        self._m2 = self._m2 + block_m2 + delta * delta * (self._count * length / total)
+        self._count = total
+
+    def _push_tail(self, returns: np.ndarray) -> None:
+        if self._tail_buffer is None:
+            rows = min(2 * self._tail_size, self.t_steps)
+            self._tail_buffer = np.empty((rows,) + returns.shape[1:], dtype=returns.dtype)
+        capacity = self._tail_buffer.shape[0]
+        start = 0
+        while start < returns.shape[0]:
+            take = min(capacity - self._tail_rows, returns.shape[0] - start)
+            self._tail_buffer[self._tail_rows : self._tail_rows + take] = returns[start : start + take]
+            self._tail_rows += take
+            start += take
+            if self._tail_rows == capacity and capacity > self._tail_size:
+                self._tail_buffer.partition(self._tail_size - 1, axis=0)
+                self._tail_rows = self._tail_size
+
+    def _expected_shortfall(self, t_steps: int) -> np.ndarray:
+        # the buffer holds at least the smallest returns needed by any
+        # horizon up to t_steps, whose order statistics come first
+        return _tail_mean(self._tail_buffer[: self._tail_rows], *_quantile_position(t_steps, ES_ALPHA))
+
+    def _metrics(self, t_steps: int) -> dict:
+        # metrics of the NAV fed so far, t_steps rows
+        years = float(t_steps) / float(self.steps_per_year)
+        worst_year = self._worst_year.copy() if t_steps >= self.steps_per_year else np.full_like(self._worst_year, np.nan)
+        return {
+            "final_value": self._prev.astype(np.float64),
+            "cagr": self._twr_growth ** (1.0 / years) - 1.0,
+            "annualized_vol": np.sqrt(self._m2 / (self._count - 1)) * np.sqrt(self.steps_per_year),
+            "max_drawdown": 1.0 - self._min_ratio,
+            "time_underwater_fraction": self._underwater / (t_steps + 1),
+            "worst_year_return": worst_year,
+            "es_95": self._expected_shortfall(t_steps),
+        }
+
+    def finalize(self) -> Tuple[dict, Optional[np.ndarray]]:
+        # metrics over t_steps, then those of each checkpoint (suffixed names)
+        if self._row != self.t_steps:
+            raise ValueError(f"expected {self.t_steps} NAV rows, got {self._row}")
+        metrics = self._metrics(self.t_steps)
+        for steps in self._checkpoints:
+            suffix = horizon_suffix(steps, self.steps_per_year)
+            metrics.update({name + suffix: values for name, values in self._snapshots[steps].items()})
+        return metrics, self._quantiles
+
+    def summaries(self) -> List[NavSummary]:
+        # one NavSummary per leading index (strategy) of the accumulated shape
+        metrics, quantiles = self.finalize()
+        shape = self._initial.shape
+        if len(shape) == 1:
+            return [NavSummary(per_path=pd.DataFrame(metrics).astype(np.float64), nav_quantiles=quantiles)]
+        return [
+            NavSummary(
+                per_path=pd.DataFrame({name: values[s] for name, values in metrics.items()}).astype(np.float64),
+                nav_quantiles=None if quantiles is None else quantiles[:, :, s],
+            )
+            for s in range(shape[0])
+        ]
@@ -1,92 +1,164 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
-from invest_sim.config.schemas import PortfolioPaths, SimulationConfig
+from invest_sim.calendar import contribution_days
+from invest_sim.config.schemas import PortfolioPaths, PrecisionTargetConfig, SimulationConfig
 
 
-def _max_drawdown(nav: np.ndarray) -> np.ndarray:
-    running_max = np.maximum.accumulate(nav, axis=0)
-    drawdown = 1.0 - nav / running_max
-    return np.max(drawdown, axis=0)
+def _running_max(nav: np.ndarray) -> np.ndarray:
+    # row by row: np.maximum.accumulate along axis 0 is several times slower
+    running_max = np.empty_like(nav)
+    running_max[0] = nav[0]
+    for t in range(1, nav.shape[0]):
+        np.maximum(running_max[t - 1], nav[t], out=running_max[t])
+    return running_max
 
 
-def _time_underwater(nav: np.ndarray) -> np.ndarray:
-    running_max = np.maximum.accumulate(nav, axis=0)
+def _max_drawdown(nav: np.ndarray, running_max: np.ndarray) -> np.ndarray:
+    # max(1 - x) == 1 - min(x) exactly, without a drawdown-sized temporary
+    return 1.0 - np.min(nav / running_max, axis=0)
+
+
+def _time_underwater(nav: np.ndarray, running_max: np.ndarray) -> np.ndarray:
     underwater = nav < running_max
     return underwater.mean(axis=0)
 
 
-def _worst_year_return(nav: np.ndarray, trading_days: int) -> np.ndarray:
-    n_years = (nav.shape[0] - 1) // trading_days
+def _worst_year_return(nav: np.ndarray, steps_per_year: int) -> np.ndarray:
+    n_years = (nav.shape[0] - 1) // steps_per_year
     if n_years == 0:
         return np.full(nav.shape[1], np.nan)
-    yearly_returns = []
-    for year in range(n_years):
-        start = year * trading_days
-        end = (year + 1) * trading_days
-        yearly_returns.append(nav[end] / nav[start] - 1.0)
-    return np.min(np.stack(yearly_returns, axis=0), axis=0)
+    anchors = nav[: n_years * steps_per_year + 1 : steps_per_year]
+    return np.min(anchors[1:] / anchors[:-1] - 1.0, axis=0)
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: float) -> np.ndarray:
+    # same formula as np.quantile's linear interpolation, so the threshold
+    # is bit-identical to np.quantile(returns, alpha, axis=0)
+    diff = b - a
+    return b - diff * (1.0 - t) if t >= 0.5 else a + diff * t
+
+
+def _quantile_position(n: int, alpha: float) -> Tuple[int, int, float]:
+    # order statistics and weight of np.quantile's linear interpolation
+    position = alpha * (n - 1)
+    lower = int(np.floor(position))
+    return lower, min(lower + 1, n - 1), position - lower
+
+
+def _tail_mean(returns: np.ndarray, lower: int, upper: int, weight: float) -> np.ndarray:
+    # mean of the returns at or below the interpolated quantile of each path;
+    # one partition gives both the quantile and the tail
+    tail = np.partition(returns, (lower, upper), axis=0)
+    threshold = _lerp(tail[lower], tail[upper], weight)
+    # entries past `lower` are >= threshold, so only ties can still count
+    ties = np.sum(tail[lower + 1 :] <= threshold, axis=0)
+    tail_sum = tail[: lower + 1].sum(axis=0, dtype=np.float64) + ties * threshold.astype(np.float64)
+    return tail_sum / (lower + 1 + ties)
 
 
 def _expected_shortfall(returns: np.ndarray, alpha: float = 0.05) -> np.ndarray:
-    threshold = np.quantile(returns, alpha, axis=0)
-    mask = returns <= threshold
-    return np.array([
-        returns[mask[:, i], i].mean() if mask[:, i].any() else np.nan
-        for i in range(returns.shape[1])
-    ])
+    return _tail_mean(returns, *_quantile_position(returns.shape[0], alpha))
+
+
+METRICS = (
+    "final_value",
+    "cagr",
+    "annualized_vol",
+    "max_drawdown",
+    "time_underwater_fraction",
+    "worst_year_return",
+    "es_95",
+)
+
+
+def horizon_suffix(steps: int, steps_per_year: int) -> str:
+    # per-path columns of a shorter horizon, e.g. cagr_5y
+    return f"_{steps // steps_per_year}y"
 
 
 def compute_metrics(
     portfolio_paths: PortfolioPaths,
     sim_config: SimulationConfig,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    nav = portfolio_paths.nav
+    # per-path metrics over n_years, followed by those of every shorter
+    # horizon of horizons_years (suffixed columns, see horizon_summary)
+    if portfolio_paths.nav_summary is not None:
+        # metrics already accumulated during the simulation (or merged from shards)
+        per_path = portfolio_paths.nav_summary.per_path
+    elif portfolio_paths.nav is not None:
+        nav = portfolio_paths.nav
+        frames = [_per_path_metrics(nav, sim_config)]
+        for steps in sim_config.horizon_checkpoints:
+            # the NAV prefix is the run of the shorter horizon
+            prefix = _per_path_metrics(nav[: steps + 1], sim_config)
+            frames.append(prefix.add_suffix(horizon_suffix(steps, sim_config.steps_per_year)))
+        per_path = pd.concat(frames, axis=1)
+    else:
+        raise ValueError("portfolio paths carry neither NAV paths nor accumulated metrics")
+
+    return per_path, summarize_metrics(per_path)
+
+
+def horizon_summary(summary: pd.DataFrame, sim_config: SimulationConfig) -> pd.DataFrame:
+    # the summary of each horizon in one table, rows indexed by
+    # (horizon_years, statistic), one column per metric
+    tables = {}
+    for steps in sim_config.horizon_checkpoints + [sim_config.t_steps]:
+        suffix = "" if steps == sim_config.t_steps else horizon_suffix(steps, sim_config.steps_per_year)
+        tables[steps // sim_config.steps_per_year] = summary[[metric + suffix for metric in METRICS]].set_axis(
+            list(METRICS), axis=1
+        )
+    return pd.concat(tables, names=["horizon_years", "statistic"])
+
+
+def summarize_metrics(per_path: pd.DataFrame) -> pd.DataFrame:
+    quantiles = per_path.quantile([0.05, 0.25, 0.75, 0.95])
+    quantiles.index = ["p05", "p25", "p75", "p95"]
+    return pd.concat([per_path.agg(["mean", "median"]), quantiles])
+
+
+def _per_path_metrics(nav: np.ndarray, sim_config: SimulationConfig) -> pd.DataFrame:
     daily_returns = nav[1:] / nav[:-1] - 1.0
-    final_value = nav[-1]
-    trading_days = sim_config.trading_days_per_year
+    # per-path reductions accumulate in float64 even for float32 nav paths
+    final_value = nav[-1].astype(np.float64)
+    steps_per_year = sim_config.steps_per_year
     n_steps = nav.shape[0] - 1
     # compute actual years from simulated nav length to avoid mismatches
-    years = float(n_steps) / float(trading_days)
+    years = float(n_steps) / float(steps_per_year)
 
     # legacy compounded CAGR (includes effect of contributions)
-    cagr_legacy = (final_value / nav[0]) ** (1 / years) - 1.0
+    cagr_legacy = (final_value / nav[0].astype(np.float64)) ** (1 / years) - 1.0
 
-    # Time-Weighted Return (TWR) neutralisant les apports périodiques
-    n_paths = nav.shape[1]
-    cashflow = np.zeros((n_steps + 1, n_paths))
+    # Time-Weighted Return (TWR) neutralisant les apports périodiques :
+    # flux d'apport reçu à la fin du pas t, par pas de temps
+    cashflow = np.zeros(n_steps)
     if sim_config.contributions.enabled:
-        day_index = min(sim_config.contributions.day_of_month - 1, 20)
-        contrib = sim_config.contributions.monthly_amount_eur
-        for t in range(n_steps):
-            if t % 21 == day_index:
-                cashflow[t + 1, :] = contrib
+        cashflow[contribution_days(sim_config, n_steps)] = sim_config.contributions.monthly_amount_eur
 
     # rendements périodiques nets des flux : r_t = (nav[t+1] - cashflow[t+1]) / nav[t] - 1
-    period_returns = np.zeros((n_steps, n_paths))
-    for t in range(n_steps):
-        denom = nav[t].copy()
-        mask = denom > 0
-        period_returns[t, mask] = (
-            (nav[t + 1, mask] - cashflow[t + 1, mask]) / denom[mask] - 1.0
-        )
-        period_returns[t, ~mask] = 0.0
+    denom = nav[:-1]
+    positive = denom > 0
+    period_returns = np.subtract(nav[1:], cashflow[:, None])
+    np.divide(period_returns, denom, out=period_returns, where=positive)
+    period_returns -= 1.0
+    period_returns[~positive] = 0.0
+    period_returns = period_returns.astype(nav.dtype, copy=False)
 
-    total_return = np.prod(1.0 + period_returns, axis=0) - 1.0
+    total_return = np.prod(1.0 + period_returns, axis=0, dtype=np.float64) - 1.0
     cagr = (1.0 + total_return) ** (1.0 / years) - 1.0
-    annualized_vol = np.std(daily_returns, axis=0, ddof=1) * np.sqrt(
-        sim_config.trading_days_per_year
-    )
-    max_dd = _max_drawdown(nav)
-    time_underwater = _time_underwater(nav)
-    worst_year = _worst_year_return(nav, sim_config.trading_days_per_year)
+    annualized_vol = np.std(daily_returns, axis=0, ddof=1, dtype=np.float64) * np.sqrt(steps_per_year)
+    running_max = _running_max(nav)
+    max_dd = _max_drawdown(nav, running_max)
+    time_underwater = _time_underwater(nav, running_max)
+    worst_year = _worst_year_return(nav, steps_per_year)
     es_95 = _expected_shortfall(daily_returns, alpha=0.05)
 
-    per_path = pd.DataFrame(
+    return pd.DataFrame(
         {
             "final_value": final_value,
             "cagr": cagr,
@@ -96,12 +168,137 @@ def compute_metrics(
             "worst_year_return": worst_year,
             "es_95": es_95,
         }
-    )
+    ).astype(np.float64)
 
-    quantiles = per_path.quantile([0.05, 0.25, 0.75, 0.95])
-    quantiles.index = ["p05", "p25", "p75", "p95"]
-    summary = pd.concat([per_path.agg(["mean", "median"]), quantiles])
-    return per_path, summary
+
+# metrics whose mean gets a standard error in the report
+STANDARD_ERROR_METRICS = ("final_value", "cagr", "max_drawdown")
+
+
+def _mean_and_error(samples: np.ndarray) -> Tuple[float, float]:
+    return float(samples.mean()), float(samples.std(ddof=1) / np.sqrt(len(samples)))
+
+
+def _independent_units(values: np.ndarray, sim_config: SimulationConfig) -> np.ndarray:
+    # the mean over paths is a mean over independent units: the scramblings
+    # of the sobol point set, antithetic pairs, or single paths
+    if sim_config.sampler == "sobol":
+        return values.reshape(sim_config.qmc_replications, -1).mean(axis=1)
+    if sim_config.variance_reduction.antithetic:
+        return values.reshape(-1, 2).mean(axis=1)
+    return values
+
+
+def standard_errors(
+    per_path: pd.DataFrame,
+    sim_config: SimulationConfig,
+    control: Optional[np.ndarray] = None,
+    expected_control: Optional[float] = None,
+) -> pd.DataFrame:
+    # Standard error of the mean of the key metrics. se_iid treats the paths
+    # as independent draws, i.e. what plain sampling gives for the same path
+    # count. With antithetic sampling the paths of a pair are averaged first
+    # (se_antithetic); with the sobol sampler the error comes from the spread
+    # of the replication means (se_qmc). With a control C of known mean the
+    # estimator is mean(Y - b (C - E[C])), b being the slope of Y on C.
+    if sim_config.sampler == "sobol":
+        label = "se_qmc"
+    elif sim_config.variance_reduction.antithetic:
+        label = "se_antithetic"
+    else:
+        label = None
+    rows = {}
+    for metric in STANDARD_ERROR_METRICS:
+        values = per_path[metric].to_numpy(dtype=np.float64)
+        mean, se_iid = _mean_and_error(values)
+        row = {"mean": mean, "se_iid": se_iid}
+        if label is not None:
+            row[label] = _mean_and_error(_independent_units(values, sim_config))[1]
+        if control is not None:
+            control_var = control.var(ddof=1)
+            slope = np.cov(values, control)[0, 1] / control_var if control_var > 0 else 0.0
+            adjusted = values - slope * (control - expected_control)
+            row["mean_cv"], row["se_cv"] = _mean_and_error(_independent_units(adjusted, sim_config))
+        rows[metric] = row
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def bootstrap_indices(
+    n_paths: int, n_resamples: int, rng: np.random.Generator, sim_config: SimulationConfig
+) -> np.ndarray:
+    # (resample, path) indices of paths drawn with replacement; antithetic
+    # pairs are drawn together. Sobol paths are treated as independent,
+    # which overstates their error.
+    if sim_config.variance_reduction.antithetic and n_paths % 2 == 0:
+        pairs = rng.integers(0, n_paths // 2, size=(n_resamples, n_paths // 2))
+        return (2 * pairs[:, :, None] + np.arange(2)).reshape(n_resamples, n_paths)
+    return rng.integers(0, n_paths, size=(n_resamples, n_paths))
+
+
+def bootstrap_quantiles(values: np.ndarray, q: float, indices: np.ndarray) -> np.ndarray:
+    # (resample, column) q-quantiles of the (path, column) values: every
+    # column is resampled with the same paths, so differences between
+    # strategies keep the pairing of their common market paths
+    values = np.asarray(values, dtype=np.float64)
+    return np.stack([np.quantile(values[resample], q, axis=0) for resample in indices])
+
+
+# summary statistics as quantile levels (None for the mean)
+STATISTIC_LEVELS = {"mean": None, "median": 0.5, "p05": 0.05, "p25": 0.25, "p75": 0.75, "p95": 0.95}
+BOOTSTRAP_RESAMPLES = 200
+
+
+def _quantile_error(values: np.ndarray, q: float) -> float:
+    # half the distance between the order statistics at ranks
+    # n q -/+ sqrt(n q (1 - q)): one binomial standard deviation of the count
+    # of values below the quantile, mapped through the sample distribution
+    values = np.sort(values)
+    n = len(values)
+    half_width = np.sqrt(n * q * (1.0 - q))
+    lower = int(np.clip(np.floor(n * q - half_width), 0, n - 1))
+    upper = int(np.clip(np.ceil(n * q + half_width), 0, n - 1))
+    return float(values[upper] - values[lower]) / 2.0
+
+
+def precision_errors(
+    per_path: pd.DataFrame,
+    targets: List[PrecisionTargetConfig],
+    sim_config: SimulationConfig,
+    method: str = "asymptotic",
+) -> pd.DataFrame:
+    # Standard error of each target statistic: asymptotic (mean over the
+    # independent units, order statistics for quantiles, paths taken as
+    # independent) or from a bootstrap of the paths.
+    indices = None
+    if method == "bootstrap":
+        rng = np.random.default_rng(sim_config.seed)
+        indices = bootstrap_indices(len(per_path), BOOTSTRAP_RESAMPLES, rng, sim_config)
+    rows = []
+    for target in targets:
+        values = per_path[target.metric].to_numpy(dtype=np.float64)
+        q = STATISTIC_LEVELS[target.statistic]
+        if indices is not None:
+            if q is None:
+                replicates = values[indices].mean(axis=1)
+            else:
+                replicates = bootstrap_quantiles(values[:, None], q, indices)[:, 0]
+            error = float(replicates.std(ddof=1))
+        elif q is None:
+            error = _mean_and_error(_independent_units(values, sim_config))[1]
+        else:
+            error = _quantile_error(values, q)
+        rows.append(
+            {
+                "metric": target.metric,
+                "statistic": target.statistic,
+                "estimate": float(values.mean() if q is None else np.quantile(values, q)),
+                "standard_error": error,
+                "tolerance": target.tolerance,
+                "met": error <= target.tolerance,
+                "n_paths": len(values),
+            }
+        )
+    return pd.DataFrame(rows)
 
 
 def select_ranking(
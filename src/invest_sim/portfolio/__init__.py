@@ -1,4 +1,4 @@
-from invest_sim.portfolio.engine import simulate_portfolio
+from invest_sim.portfolio.engine import simulate_portfolio, simulate_strategies
 from invest_sim.portfolio.orders import RebalanceOrder
 
-__all__ = ["RebalanceOrder", "simulate_portfolio"]
+__all__ = ["RebalanceOrder", "simulate_portfolio", "simulate_strategies"]
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from invest_sim.config.schemas import CostModelConfig
+import numpy as np
+
+from invest_sim.config.schemas import BrokerConfig, CostModelConfig
 
 
 @dataclass(frozen=True)
@@ -11,11 +13,34 @@ class TransactionCostResult:
     n_orders: int
 
 
-def compute_transaction_costs(cost_model: CostModelConfig, traded_notional: float, n_orders: int) -> TransactionCostResult:
-    broker_cost = 0.0
-    if cost_model.broker.model == "fixed_per_order":
-        broker_cost = n_orders * cost_model.broker.fixed_fee_eur
-    elif cost_model.broker.model == "bps_notional":
-        broker_cost = traded_notional * (cost_model.broker.bps / 1e4)
+def _tiered_broker_cost(broker: BrokerConfig, traded_notional: np.ndarray) -> np.ndarray:
+    # marginal schedule: each tier's bps applies to the slice of notional inside it
+    cost = np.zeros_like(traded_notional, dtype=float)
+    lower = 0.0
+    for tier in broker.tiers:
+        upper = np.inf if tier.up_to_eur is None else tier.up_to_eur
+        cost += np.clip(traded_notional - lower, 0.0, upper - lower) * (tier.bps / 1e4)
+        lower = upper
+    return cost
+
+
+def compute_transaction_costs_array(
+    cost_model: CostModelConfig, traded_notional: np.ndarray, n_orders: np.ndarray
+) -> np.ndarray:
+    traded_notional = np.asarray(traded_notional, dtype=float)
+    n_orders = np.asarray(n_orders)
+    broker = cost_model.broker
+    broker_cost = np.zeros_like(traded_notional)
+    if broker.model == "fixed_per_order":
+        broker_cost = n_orders * broker.fixed_fee_eur
+    elif broker.model == "bps_notional":
+        broker_cost = traded_notional * (broker.bps / 1e4)
+    elif broker.model == "tiered":
+        broker_cost = np.maximum(_tiered_broker_cost(broker, traded_notional), n_orders * broker.min_fee_eur)
     slippage_cost = traded_notional * (cost_model.slippage_bps / 1e4)
-    return TransactionCostResult(total_cost=broker_cost + slippage_cost, n_orders=n_orders)
+    return broker_cost + slippage_cost
+
+
+def compute_transaction_costs(cost_model: CostModelConfig, traded_notional: float, n_orders: int) -> TransactionCostResult:
+    total_cost = compute_transaction_costs_array(cost_model, np.array([traded_notional]), np.array([n_orders]))
+    return TransactionCostResult(total_cost=float(total_cost[0]), n_orders=n_orders)
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import itertools
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 
+from invest_sim.calendar import contribution_days, rebalance_days
+from invest_sim.config.checks import check_time_step
 from invest_sim.config.schemas import (
     CostModelConfig,
     MarketPaths,
@@ -13,8 +16,10 @@ from invest_sim.config.schemas import (
     StrategyConfig,
     UniverseConfig,
 )
-from invest_sim.market.leveraged import compute_leveraged_returns
-from invest_sim.portfolio.costs import compute_transaction_costs
+from invest_sim.market.leveraged import build_return_expansion
+from invest_sim.metrics.accumulator import MetricsAccumulator
+from invest_sim.portfolio.costs import compute_transaction_costs_array
+from invest_sim.portfolio.volatility import volatility_estimator
 
 
 @dataclass
@@ -25,13 +30,34 @@ class AssetUniverse:
     cash_included: bool
 
 
+def _market_blocks(
+    market_paths: Union[MarketPaths, Iterable[MarketPaths]], sim_config: SimulationConfig
+) -> Tuple[int, MarketPaths, Iterator[MarketPaths]]:
+    if isinstance(market_paths, MarketPaths):
+        t_steps = market_paths.returns.shape[0]
+        step = sim_config.block_steps
+        blocks: Iterator[MarketPaths] = (
+            MarketPaths(
+                returns=market_paths.returns[start : start + step],
+                asset_ids=market_paths.asset_ids,
+                regime=None if market_paths.regime is None else market_paths.regime[start : start + step],
+            )
+            for start in range(0, t_steps, step)
+        )
+    else:
+        t_steps = sim_config.t_steps
+        blocks = iter(market_paths)
+    first = next(blocks)
+    return t_steps, first, itertools.chain([first], blocks)
+
+
 def _build_asset_universe(
-    market_paths: MarketPaths, universe: UniverseConfig, strategy: StrategyConfig
+    market_paths: MarketPaths, universe: UniverseConfig, allow_cash: bool
 ) -> Tuple[AssetUniverse, Dict[str, int]]:
     base_asset_ids = market_paths.asset_ids
     leveraged_asset_ids = [asset.id for asset in (universe.leveraged_assets or [])]
     asset_ids = base_asset_ids + leveraged_asset_ids
-    if strategy.constraints.allow_cash:
+    if allow_cash:
         asset_ids.append("CASH")
     index = {asset_id: idx for idx, asset_id in enumerate(asset_ids)}
     return (
@@ -39,7 +65,7 @@ def _build_asset_universe(
             asset_ids=asset_ids,
             base_asset_ids=base_asset_ids,
             leveraged_asset_ids=leveraged_asset_ids,
-            cash_included=strategy.constraints.allow_cash,
+            cash_included=allow_cash,
         ),
         index,
     )
@@ -59,21 +85,6 @@ def _target_weights_vector(
     return weights
 
 
-def _should_rebalance(
-    step: int, sim_config: SimulationConfig, strategy: StrategyConfig
-) -> bool:
-    freq = sim_config.rebalancing.frequency
-    if freq == "none":
-        return False
-    if freq == "monthly":
-        return step % 21 == 0
-    if freq == "quarterly":
-        return step % 63 == 0
-    if freq == "annual":
-        return step % sim_config.trading_days_per_year == 0
-    return False
-
-
 def _apply_vol_targeting(
     base_weights: np.ndarray,
     universe: AssetUniverse,
@@ -110,6 +121,9 @@ def _apply_vol_targeting(
         elif scaled.ndim == 2 and scaled.shape[1] == 1:
             scaled = np.repeat(scaled, scale.size, axis=1)
     scaled[risky_indices] = scaled[risky_indices] * scale
+    # no synthetic borrowing either way: an exposure above the NAV is scaled
+    # back to it, leverage only coming from the leveraged assets held
+    scaled[risky_indices] = scaled[risky_indices] / np.maximum(scaled[risky_indices].sum(axis=0), 1.0)
     cash_idx = universe.asset_ids.index("CASH") if universe.cash_included else None
     if cash_idx is not None:
         scaled[cash_idx] = np.maximum(0.0, 1.0 - scaled[risky_indices].sum(axis=0))
@@ -117,120 +131,220 @@ def _apply_vol_targeting(
 
 
 def simulate_portfolio(
-    market_paths: MarketPaths,
+    market_paths: Union[MarketPaths, Iterable[MarketPaths]],
     universe: UniverseConfig,
     strategy: StrategyConfig,
     cost_model: CostModelConfig,
     sim_config: SimulationConfig,
+    track_nav_quantiles: bool = True,
 ) -> PortfolioPaths:
-    asset_universe, index_map = _build_asset_universe(market_paths, universe, strategy)
-    t_steps, _, n_paths = market_paths.returns.shape
+    return simulate_strategies(
+        market_paths, universe, [strategy], cost_model, sim_config, track_nav_quantiles=track_nav_quantiles
+    )[0]
+
+
+def simulate_strategies(
+    market_paths: Union[MarketPaths, Iterable[MarketPaths]],
+    universe: UniverseConfig,
+    strategies: List[StrategyConfig],
+    cost_model: CostModelConfig,
+    sim_config: SimulationConfig,
+    track_nav_quantiles: bool = False,
+) -> List[PortfolioPaths]:
+    # market_paths is either a fully sampled MarketPaths or a stream of
+    # time blocks (MarketModel.iter_paths); only one block is held at a time.
+    # All strategies share one (strategy, asset, path) holdings tensor, so
+    # gross returns and their cumulative growth are built once per segment.
+    if not strategies:
+        raise ValueError("at least one strategy is required")
+    for strategy in strategies:
+        check_time_step(sim_config, universe, strategy)
+    t_steps, first_block, blocks = _market_blocks(market_paths, sim_config)
+    allow_cash = np.array([strategy.constraints.allow_cash for strategy in strategies])
+    asset_universe, index_map = _build_asset_universe(first_block, universe, bool(allow_cash.any()))
+    strategy_universes = [
+        _build_asset_universe(first_block, universe, strategy.constraints.allow_cash)[0]
+        for strategy in strategies
+    ]
+    expansion = build_return_expansion(
+        universe, asset_universe.base_asset_ids, sim_config.steps_per_year, asset_universe.cash_included
+    )
+    n_strategies = len(strategies)
+    n_paths = first_block.returns.shape[2]
     asset_count = len(asset_universe.asset_ids)
+    # nav/weights/turnover are stored in the configured precision; holdings
+    # and the running nav stay float64 so compounding does not drift
+    dtype = sim_config.float_dtype
 
-    nav = np.zeros((t_steps + 1, n_paths))
-    nav[0] = sim_config.initial_capital_eur
-    holdings = np.zeros((asset_count, n_paths))
+    # CASH is the last asset, so a strategy without cash maps onto the
+    # leading rows of the shared asset axis
+    base_weights = np.zeros((n_strategies, asset_count))
+    for s, (strategy, strategy_universe) in enumerate(zip(strategies, strategy_universes)):
+        base_weights[s, : len(strategy_universe.asset_ids)] = _target_weights_vector(strategy_universe, strategy)
 
-    base_weights = _target_weights_vector(asset_universe, strategy)
-    holdings[:, :] = base_weights[:, None] * nav[0]
+    # without saved NAV paths only streaming metric state is kept, so memory
+    # does not grow with the horizon
+    if sim_config.output.save_nav_paths:
+        nav = np.zeros((n_strategies, t_steps + 1, n_paths), dtype=dtype)
+        nav[:, 0] = sim_config.initial_capital_eur
+        accumulator = None
+    else:
+        nav = None
+        accumulator = MetricsAccumulator(
+            sim_config,
+            t_steps,
+            np.full((n_strategies, n_paths), sim_config.initial_capital_eur),
+            track_quantiles=track_nav_quantiles,
+            checkpoints=sim_config.horizon_checkpoints,
+        )
+    holdings = np.repeat(base_weights[:, :, None] * sim_config.initial_capital_eur, n_paths, axis=2)
 
     weights = (
-        np.zeros((t_steps + 1, asset_count, n_paths))
+        np.zeros((n_strategies, t_steps + 1, asset_count, n_paths), dtype=dtype)
         if sim_config.output.save_weights_paths
         else None
     )
     turnover = (
-        np.zeros((t_steps, n_paths)) if sim_config.output.save_turnover_paths else None
+        np.zeros((n_strategies, t_steps, n_paths), dtype=dtype)
+        if sim_config.output.save_turnover_paths
+        else None
     )
 
     if weights is not None:
-        weights[0] = base_weights[:, None]
-
-    base_asset_ids = asset_universe.base_asset_ids
-    base_asset_map = {asset_id: idx for idx, asset_id in enumerate(base_asset_ids)}
-
-    leveraged_assets = {asset.id: asset for asset in (universe.leveraged_assets or [])}
-    asset_config = {asset.id: asset for asset in universe.assets}
-
-    lookback = strategy.overlays.vol_targeting.lookback_days
-    port_ret_history = np.zeros((t_steps, n_paths))
-
-    for t in range(t_steps):
-        daily_returns = np.zeros((asset_count, n_paths))
-        for asset_id in base_asset_ids:
-            idx = index_map[asset_id]
-            base_idx = base_asset_map[asset_id]
-            asset = asset_config[asset_id]
-            ter_daily = asset.ter_annual / sim_config.trading_days_per_year
-            daily_returns[idx] = market_paths.returns[t, base_idx, :] - ter_daily
-
-        for asset_id in asset_universe.leveraged_asset_ids:
-            idx = index_map[asset_id]
-            leveraged = leveraged_assets[asset_id]
-            underlying_idx = base_asset_map[leveraged.underlying_id]
-            underlying_returns = market_paths.returns[t, underlying_idx, :]
-            # Use the leveraged asset's declared TER (required).
-            fee_annual = leveraged.ter_annual
-            daily_returns[idx] = compute_leveraged_returns(
-                underlying_returns,
-                leverage=leveraged.leverage,
-                fee_annual=fee_annual,
-                trading_days_per_year=sim_config.trading_days_per_year,
-            )
+        weights[:, 0] = base_weights[:, :, None]
+
+    rebalance = rebalance_days(sim_config, t_steps)
+    contribute = contribution_days(sim_config, t_steps)
+    # event mode compounds holdings over whole segments between event days and
+    # only steps into Python on them; daily mode makes every day an event
+    if sim_config.engine == "daily":
+        events = np.ones(t_steps, dtype=bool)
+    else:
+        events = rebalance | contribute
+    cash_idx = index_map.get("CASH")
+    no_cash = ~allow_cash
+    threshold = sim_config.rebalancing.threshold_abs
 
-        holdings *= 1.0 + daily_returns
-        nav[t + 1] = holdings.sum(axis=0)
-        port_ret_history[t] = np.where(nav[t] > 0, nav[t + 1] / nav[t] - 1.0, 0.0)
+    vol_targeted = [s for s, strategy in enumerate(strategies) if strategy.overlays.vol_targeting.enabled]
+    vol_estimators = [
+        volatility_estimator(strategies[s].overlays.vol_targeting, n_paths) for s in vol_targeted
+    ]
+    nav_prev = np.full((len(vol_targeted), n_paths), sim_config.initial_capital_eur)
+
+    gross_buffer = np.empty((0, asset_count, n_paths))
+    offset = 0
+    for block in blocks:
+        length = block.returns.shape[0]
+        segment_ends = np.flatnonzero(events[offset : offset + length])
+        if segment_ends.size == 0 or segment_ends[-1] != length - 1:
+            segment_ends = np.append(segment_ends, length - 1)
+        start = 0
+        for end in segment_ends:
+            first, t = offset + start, offset + end
+            if gross_buffer.shape[0] < end + 1 - start:
+                gross_buffer = np.empty((end + 1 - start, asset_count, n_paths))
+            # TER, leverage and CASH for the whole segment in one affine map;
+            # segment-sized buffers stay in cache for the cumulative product
+            growth = expansion.gross_returns(block.returns[start : end + 1], out=gross_buffer[: end + 1 - start])
+            # cumulative growth of each asset since the last event, in place
+            # (row-wise products are much faster than np.cumprod on axis 0)
+            for i in range(1, growth.shape[0]):
+                np.multiply(growth[i - 1], growth[i], out=growth[i])
+            path_nav = np.einsum("sap,lap->slp", holdings, growth)
+            if vol_targeted:
+                vt_nav = path_nav[vol_targeted]
+                nav_before = np.concatenate([nav_prev[:, None], vt_nav[:, :-1]], axis=1)
+                port_ret = np.where(nav_before > 0, vt_nav / nav_before - 1.0, 0.0)
+                for estimator, strategy_ret in zip(vol_estimators, port_ret):
+                    estimator.update(strategy_ret)
+            if nav is not None:
+                nav[:, first + 1 : t + 1] = path_nav[:, :-1]
+            if weights is not None and end > start:
+                inner_nav = path_nav[:, :-1, None, :]
+                weights[:, first + 1 : t + 1] = np.where(
+                    inner_nav > 0, holdings[:, None] * growth[None, :-1] / inner_nav, 0.0
+                )
+            holdings = holdings * growth[-1]
+            nav_now = path_nav[:, -1]
 
-        if sim_config.contributions.enabled:
-            day_index = min(sim_config.contributions.day_of_month - 1, 20)
-            if t % 21 == day_index:
-                cash_idx = index_map.get("CASH")
+            if contribute[t]:
+                amount = sim_config.contributions.monthly_amount_eur
                 if cash_idx is not None:
-                    holdings[cash_idx] += sim_config.contributions.monthly_amount_eur
-                else:
-                    nav[t + 1] += sim_config.contributions.monthly_amount_eur
-                    holdings *= nav[t + 1] / holdings.sum(axis=0)
-
-        if _should_rebalance(t, sim_config, strategy):
-            realized_vol_annual = np.full(n_paths, np.nan)
-            if strategy.overlays.vol_targeting.enabled and t >= lookback:
-                window = port_ret_history[t - lookback + 1 : t + 1]
-                realized_vol = np.std(window, axis=0, ddof=1)
-                realized_vol_annual = realized_vol * np.sqrt(sim_config.trading_days_per_year)
+                    holdings[allow_cash, cash_idx] += amount
+                if no_cash.any():
+                    nav_now[no_cash] += amount
+                    holdings[no_cash] *= (
+                        nav_now[no_cash] / holdings[no_cash].sum(axis=1)
+                    )[:, None, :]
+            if nav is not None:
+                nav[:, t + 1] = nav_now
             else:
-                realized_vol_annual = np.full(n_paths, 0.0)
+                path_nav[:, -1] = nav_now
+                accumulator.update(path_nav.transpose(1, 0, 2))
+            if vol_targeted:
+                nav_prev = nav_now[vol_targeted]
 
-            target_weights = _apply_vol_targeting(
-                base_weights[:, None], asset_universe, strategy, realized_vol_annual
-            )
-            current_nav = holdings.sum(axis=0)
-            current_weights = np.where(current_nav > 0, holdings / current_nav, 0.0)
-            diff = np.abs(current_weights - target_weights)
-            if sim_config.rebalancing.threshold_abs == 0 or np.any(
-                diff > sim_config.rebalancing.threshold_abs
-            ):
-                target_values = target_weights * current_nav
-                trades = target_values - holdings
-                mask = np.abs(trades) >= cost_model.min_trade_eur
-                trades = np.where(mask, trades, 0.0)
-                traded_notional = np.sum(np.abs(trades), axis=0)
-                n_orders = np.sum(trades != 0, axis=0)
-                for p in range(n_paths):
-                    cost = compute_transaction_costs(
-                        cost_model, traded_notional[p], int(n_orders[p])
-                    ).total_cost
-                    cash_idx = index_map.get("CASH")
-                    if cash_idx is not None:
-                        holdings[cash_idx, p] -= cost
+            if rebalance[t]:
+                current_nav = holdings.sum(axis=1)
+                target_weights = np.repeat(base_weights[:, :, None], n_paths, axis=2)
+                for k, s in enumerate(vol_targeted):
+                    strategy = strategies[s]
+                    lookback = strategy.overlays.vol_targeting.lookback_days
+                    if t >= lookback:
+                        realized_vol_annual = vol_estimators[k].std() * np.sqrt(sim_config.steps_per_year)
                     else:
-                        holdings[:, p] *= (current_nav[p] - cost) / current_nav[p]
-                holdings += trades
-                if turnover is not None:
-                    turnover[t] = np.where(current_nav > 0, traded_notional / current_nav, 0.0)
+                        realized_vol_annual = np.full(n_paths, 0.0)
+                    strategy_assets = len(strategy_universes[s].asset_ids)
+                    target_weights[s, :strategy_assets] = _apply_vol_targeting(
+                        base_weights[s, :strategy_assets, None],
+                        strategy_universes[s],
+                        strategy,
+                        realized_vol_annual,
+                    )
+                # each (strategy, path) rebalances on its own drift; trades and
+                # costs are only computed on the compacted triggered subset
+                if threshold == 0:
+                    triggered = np.ones((n_strategies, n_paths), dtype=bool)
+                else:
+                    current_weights = np.where(current_nav[:, None] > 0, holdings / current_nav[:, None], 0.0)
+                    triggered = np.any(np.abs(current_weights - target_weights) > threshold, axis=1)
+                strategy_idx, path_idx = np.nonzero(triggered)
+                if strategy_idx.size:
+                    sub_holdings = holdings[strategy_idx, :, path_idx]
+                    sub_nav = current_nav[strategy_idx, path_idx]
+                    trades = target_weights[strategy_idx, :, path_idx] * sub_nav[:, None] - sub_holdings
+                    trades = np.where(np.abs(trades) >= cost_model.min_trade_eur, trades, 0.0)
+                    traded_notional = np.sum(np.abs(trades), axis=1)
+                    n_orders = np.sum(trades != 0, axis=1)
+                    costs = compute_transaction_costs_array(cost_model, traded_notional, n_orders)
+                    sub_cash = allow_cash[strategy_idx]
+                    if cash_idx is not None:
+                        sub_holdings[sub_cash, cash_idx] -= costs[sub_cash]
+                    sub_no_cash = ~sub_cash
+                    if sub_no_cash.any():
+                        kept = np.divide(sub_nav - costs, sub_nav, out=np.ones_like(sub_nav), where=sub_nav > 0)
+                        sub_holdings[sub_no_cash] *= kept[sub_no_cash, None]
+                    holdings[strategy_idx, :, path_idx] = sub_holdings + trades
+                    if turnover is not None:
+                        turnover[strategy_idx, t, path_idx] = np.where(sub_nav > 0, traded_notional / sub_nav, 0.0)
 
-        if weights is not None:
-            current_nav = holdings.sum(axis=0)
-            weights[t + 1] = np.where(current_nav > 0, holdings / current_nav, 0.0)
+            if weights is not None:
+                current_nav = holdings.sum(axis=1)
+                weights[:, t + 1] = np.where(current_nav[:, None] > 0, holdings / current_nav[:, None], 0.0)
+            start = end + 1
+        offset += length
 
-    return PortfolioPaths(nav=nav, asset_ids=asset_universe.asset_ids, weights=weights, turnover=turnover)
+    summaries = accumulator.summaries() if accumulator is not None else [None] * n_strategies
+    results = []
+    for s, strategy_universe in enumerate(strategy_universes):
+        strategy_assets = len(strategy_universe.asset_ids)
+        results.append(
+            PortfolioPaths(
+                nav=None if nav is None else nav[s],
+                asset_ids=strategy_universe.asset_ids,
+                weights=None if weights is None else weights[s, :, :strategy_assets],
+                turnover=None if turnover is None else turnover[s],
+                nav_summary=summaries[s],
+            )
+        )
+    return results
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import Union
+
+import numpy as np
+
+from invest_sim.config.schemas import VolTargetingConfig
+
+
+class RollingVolatility:
+    # sample volatility (ddof=1) of the last `window` daily returns per path;
+    # a ring buffer with running sums keeps memory at O(window x paths) and
+    # updates at O(paths) per day
+
+    def __init__(self, window: int, n_paths: int) -> None:
+        self.window = window
+        self._buffer = np.zeros((window, n_paths))
+        self._sum = np.zeros(n_paths)
+        self._sum_sq = np.zeros(n_paths)
+        self._pos = 0
+        self._count = 0
+
+    def update(self, returns: np.ndarray) -> None:
+        # returns: (days, paths), oldest first
+        length = returns.shape[0]
+        self._count += length
+        if length >= self.window:
+            self._buffer[:] = returns[-self.window :]
+            self._pos = 0
+            self._resync()
+            return
+        rows = (self._pos + np.arange(length)) % self.window
+        evicted = self._buffer[rows]
+        self._sum += returns.sum(axis=0) - evicted.sum(axis=0)
+        self._sum_sq += np.square(returns).sum(axis=0) - np.square(evicted).sum(axis=0)
+        self._buffer[rows] = returns
+        wrapped = self._pos + length >= self.window
+        self._pos = (self._pos + length) % self.window
+        if wrapped:
+            # recompute the sums once per window to bound rounding drift
+            self._resync()
+
+    def _resync(self) -> None:
+        self._sum = self._buffer.sum(axis=0)
+        self._sum_sq = np.square(self._buffer).sum(axis=0)
+
+    def std(self) -> np.ndarray:
+        n = min(self._count, self.window)
+        if n < 2:
+            return np.zeros_like(self._sum)
+        variance = (self._sum_sq - self._sum * self._sum / n) / (n - 1)
+        return np.sqrt(np.maximum(variance, 0.0))
+
+
+class EwmaVolatility:
+    # var_t = lam * var_(t-1) + (1 - lam) * r_t^2, bias-corrected for the zero
+    # initial state; only the current variance is kept
+
+    def __init__(self, decay: float, n_paths: int) -> None:
+        self.decay = decay
+        self._variance = np.zeros(n_paths)
+        self._count = 0
+
+    def update(self, returns: np.ndarray) -> None:
+        length = returns.shape[0]
+        weights = (1.0 - self.decay) * self.decay ** np.arange(length - 1, -1, -1)
+        self._variance = self.decay**length * self._variance + weights @ np.square(returns)
+        self._count += length
+
+    def std(self) -> np.ndarray:
+        if self._count == 0:
+            return np.zeros_like(self._variance)
+        return np.sqrt(self._variance / (1.0 - self.decay**self._count))
+
+
+def volatility_estimator(
+    config: VolTargetingConfig, n_paths: int
+) -> Union[RollingVolatility, EwmaVolatility]:
+    if config.estimator == "ewma":
+        return EwmaVolatility(config.ewma_lambda, n_paths)
+    return RollingVolatility(config.lookback_days, n_paths)
@@ -1,18 +1,24 @@
 from invest_sim.reporting.plots import (
     plot_cdf,
     plot_nav_fanchart,
+    plot_nav_quantiles,
+    plot_optimization_progress,
     plot_scatter_cagr_vs_dd,
     plot_strategy_cdf,
     plot_strategy_scatter,
 )
-from invest_sim.reporting.report import write_comparison_report, write_report
+from invest_sim.reporting.report import write_comparison_report, write_optimization_report, write_report, write_sweep_report
 
 __all__ = [
     "plot_nav_fanchart",
+    "plot_nav_quantiles",
     "plot_cdf",
+    "plot_optimization_progress",
     "plot_scatter_cagr_vs_dd",
     "plot_strategy_cdf",
     "plot_strategy_scatter",
     "write_comparison_report",
+    "write_optimization_report",
     "write_report",
+    "write_sweep_report",
 ]
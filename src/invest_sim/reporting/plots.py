@@ -8,11 +8,16 @@ import numpy as np
 import pandas as pd
 
 from invest_sim.config.schemas import PortfolioPaths
+from invest_sim.metrics.accumulator import NAV_QUANTILES
 
 
 def plot_nav_fanchart(nav: np.ndarray, output_path: Path) -> None:
-    quantiles = np.quantile(nav, [0.05, 0.25, 0.5, 0.75, 0.95], axis=1)
-    x = np.arange(nav.shape[0])
+    plot_nav_quantiles(np.quantile(nav, NAV_QUANTILES, axis=1), output_path)
+
+
+def plot_nav_quantiles(quantiles: np.ndarray, output_path: Path) -> None:
+    # quantiles: (5, days) at NAV_QUANTILES, e.g. accumulated during the simulation
+    x = np.arange(quantiles.shape[1])
     plt.figure(figsize=(8, 4))
     plt.fill_between(x, quantiles[0], quantiles[4], color="skyblue", alpha=0.3, label="5-95%")
     plt.fill_between(x, quantiles[1], quantiles[3], color="steelblue", alpha=0.4, label="25-75%")
@@ -69,3 +74,22 @@ def plot_strategy_cdf(metrics_by_strategy: Dict[str, pd.DataFrame], column: str,
 
 def plot_strategy_scatter(summary: pd.DataFrame, output_path: Path) -> None:
     plot_scatter_cagr_vs_dd(summary, output_path)
+
+
+def plot_optimization_progress(evaluations: pd.DataFrame, output_path: Path) -> None:
+    # every evaluated candidate in order, and the best feasible one so far
+    order = np.arange(1, len(evaluations) + 1)
+    feasible = evaluations["feasible"].to_numpy(dtype=bool)
+    cagr = evaluations["cagr_median"].to_numpy(dtype=float)
+    best = np.maximum.accumulate(np.where(feasible, cagr, -np.inf))
+    plt.figure(figsize=(6, 4))
+    plt.scatter(order[feasible], cagr[feasible], color="tab:blue", s=12, label="feasible")
+    plt.scatter(order[~feasible], cagr[~feasible], color="tab:gray", s=12, label="drawdown limit exceeded")
+    plt.step(order[np.isfinite(best)], best[np.isfinite(best)], where="post", color="tab:red", label="best feasible")
+    plt.xlabel("Evaluation")
+    plt.ylabel("Median CAGR")
+    plt.title("Optimization progress")
+    plt.legend(fontsize=8)
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=150)
+    plt.close()
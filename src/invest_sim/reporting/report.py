@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 import pandas as pd
 
+if TYPE_CHECKING:
+    from invest_sim.config.schemas import StrategyConfig
+
 
 def _format_table(df: pd.DataFrame, *, index: bool) -> str:
     try:
@@ -13,12 +16,37 @@ def _format_table(df: pd.DataFrame, *, index: bool) -> str:
         return df.to_string(index=index)
 
 
+def _horizon_section(by_horizon: pd.DataFrame) -> List[str]:
+    # median CAGR, p95 max drawdown and median ES 95% of every horizon
+    table = pd.concat(
+        {
+            "cagr_median": by_horizon.xs("median", level="statistic")["cagr"],
+            "p95_max_drawdown": by_horizon.xs("p95", level="statistic")["max_drawdown"],
+            "median_es_95": by_horizon.xs("median", level="statistic")["es_95"],
+            "final_value_median": by_horizon.xs("median", level="statistic")["final_value"],
+        },
+        axis=1,
+    )
+    lines = ["## Metrics by Horizon", ""]
+    lines.append(
+        "Every horizon is read from the same paths, simulated once over the longest one; "
+        "the full table is in metrics_by_horizon.csv."
+    )
+    lines.append("")
+    lines.append(_format_table(table.reset_index(), index=False))
+    lines.append("")
+    return lines
+
+
 def write_report(
     output_dir: Path,
     config_files: List[Path],
     summary: pd.DataFrame,
     ranking: pd.DataFrame,
     pareto: pd.DataFrame,
+    standard_errors: Optional[pd.DataFrame] = None,
+    precision: Optional[pd.DataFrame] = None,
+    by_horizon: Optional[pd.DataFrame] = None,
 ) -> None:
     lines = ["# PEA Simulation Report", "", "## Configs", ""]
     for cfg in config_files:
@@ -28,6 +56,26 @@ def write_report(
     lines.append("")
     lines.append(_format_table(summary, index=True))
     lines.append("")
+    if by_horizon is not None:
+        lines.extend(_horizon_section(by_horizon))
+    if standard_errors is not None:
+        lines.append("## Standard Errors of the Mean")
+        lines.append("")
+        lines.append(
+            "se_iid: independent paths; se_antithetic: antithetic pairs; "
+            "se_qmc: Sobol replications; mean_cv/se_cv: control variate."
+        )
+        lines.append("")
+        lines.append(_format_table(standard_errors, index=True))
+        lines.append("")
+    if precision is not None:
+        lines.append("## Achieved Precision")
+        lines.append("")
+        outcome = "all targets met" if precision["met"].all() else "path cap (n_paths) reached before every target was met"
+        lines.append(f"Paths added shard by shard until every standard error met its tolerance: {outcome}.")
+        lines.append("")
+        lines.append(_format_table(precision, index=False))
+        lines.append("")
     lines.append("## Ranking")
     lines.append("")
     lines.append(_format_table(ranking, index=False))
@@ -44,6 +92,8 @@ def write_comparison_report(
     ranking: pd.DataFrame,
     pareto: pd.DataFrame,
     base_config: Dict = None,
+    racing: Optional[pd.DataFrame] = None,
+    by_horizon: Optional[pd.DataFrame] = None,
 ) -> None:
     lines = ["# PEA Strategy Comparison", ""]
     
@@ -73,6 +123,8 @@ def write_comparison_report(
     lines.append("")
     lines.append(_format_table(summary, index=False))
     lines.append("")
+    if by_horizon is not None:
+        lines.extend(_horizon_section(by_horizon))
     lines.append("## Ranking")
     lines.append("")
     lines.append(_format_table(ranking, index=False))
@@ -80,4 +132,111 @@ def write_comparison_report(
     lines.append("## Pareto Set")
     lines.append("")
     lines.append(_format_table(pareto, index=False))
-    output_dir.joinpath("report.md").write_text("\n".join(lines), encoding="utf-8")
\ No newline at end of file
+    if racing is not None:
+        eliminated = racing["eliminated_round"].notna()
+        lines.append("")
+        lines.append("## Racing")
+        lines.append("")
+        lines.append(
+            f"{int(eliminated.sum())} of {len(racing)} strategies eliminated before the full path count: "
+            "after `n_paths` paths, `dominated_by` (on the Pareto set) had a higher median CAGR and a lower "
+            "p95 max drawdown at the configured confidence. Only the survivors appear above."
+        )
+        lines.append("")
+        lines.append(_format_table(racing.sort_values(["rounds", "cagr_median"], ascending=False), index=False))
+    output_dir.joinpath("report.md").write_text("\n".join(lines), encoding="utf-8")
+
+
+def write_optimization_report(
+    output_dir: Path,
+    evaluations: pd.DataFrame,
+    ranking: pd.DataFrame,
+    pareto: pd.DataFrame,
+    best: Optional["StrategyConfig"],
+    optimize_config: Dict,
+    base_config: Dict,
+) -> None:
+    lines = ["# PEA Strategy Optimization", ""]
+    lines.append("## Search")
+    lines.append("")
+    lines.append(f"- **Assets**: {', '.join(optimize_config['assets'])}")
+    lines.append(f"- **Max weight**: {optimize_config['constraints']['max_weight']}")
+    lines.append(f"- **Cash allowed**: {optimize_config['constraints']['allow_cash']}")
+    lines.append(f"- **Vol targeting searched**: {optimize_config.get('vol_targeting') is not None}")
+    lines.append(f"- **P95 max drawdown limit**: {optimize_config['max_drawdown_p95_limit']}")
+    lines.append(
+        f"- **Evaluations**: {len(evaluations)} ({optimize_config['n_initial']} initial, "
+        f"{optimize_config['n_iterations']} batches of {optimize_config['batch_size']})"
+    )
+    lines.append(f"- **Paths per evaluation**: {base_config.get('n_paths', 'N/A'):,} (common to all candidates)")
+    lines.append(f"- **Horizon**: {base_config.get('n_years', 'N/A')} years")
+    lines.append("")
+    lines.append("## Best Strategy")
+    lines.append("")
+    if best is None:
+        lines.append("No candidate met the drawdown limit.")
+    else:
+        lines.append(f"`{best.name}` (written to best_strategy.yaml)")
+        lines.append("")
+        weights = pd.DataFrame({"asset": list(best.target_weights), "weight": list(best.target_weights.values())})
+        lines.append(_format_table(weights, index=False))
+        vol = best.overlays.vol_targeting
+        if vol.enabled:
+            lines.append("")
+            lines.append(
+                f"Vol targeting: target {vol.target_vol_annual}, "
+                f"leverage multiplier in [{vol.min_leverage_multiplier}, {vol.max_leverage_multiplier}]"
+            )
+    lines.append("")
+    lines.append("## Progress")
+    lines.append("")
+    progress = evaluations.groupby("iteration").agg(
+        evaluations=("strategy", "size"),
+        feasible=("feasible", "sum"),
+        batch_best_cagr_median=("cagr_median", lambda values: values[evaluations.loc[values.index, "feasible"]].max()),
+    )
+    progress["best_cagr_median_so_far"] = progress["batch_best_cagr_median"].cummax()
+    lines.append(_format_table(progress.reset_index(), index=False))
+    lines.append("")
+    lines.append("## Top Candidates")
+    lines.append("")
+    lines.append(_format_table(ranking.head(10), index=False))
+    lines.append("")
+    lines.append("## Pareto Set")
+    lines.append("")
+    lines.append(_format_table(pareto, index=False))
+    output_dir.joinpath("report.md").write_text("\n".join(lines), encoding="utf-8")
+
+
+def write_sweep_report(
+    output_dir: Path,
+    table: pd.DataFrame,
+    strategy_name: str,
+    base_config: Dict,
+) -> None:
+    lines = ["# PEA Parameter Sweep", ""]
+    lines.append(f"- **Strategy**: {strategy_name}")
+    lines.append(f"- **Cases**: {table['case'].nunique() - 1} (plus the base configs)")
+    lines.append(f"- **Paths per case**: {base_config.get('n_paths', 'N/A'):,} (the same random numbers in every case)")
+    unpaired = table.loc[~table["paired"], "case"].unique()
+    if len(unpaired):
+        lines.append(
+            f"- **Not paired**: {', '.join(unpaired)} (part of the random numbers redrawn, e.g. a new Student-t df)"
+        )
+    lines.append(f"- **Horizon**: {base_config.get('n_years', 'N/A')} years")
+    lines.append("")
+    lines.append("## Changes from the Base Case")
+    lines.append("")
+    lines.append(
+        "delta: case estimate minus base estimate; delta_se: paired bootstrap standard error of the delta; "
+        "delta_se_independent: what it would be with independently sampled cases; "
+        "paired: false when the case shares only part of its random numbers with the base case, "
+        "so that its delta_se does not have the full benefit of common random numbers."
+    )
+    lines.append("")
+    for (metric, statistic), rows in table.groupby(["metric", "statistic"], sort=False):
+        lines.append(f"### {statistic} {metric}")
+        lines.append("")
+        lines.append(_format_table(rows.drop(columns=["metric", "statistic"]), index=False))
+        lines.append("")
+    output_dir.joinpath("report.md").write_text("\n".join(lines), encoding="utf-8")
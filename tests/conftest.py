@@ -2,3 +2,70 @@ import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from invest_sim.config.schemas import (  # noqa: E402
+    CorrelationConfig,
+    CostModelConfig,
+    SimulationConfig,
+    StrategyConfig,
+    UniverseConfig,
+)
+
+# Builders shared by the test modules (imported with `from conftest import`):
+# each module only passes what it changes.
+
+
+def world_sp500_universe():
+    return UniverseConfig(
+        assets=[
+            {"id": "WORLD", "mu_annual": 0.07, "sigma_annual": 0.15, "ter_annual": 0.0},
+            {"id": "SP500", "mu_annual": 0.075, "sigma_annual": 0.16, "ter_annual": 0.0},
+        ],
+        correlations=CorrelationConfig(matrix=[[1.0, 0.9], [0.9, 1.0]]),
+        leveraged_assets=None,
+    )
+
+
+def make_strategy(target_weights, name="test"):
+    # a fully invested strategy without vol targeting
+    return StrategyConfig(
+        name=name,
+        target_weights=target_weights,
+        constraints={"max_weight": 1.0, "allow_cash": False},
+        overlays={
+            "vol_targeting": {
+                "enabled": False,
+                "target_vol_annual": 0.12,
+                "lookback_days": 63,
+                "max_leverage_multiplier": 1.0,
+                "min_leverage_multiplier": 0.0,
+            }
+        },
+    )
+
+
+def make_cost_model(bps=5.0, slippage_bps=2.0):
+    return CostModelConfig(
+        broker={"model": "bps_notional", "fixed_fee_eur": 0.0, "bps": bps},
+        slippage_bps=slippage_bps,
+        ter_accrual="daily",
+        min_trade_eur=0.0,
+    )
+
+
+def make_sim_config(**overrides):
+    # one daily year without contributions, rebalancing or saved paths
+    data = dict(
+        run_name="test",
+        time_step="D",
+        n_years=1,
+        trading_days_per_year=252,
+        n_paths=100,
+        seed=1,
+        initial_capital_eur=1000.0,
+        contributions={"enabled": False, "monthly_amount_eur": 0.0, "day_of_month": 1},
+        rebalancing={"frequency": "none", "threshold_abs": 0.0},
+        output={"base_dir": "runs", "save_nav_paths": False, "save_weights_paths": False, "save_turnover_paths": False},
+    )
+    data.update(overrides)
+    return SimulationConfig(**data)
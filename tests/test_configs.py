@@ -1,6 +1,19 @@
 from pathlib import Path
 
-from invest_sim.config import load_cost_model, load_market_model, load_simulation, load_strategy, load_universe
+import pytest
+import yaml
+from pydantic import ValidationError
+
+from invest_sim.config import (
+    check_time_step,
+    load_cost_model,
+    load_market_model,
+    load_optimize,
+    load_simulation,
+    load_strategy,
+    load_universe,
+)
+from invest_sim.config.schemas import SimulationConfig
 
 
 def test_configs_load():
@@ -18,5 +31,50 @@ def test_configs_load():
     load_market_model(market_gbm)
     load_market_model(market_student)
     load_market_model(market_regimes)
+    load_optimize(Path("configs/optimize.yaml"))
     for path in strategies.glob("*.yaml"):
         load_strategy(path)
+
+
+def test_antithetic_sampling_requires_even_path_count():
+    data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    data["variance_reduction"] = {"antithetic": True}
+    data["n_paths"] = 101
+    with pytest.raises(ValidationError, match="n_paths must be even"):
+        SimulationConfig(**data)
+    data["n_paths"] = 100
+    assert SimulationConfig(**data).variance_reduction.antithetic
+
+
+def test_horizon_checkpoints():
+    data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    data.update(n_years=10, horizons_years=[10, 2, 5, 2])
+    assert SimulationConfig(**data).horizon_checkpoints == [2 * 252, 5 * 252]
+    assert SimulationConfig(**{**data, "time_step": "M"}).horizon_checkpoints == [24, 60]
+    with pytest.raises(ValidationError, match="horizons_years"):
+        SimulationConfig(**{**data, "horizons_years": [20]})
+
+
+def test_sobol_sampler_validation():
+    data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    data.update(sampler="sobol", n_paths=1024, qmc_replications=8)
+    assert SimulationConfig(**data).sampler == "sobol"
+    with pytest.raises(ValidationError, match="multiple of qmc_replications"):
+        SimulationConfig(**{**data, "n_paths": 1020})
+    with pytest.raises(ValidationError, match="antithetic"):
+        SimulationConfig(**{**data, "variance_reduction": {"antithetic": True}})
+
+
+def test_coarse_time_step_rejects_daily_reset_strategies():
+    data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    monthly = SimulationConfig(**{**data, "time_step": "M"})
+    assert monthly.t_steps == 12 * monthly.n_years
+    universe = load_universe(Path("configs/universe.yaml"))
+    strategies = Path("configs/strategies")
+    check_time_step(monthly, universe, load_strategy(strategies / "mono" / "mono_world.yaml"))
+    with pytest.raises(ValueError, match="leveraged"):
+        check_time_step(monthly, universe, load_strategy(strategies / "mono" / "mono_nasdaq_x2.yaml"))
+    with pytest.raises(ValueError, match="vol targeting"):
+        check_time_step(monthly, universe, load_strategy(strategies / "vol_targeting" / "vol_targeting_world.yaml"))
+    with pytest.raises(ValidationError, match="time_step"):
+        SimulationConfig(**{**data, "time_step": "Q"})
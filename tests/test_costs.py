@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from invest_sim.config.schemas import CostModelConfig
+from invest_sim.portfolio.costs import compute_transaction_costs, compute_transaction_costs_array
+
+
+def _cost_model(broker, slippage_bps=1.0):
+    return CostModelConfig(broker=broker, slippage_bps=slippage_bps, ter_accrual="daily", min_trade_eur=0.0)
+
+
+def test_array_costs_match_scalar_costs():
+    traded_notional = np.array([0.0, 150.0, 2500.0, 40000.0])
+    n_orders = np.array([0, 1, 2, 3])
+    for broker in (
+        {"model": "fixed_per_order", "fixed_fee_eur": 2.5, "bps": 0.0},
+        {"model": "bps_notional", "fixed_fee_eur": 0.0, "bps": 2.0},
+    ):
+        cost_model = _cost_model(broker)
+        costs = compute_transaction_costs_array(cost_model, traded_notional, n_orders)
+        expected = [
+            compute_transaction_costs(cost_model, notional, int(orders)).total_cost
+            for notional, orders in zip(traded_notional, n_orders)
+        ]
+        assert np.allclose(costs, expected)
+
+
+def test_tiered_schedule_with_minimum_fee():
+    cost_model = _cost_model(
+        {
+            "model": "tiered",
+            "fixed_fee_eur": 0.0,
+            "bps": 0.0,
+            "min_fee_eur": 1.0,
+            "tiers": [{"up_to_eur": 1000.0, "bps": 50.0}, {"up_to_eur": 10000.0, "bps": 20.0}, {"bps": 10.0}],
+        },
+        slippage_bps=0.0,
+    )
+    costs = compute_transaction_costs_array(
+        cost_model, np.array([0.0, 100.0, 1000.0, 5000.0, 20000.0]), np.array([0, 2, 1, 1, 1])
+    )
+    # 100 EUR in two orders hits the per-order minimum, the rest follow the marginal tiers
+    assert np.allclose(costs, [0.0, 2.0, 5.0, 5.0 + 8.0, 5.0 + 18.0 + 10.0])
+
+
+def test_tiered_schedule_requires_increasing_tiers():
+    with pytest.raises(ValueError):
+        _cost_model(
+            {
+                "model": "tiered",
+                "fixed_fee_eur": 0.0,
+                "bps": 0.0,
+                "tiers": [{"up_to_eur": 5000.0, "bps": 20.0}, {"up_to_eur": 1000.0, "bps": 10.0}],
+            }
+        )
+
+
+def test_tier_options_are_rejected_on_other_broker_models():
+    for broker in (
+        {"model": "bps_notional", "fixed_fee_eur": 0.0, "bps": 2.0, "min_fee_eur": 1.0},
+        {"model": "fixed_per_order", "fixed_fee_eur": 2.5, "bps": 0.0, "tiers": [{"bps": 10.0}]},
+    ):
+        with pytest.raises(ValueError, match="tiered broker model"):
+            _cost_model(broker)
@@ -1,11 +1,20 @@
+import shutil
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+import pytest
 import yaml
 
+from invest_sim.experiments import compare as compare_module
+from invest_sim.experiments.compare import compare_strategies
 from invest_sim.experiments.run import run_experiment
+from invest_sim.experiments.store import ResultStore
+from invest_sim.portfolio import simulate_strategies
 
 
-def test_end_to_end_run(tmp_path: Path):
+@pytest.mark.parametrize("save_nav_paths", [True, False])
+def test_end_to_end_run(tmp_path: Path, save_nav_paths: bool):
     base = Path("configs/base.yaml")
     universe = Path("configs/universe.yaml")
     cost = Path("configs/cost_model.yaml")
@@ -16,6 +25,7 @@ def test_end_to_end_run(tmp_path: Path):
     base_data["n_years"] = 1
     base_data["n_paths"] = 50
     base_data["output"]["base_dir"] = str(tmp_path)
+    base_data["output"]["save_nav_paths"] = save_nav_paths
     temp_base = tmp_path / "base.yaml"
     temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
 
@@ -27,3 +37,276 @@ def test_end_to_end_run(tmp_path: Path):
     assert (result.output_dir / "metrics_summary.csv").exists()
     assert (result.output_dir / "plots" / "nav_fanchart.png").exists()
     assert (result.output_dir / "report.md").exists()
+    assert (result.output_dir / "nav_paths.npy").exists() == save_nav_paths
+
+
+def test_end_to_end_run_with_target_precision(tmp_path: Path):
+    base_data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    base_data["n_years"] = 1
+    base_data["n_paths"] = 400
+    base_data["shard_paths"] = 100
+    base_data["output"]["base_dir"] = str(tmp_path)
+    base_data["target_precision"] = {
+        "enabled": True,
+        "targets": [{"metric": "cagr", "statistic": "median", "tolerance": 0.05}],
+    }
+    temp_base = tmp_path / "base.yaml"
+    temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+
+    result = run_experiment(
+        temp_base,
+        Path("configs/universe.yaml"),
+        Path("configs/cost_model.yaml"),
+        Path("configs/market_models/gbm.yaml"),
+        Path("configs/strategies/mono/mono_world.yaml"),
+    )
+
+    assert len(result.metrics_per_path) == 100
+    precision = pd.read_csv(result.output_dir / "precision.csv")
+    assert precision["met"].all()
+    assert "## Achieved Precision" in (result.output_dir / "report.md").read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("save_nav_paths", [True, False])
+def test_run_with_horizons_matches_shorter_runs(tmp_path: Path, save_nav_paths: bool):
+    base_data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    base_data["n_years"] = 3
+    base_data["n_paths"] = 60
+    base_data["horizons_years"] = [1, 2, 3]
+    base_data["output"]["base_dir"] = str(tmp_path)
+    base_data["output"]["save_nav_paths"] = save_nav_paths
+    temp_base = tmp_path / "base.yaml"
+    temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+    configs = (
+        Path("configs/universe.yaml"),
+        Path("configs/cost_model.yaml"),
+        Path("configs/market_models/gbm.yaml"),
+        Path("configs/strategies/mono/mono_world.yaml"),
+    )
+
+    result = run_experiment(temp_base, *configs)
+    # its own output directory: runs started in the same second share a name
+    base_data.update(n_years=1, horizons_years=[])
+    base_data["output"]["base_dir"] = str(tmp_path / "one_year")
+    temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+    one_year = run_experiment(temp_base, *configs)
+
+    by_horizon = pd.read_csv(result.output_dir / "metrics_by_horizon.csv", index_col=[0, 1])
+    assert sorted(by_horizon.index.get_level_values("horizon_years").unique()) == [1, 2, 3]
+    # the first year of the 3-year paths is the 1-year run
+    pd.testing.assert_frame_equal(
+        by_horizon.loc[1], one_year.metrics_summary.rename_axis("statistic"), check_names=False, rtol=1e-9
+    )
+    assert list(result.metrics_summary.columns) == list(one_year.metrics_summary.columns)
+    assert "## Metrics by Horizon" in (result.output_dir / "report.md").read_text(encoding="utf-8")
+
+
+def test_target_precision_does_not_depend_on_workers(tmp_path: Path):
+    base_data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    base_data["n_years"] = 1
+    base_data["n_paths"] = 1200
+    base_data["shard_paths"] = 100
+    base_data["target_precision"] = {
+        "enabled": True,
+        "targets": [{"metric": "cagr", "statistic": "median", "tolerance": 0.008}],
+    }
+    outputs = {}
+    for workers in (1, 3):
+        base_data["output"]["base_dir"] = str(tmp_path / f"workers_{workers}")
+        temp_base = tmp_path / f"base_{workers}.yaml"
+        temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+        outputs[workers] = run_experiment(
+            temp_base,
+            Path("configs/universe.yaml"),
+            Path("configs/cost_model.yaml"),
+            Path("configs/market_models/gbm.yaml"),
+            Path("configs/strategies/mono/mono_world.yaml"),
+            workers=workers,
+        ).output_dir
+
+    # the target is met after 8 shards, not a whole number of 3-shard batches
+    assert len(pd.read_csv(outputs[1] / "metrics_per_path.csv")) == 800
+    for name in ("precision.csv", "metrics_per_path.csv"):
+        pd.testing.assert_frame_equal(pd.read_csv(outputs[1] / name), pd.read_csv(outputs[3] / name))
+
+
+def test_run_results_do_not_depend_on_workers(tmp_path: Path):
+    # without shard_paths, --workers 1 shards like --workers 2
+    base_data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    base_data["n_years"] = 1
+    base_data["n_paths"] = 2100
+    base_data.pop("shard_paths", None)
+    outputs = {}
+    for workers in (1, 2):
+        base_data["output"]["base_dir"] = str(tmp_path / f"workers_{workers}")
+        temp_base = tmp_path / f"base_{workers}.yaml"
+        temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+        outputs[workers] = run_experiment(
+            temp_base,
+            Path("configs/universe.yaml"),
+            Path("configs/cost_model.yaml"),
+            Path("configs/market_models/gbm.yaml"),
+            Path("configs/strategies/mono/mono_world.yaml"),
+            workers=workers,
+            use_cache=False,
+        ).output_dir
+
+    pd.testing.assert_frame_equal(
+        pd.read_csv(outputs[1] / "metrics_per_path.csv"), pd.read_csv(outputs[2] / "metrics_per_path.csv")
+    )
+
+
+def test_end_to_end_compare(tmp_path: Path):
+    base_data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    base_data["n_years"] = 1
+    base_data["n_paths"] = 50
+    base_data["output"]["base_dir"] = str(tmp_path)
+    temp_base = tmp_path / "base.yaml"
+    temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+
+    result = compare_strategies(
+        temp_base,
+        Path("configs/universe.yaml"),
+        Path("configs/cost_model.yaml"),
+        Path("configs/market_models/gbm.yaml"),
+        Path("configs/strategies"),
+    )
+
+    n_strategies = len(list(Path("configs/strategies").rglob("*.yaml")))
+    assert len(result.metrics_summary) == n_strategies
+    assert (result.output_dir / "metrics_summary_all_strategies.csv").exists()
+
+
+def test_compare_with_horizons_writes_one_table(tmp_path: Path):
+    base_data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    base_data["n_years"] = 2
+    base_data["n_paths"] = 50
+    base_data["horizons_years"] = [1]
+    base_data["output"]["base_dir"] = str(tmp_path)
+    temp_base = tmp_path / "base.yaml"
+    temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+
+    result = compare_strategies(
+        temp_base,
+        Path("configs/universe.yaml"),
+        Path("configs/cost_model.yaml"),
+        Path("configs/market_models/gbm.yaml"),
+        Path("configs/strategies"),
+        use_store=False,
+    )
+
+    by_horizon = pd.read_csv(result.output_dir / "metrics_by_horizon.csv")
+    n_strategies = len(list(Path("configs/strategies").rglob("*.yaml")))
+    assert list(by_horizon.columns[:3]) == ["strategy", "horizon_years", "statistic"]
+    assert len(by_horizon) == n_strategies * 2 * 6
+    assert not any(column.endswith("_1y_median") for column in result.metrics_summary.columns)
+    full = by_horizon[(by_horizon["horizon_years"] == 2) & (by_horizon["statistic"] == "median")]
+    summary = result.metrics_summary.set_index("strategy")
+    assert np.allclose(full["cagr"], summary.loc[full["strategy"], "cagr_median"], rtol=1e-12)
+
+
+def test_compare_with_racing_reports_elimination_rounds(tmp_path: Path):
+    base_data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    base_data["n_years"] = 1
+    base_data["n_paths"] = 120
+    base_data["output"]["base_dir"] = str(tmp_path)
+    base_data["racing"] = {"enabled": True, "initial_paths": 30, "growth": 2}
+    temp_base = tmp_path / "base.yaml"
+    temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+
+    result = compare_strategies(
+        temp_base,
+        Path("configs/universe.yaml"),
+        Path("configs/cost_model.yaml"),
+        Path("configs/market_models/gbm.yaml"),
+        Path("configs/strategies"),
+        use_store=False,
+    )
+
+    racing = pd.read_csv(result.output_dir / "racing.csv")
+    n_strategies = len(list(Path("configs/strategies").rglob("*.yaml")))
+    assert len(racing) == n_strategies
+    survivors = racing[racing["eliminated_round"].isna()]
+    assert (survivors["n_paths"] == 120).all()
+    assert sorted(result.metrics_summary["strategy"]) == sorted(survivors["strategy"])
+    assert "## Racing" in (result.output_dir / "report.md").read_text(encoding="utf-8")
+
+
+def test_compare_only_simulates_changed_strategies(tmp_path: Path, monkeypatch):
+    base_data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    base_data["n_years"] = 1
+    base_data["n_paths"] = 30
+    base_data["output"]["base_dir"] = str(tmp_path)
+    temp_base = tmp_path / "base.yaml"
+    temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+    strategies_dir = tmp_path / "strategies"
+    shutil.copytree("configs/strategies/mono", strategies_dir)
+
+    simulated = []
+
+    def recording_simulate_strategies(market_paths, universe, strategies, *args, **kwargs):
+        simulated.append([strategy.name for strategy in strategies])
+        return simulate_strategies(market_paths, universe, strategies, *args, **kwargs)
+
+    monkeypatch.setattr(compare_module, "simulate_strategies", recording_simulate_strategies)
+
+    def run_compare(**kwargs):
+        return compare_strategies(
+            temp_base,
+            Path("configs/universe.yaml"),
+            Path("configs/cost_model.yaml"),
+            Path("configs/market_models/gbm.yaml"),
+            strategies_dir,
+            **kwargs,
+        )
+
+    first = run_compare()
+    n_strategies = len(list(strategies_dir.glob("*.yaml")))
+    assert len(simulated[-1]) == n_strategies
+
+    edited = sorted(strategies_dir.glob("*.yaml"))[0]
+    data = yaml.safe_load(edited.read_text(encoding="utf-8"))
+    data["overlays"]["vol_targeting"]["enabled"] = True
+    edited.write_text(yaml.safe_dump(data), encoding="utf-8")
+    second = run_compare()
+    assert simulated[-1] == [data["name"]]
+
+    unchanged = first.metrics_summary["strategy"] != data["name"]
+    pd.testing.assert_frame_equal(
+        first.metrics_summary[unchanged].reset_index(drop=True),
+        second.metrics_summary[unchanged].reset_index(drop=True),
+    )
+
+    run_compare(refresh=True)
+    assert len(simulated[-1]) == n_strategies
+    assert ResultStore(tmp_path / ".compare_store").clear() == n_strategies + 1
+
+
+def test_unseeded_compare_does_not_reuse_stored_results(tmp_path: Path, monkeypatch):
+    base_data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    base_data["n_years"] = 1
+    base_data["n_paths"] = 30
+    base_data["output"]["base_dir"] = str(tmp_path)
+    temp_base = tmp_path / "base.yaml"
+    temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+
+    # a validated config always gets a seed: clear it as an API caller could
+    load_simulation = compare_module.load_simulation
+    monkeypatch.setattr(
+        compare_module, "load_simulation", lambda path: load_simulation(path).model_copy(update={"seed": None})
+    )
+
+    def run_compare():
+        return compare_strategies(
+            temp_base,
+            Path("configs/universe.yaml"),
+            Path("configs/cost_model.yaml"),
+            Path("configs/market_models/gbm.yaml"),
+            Path("configs/strategies/mono"),
+        )
+
+    first = run_compare().metrics_summary.set_index("strategy")
+    second = run_compare().metrics_summary.set_index("strategy")
+    assert not (tmp_path / ".compare_store").exists()
+    assert not (tmp_path / ".market_cache").exists()
+    assert not np.allclose(first["cagr_median"], second["cagr_median"].loc[first.index])
@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 
 from invest_sim.config.schemas import (
     CorrelationConfig,
@@ -8,9 +9,15 @@ from invest_sim.config.schemas import (
     SimulationConfig,
     StudentTConfig,
     UniverseConfig,
+    VarianceReductionConfig,
 )
+from invest_sim.market.base import concat_market_paths
+from invest_sim.market.cache import MarketPathCache, market_cache_key, sample_or_load
+from invest_sim.market.factors import FactorCovariance
 from invest_sim.market.gbm import GBMModel
-from invest_sim.market.regimes import RegimeSwitchingModel
+from invest_sim.market.leveraged import build_return_expansion, compute_leveraged_returns
+from invest_sim.market.qmc import bridge_order
+from invest_sim.market.regimes import RegimeSwitchingModel, _adjust_factor_corr, _cumulative_probs, _sample_chain
 from invest_sim.market.student_t import StudentTModel
 
 
@@ -64,19 +71,25 @@ def test_student_t_model_shapes():
     assert np.std(paths.returns) > 0
 
 
-def test_regime_model_shapes():
-    sim_config = _sim_config()
-    universe = _universe()
-    market_config = RegimesConfig(
+def _regimes_config(crisis_corr_multiplier=1.2):
+    return RegimesConfig(
         model_type="regimes",
         enabled_assets=["WORLD", "SP500"],
         regimes=[
             RegimeConfig(name="calm", mu_multiplier=1.0, sigma_multiplier=1.0, corr_multiplier=1.0),
-            RegimeConfig(name="crisis", mu_multiplier=0.0, sigma_multiplier=2.0, corr_multiplier=1.2),
+            RegimeConfig(
+                name="crisis", mu_multiplier=0.0, sigma_multiplier=2.0, corr_multiplier=crisis_corr_multiplier
+            ),
         ],
         transition_matrix=[[0.9, 0.1], [0.2, 0.8]],
         initial_probs=[0.8, 0.2],
     )
+
+
+def test_regime_model_shapes():
+    sim_config = _sim_config()
+    universe = _universe()
+    market_config = _regimes_config()
     model = RegimeSwitchingModel()
     fitted = model.fit(universe, market_config, sim_config)
     paths = model.sample_paths(fitted, sim_config)
@@ -84,3 +97,330 @@ def test_regime_model_shapes():
     assert paths.regime is not None
     assert paths.regime.shape == (252, 200)
     assert np.isfinite(paths.returns).all()
+
+
+def test_streamed_blocks_match_monolithic_sample():
+    sim_config = _sim_config()
+    universe = _universe()
+    configs = [
+        (GBMModel(), MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"])),
+        (StudentTModel(), StudentTConfig(model_type="student_t", enabled_assets=["WORLD", "SP500"], df=6.0)),
+        (RegimeSwitchingModel(), _regimes_config()),
+    ]
+    for model, market_config in configs:
+        fitted = model.fit(universe, market_config, sim_config)
+        full = model.sample_paths(fitted, sim_config)
+        blocks = list(model.iter_paths(fitted, sim_config, block_steps=10))
+        assert len(blocks) == 26
+        assert np.array_equal(np.concatenate([b.returns for b in blocks]), full.returns)
+        if full.regime is not None:
+            assert np.array_equal(np.concatenate([b.regime for b in blocks]), full.regime)
+
+
+def test_regime_chain_matches_transition_matrix():
+    transition = np.array([[0.7, 0.2, 0.1], [0.3, 0.5, 0.2], [0.0, 0.4, 0.6]])
+    rng = np.random.default_rng(3)
+    uniforms = rng.random(size=(400, 2000), dtype=np.float32)
+    states = _sample_chain(
+        uniforms,
+        _cumulative_probs(np.array([1.0, 0.0, 0.0])).astype(np.float32),
+        _cumulative_probs(transition).astype(np.float32),
+    )
+    assert states.dtype == np.int8
+    assert (states[0] == 0).all()
+    prev, nxt = states[:-1].ravel(), states[1:].ravel()
+    for k in range(3):
+        freq = np.bincount(nxt[prev == k], minlength=3) / np.sum(prev == k)
+        assert np.allclose(freq, transition[k], atol=0.01)
+
+
+def test_regime_returns_follow_regime_parameters():
+    sim_config = _sim_config().model_copy(update={"n_paths": 2000})
+    model = RegimeSwitchingModel()
+    fitted = model.fit(_universe(), _regimes_config(), sim_config)
+    params = fitted.regime_params
+    assert params["chol"].shape == (2, 2, 2)
+    assert np.allclose(params["chol"][0] @ params["chol"][0].T, fitted.cov_daily)
+    paths = model.sample_paths(fitted, sim_config)
+    for k in range(2):
+        cells = paths.returns.transpose(0, 2, 1)[paths.regime == k]
+        cov = params["chol"][k] @ params["chol"][k].T
+        assert np.allclose(cells.mean(axis=0), params["mu"][k], atol=4 * np.sqrt(np.diag(cov) / len(cells)))
+        assert np.allclose(np.cov(cells.T), cov, rtol=0.05)
+
+
+def test_regime_cells_are_transformed_by_their_own_regime():
+    sim_config = _sim_config()
+    model = RegimeSwitchingModel()
+    fitted = model.fit(_universe(), _regimes_config(), sim_config)
+    params = fitted.regime_params
+    (innovations,) = model.iter_innovations(fitted, sim_config, block_steps=sim_config.t_steps)
+    (paths,) = model.paths_from_innovations(fitted, [innovations], sim_config)
+    assert paths.returns.flags.c_contiguous
+    expected = np.einsum("tpij,tpj->tip", params["chol"][paths.regime], innovations.normals)
+    expected += params["mu"][paths.regime].transpose(0, 2, 1)
+    np.testing.assert_allclose(paths.returns, expected, rtol=1e-12, atol=1e-15)
+
+
+def test_return_expansion_matches_per_asset_returns():
+    universe = UniverseConfig(
+        assets=[
+            {"id": "WORLD", "mu_annual": 0.07, "sigma_annual": 0.15, "ter_annual": 0.002},
+            {"id": "SP500", "mu_annual": 0.075, "sigma_annual": 0.16, "ter_annual": 0.0},
+        ],
+        correlations=CorrelationConfig(matrix=[[1.0, 0.9], [0.9, 1.0]]),
+        leveraged_assets=[
+            {"id": "SP500_X2", "underlying_id": "SP500", "leverage": 2.0, "ter_annual": 0.006},
+            {"id": "WORLD_SHORT", "underlying_id": "WORLD", "leverage": -1.0, "ter_annual": 0.008},
+        ],
+    )
+    returns = np.random.default_rng(0).normal(0.0, 0.01, size=(30, 2, 4))
+
+    expansion = build_return_expansion(universe, ["WORLD", "SP500"], 252, include_cash=True)
+    gross = expansion.gross_returns(returns)
+
+    assert expansion.asset_ids == ["WORLD", "SP500", "SP500_X2", "WORLD_SHORT", "CASH"]
+    assert np.allclose(gross[:, 0], 1.0 + returns[:, 0] - 0.002 / 252)
+    assert np.allclose(gross[:, 1], 1.0 + returns[:, 1])
+    assert np.allclose(gross[:, 2], 1.0 + compute_leveraged_returns(returns[:, 1], 2.0, 0.006, 252))
+    assert np.allclose(gross[:, 3], 1.0 + compute_leveraged_returns(returns[:, 0], -1.0, 0.008, 252))
+    assert np.all(gross[:, 4] == 1.0)
+
+
+def test_antithetic_sampling_mirrors_paired_draws():
+    sim_config = _sim_config().model_copy(update={"variance_reduction": VarianceReductionConfig(antithetic=True)})
+    sim_config = SimulationConfig(**sim_config.model_dump())
+    universe = _universe()
+    configs = [
+        (GBMModel(), MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"])),
+        (StudentTModel(), StudentTConfig(model_type="student_t", enabled_assets=["WORLD", "SP500"], df=6.0)),
+        (RegimeSwitchingModel(), _regimes_config()),
+    ]
+    for model, market_config in configs:
+        fitted = model.fit(universe, market_config, sim_config)
+        paths = model.sample_paths(fitted, sim_config)
+        assert paths.returns.shape == (252, 2, 200)
+        if paths.regime is None:
+            mu = fitted.mu_daily[:, None]
+            np.testing.assert_allclose(paths.returns[..., 0::2] - mu, mu - paths.returns[..., 1::2], atol=1e-15)
+        else:
+            assert np.array_equal(paths.regime[:, 0::2], paths.regime[:, 1::2])
+            centered = paths.returns - fitted.regime_params["mu"][paths.regime].transpose(0, 2, 1)
+            np.testing.assert_allclose(centered[..., 0::2], -centered[..., 1::2], atol=1e-15)
+
+
+def test_regime_expected_growth_matches_enumerated_chains():
+    universe = _universe()
+    market_config = _regimes_config()
+    model = RegimeSwitchingModel()
+    fitted = model.fit(universe, market_config, _sim_config())
+    params = fitted.regime_params
+    gross = 1.0 + params["mu"]
+    expected = np.zeros(2)
+    for first in range(2):
+        for second in range(2):
+            for third in range(2):
+                probability = (
+                    params["initial_probs"][first]
+                    * params["transition_matrix"][first, second]
+                    * params["transition_matrix"][second, third]
+                )
+                expected += probability * gross[first] * gross[second] * gross[third]
+    np.testing.assert_allclose(model.expected_growth(fitted, 3), expected, rtol=1e-14)
+    np.testing.assert_allclose(
+        GBMModel().expected_growth(fitted, 3), (1.0 + fitted.mu_daily) ** 3, rtol=1e-14
+    )
+
+
+def test_bridge_order_starts_with_end_point_and_visits_each_anchor_once():
+    order = bridge_order(10)
+    assert order[0] == (10, 0, None)
+    assert sorted(point for point, _, _ in order) == list(range(1, 11))
+    for point, left, right in order[1:]:
+        assert left < point < right
+
+
+def test_sobol_sampler_streams_like_a_single_sample():
+    pytest.importorskip("scipy")
+    sim_config = SimulationConfig(**{**_sim_config().model_dump(), "n_years": 2, "n_paths": 256, "sampler": "sobol"})
+    universe = _universe()
+    for model, market_config in [
+        (GBMModel(), MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"])),
+        (StudentTModel(), StudentTConfig(model_type="student_t", enabled_assets=["WORLD", "SP500"], df=6.0)),
+    ]:
+        fitted = model.fit(universe, market_config, sim_config)
+        full = model.sample_paths(fitted, sim_config)
+        blocks = np.concatenate([block.returns for block in model.iter_paths(fitted, sim_config, block_steps=100)])
+        assert full.returns.shape == (504, 2, 256)
+        np.testing.assert_array_equal(blocks, full.returns)
+        standardized = (full.returns - fitted.mu_daily[:, None]) / np.sqrt(np.diag(fitted.cov_daily))[:, None]
+        assert abs(standardized.std() - 1.0) < 0.01
+
+    with pytest.raises(ValueError, match="mc sampler"):
+        model = RegimeSwitchingModel()
+        next(model.iter_paths(model.fit(universe, _regimes_config(), sim_config), sim_config))
+
+
+def test_market_cache_key_ignores_strategy_inputs():
+    universe = _universe()
+    market_config = MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"])
+    sim_config = _sim_config()
+    key = market_cache_key(universe, market_config, sim_config)
+
+    rebalanced = sim_config.model_copy(update={"rebalancing": sim_config.rebalancing.model_copy(update={"frequency": "monthly"})})
+    assert market_cache_key(universe, market_config, rebalanced) == key
+    assert market_cache_key(universe, market_config, sim_config.model_copy(update={"seed": 43})) != key
+    assert market_cache_key(universe, market_config, sim_config.model_copy(update={"n_paths": 100})) != key
+
+
+def test_market_cache_round_trip_and_lru_eviction(tmp_path):
+    universe = _universe()
+    market_config = MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"])
+    sim_config = _sim_config()
+    model = GBMModel()
+    fitted = model.fit(universe, market_config, sim_config)
+    sampled = model.sample_paths(fitted, sim_config)
+
+    entry_bytes = sampled.returns.nbytes
+    cache = MarketPathCache(tmp_path, max_bytes=int(2.5 * entry_bytes))
+    cached = sample_or_load(model, fitted, universe, sim_config, cache)
+    assert isinstance(cached.returns, np.memmap)
+    np.testing.assert_array_equal(cached.returns, sampled.returns)
+    assert cached.asset_ids == sampled.asset_ids
+
+    calls = []
+
+    def sample():
+        calls.append(1)
+        return model.iter_paths(fitted, sim_config)
+
+    key = market_cache_key(universe, market_config, sim_config)
+    cache.get_or_sample(key, sample, sim_config.t_steps)
+    assert not calls
+
+    other_keys = []
+    for seed in (1, 2):
+        other_config = sim_config.model_copy(update={"seed": seed})
+        other_keys.append(market_cache_key(universe, market_config, other_config))
+        sample_or_load(model, fitted, universe, other_config, cache)
+    # three entries do not fit in 2.5 entries: the least recently used goes
+    entries = {path.name for path in tmp_path.iterdir()}
+    assert entries == set(other_keys)
+
+
+def test_unseeded_paths_bypass_the_market_cache(tmp_path):
+    universe = _universe()
+    market_config = MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"])
+    sim_config = _sim_config().model_copy(update={"seed": None})
+    model = GBMModel()
+    fitted = model.fit(universe, market_config, sim_config)
+
+    assert MarketPathCache.from_config(sim_config) is None
+    cache = MarketPathCache(tmp_path, max_bytes=2**30)
+    first = concat_market_paths(sample_or_load(model, fitted, universe, sim_config, cache), sim_config.t_steps)
+    second = concat_market_paths(sample_or_load(model, fitted, universe, sim_config, cache), sim_config.t_steps)
+    assert not np.array_equal(first.returns, second.returns)
+    assert not any(tmp_path.iterdir())
+
+
+def test_monthly_gbm_matches_compounded_daily_moments():
+    universe = _universe()
+    daily = _sim_config()
+    monthly = daily.model_copy(update={"time_step": "M", "n_paths": 4000})
+    market_config = MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"])
+    model = GBMModel()
+    fitted_daily = model.fit(universe, market_config, daily)
+    fitted_monthly = model.fit(universe, market_config, monthly)
+    # same expected yearly growth, and a monthly variance that compounds the daily one
+    assert np.allclose(
+        model.expected_growth(fitted_monthly, monthly.t_steps), model.expected_growth(fitted_daily, daily.t_steps)
+    )
+    mu, var = fitted_daily.mu_daily[0], fitted_daily.cov_daily[0, 0]
+    expected_var = ((1 + mu) ** 2 + var) ** 21 - (1 + mu) ** 42
+    assert fitted_monthly.cov_daily[0, 0] == pytest.approx(expected_var)
+
+    paths = concat_market_paths(model.iter_paths(fitted_monthly, monthly), monthly.t_steps)
+    assert paths.returns.shape == (12, 2, 4000)
+    growth = np.prod(1.0 + paths.returns, axis=0).mean(axis=1)
+    assert np.allclose(growth, model.expected_growth(fitted_daily, daily.t_steps), rtol=0.02)
+
+
+def test_coarse_time_step_is_gbm_only():
+    monthly = _sim_config().model_copy(update={"time_step": "M"})
+    config = StudentTConfig(model_type="student_t", enabled_assets=["WORLD", "SP500"], df=6.0)
+    with pytest.raises(ValueError, match="time_step"):
+        StudentTModel().fit(_universe(), config, monthly)
+
+
+def _factor_universe():
+    return UniverseConfig(
+        assets=[
+            {"id": "WORLD", "mu_annual": 0.07, "sigma_annual": 0.15, "ter_annual": 0.0},
+            {"id": "SP500", "mu_annual": 0.075, "sigma_annual": 0.16, "ter_annual": 0.0},
+        ],
+        factor_model={
+            "loadings": {"WORLD": [0.14, 0.02], "SP500": [0.15, -0.03]},
+            "idiosyncratic_vol": {"WORLD": 0.05, "SP500": 0.06},
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "model, market_config",
+    [
+        (GBMModel(), MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"])),
+        (StudentTModel(), StudentTConfig(model_type="student_t", enabled_assets=["WORLD", "SP500"], df=6.0)),
+        # a correlation multiplier below the caps, where both specs agree exactly
+        (RegimeSwitchingModel(), _regimes_config(crisis_corr_multiplier=1.05)),
+    ],
+)
+def test_factor_model_matches_equivalent_correlation_matrix(model, market_config):
+    factor_universe = _factor_universe()
+    loadings = np.array([[0.14, 0.02], [0.15, -0.03]])
+    cov = loadings @ loadings.T + np.diag([0.05**2, 0.06**2])
+    corr = cov / np.sqrt(np.outer(np.diag(cov), np.diag(cov)))
+    dense_universe = _universe().model_copy(update={"correlations": CorrelationConfig(matrix=corr.tolist())})
+    sim_config = _sim_config().model_copy(update={"n_paths": 2000})
+
+    fitted = model.fit(factor_universe, market_config, sim_config)
+    dense = model.fit(dense_universe, market_config, sim_config)
+    assert isinstance(fitted.cov_daily, FactorCovariance)
+    assert np.allclose(fitted.cov_daily.dense(), dense.cov_daily)
+    if fitted.regime_params is not None:
+        for root, chol in zip(fitted.regime_params["chol"], dense.regime_params["chol"]):
+            assert np.allclose(root.dense(), chol @ chol.T)
+    returns = concat_market_paths(model.iter_paths(fitted, sim_config), sim_config.t_steps).returns
+    sample_corr = np.corrcoef(returns[:, 0].ravel(), returns[:, 1].ravel())[0, 1]
+    dense_returns = concat_market_paths(model.iter_paths(dense, sim_config), sim_config.t_steps).returns
+    dense_corr = np.corrcoef(dense_returns[:, 0].ravel(), dense_returns[:, 1].ravel())[0, 1]
+    assert sample_corr == pytest.approx(dense_corr, abs=0.01)
+
+
+def test_factor_regime_correlation_scaling():
+    base = FactorCovariance(np.array([[0.6, 0.3], [0.5, -0.4], [0.8, 0.1]]), np.zeros(3))
+    base = FactorCovariance(base.loadings, np.sqrt(1.0 - (base.loadings**2).sum(axis=1)))
+    corr = base.dense()
+    halved = _adjust_factor_corr(base, 0.5).dense()
+    off_diagonal = ~np.eye(3, dtype=bool)
+    assert np.allclose(np.diag(halved), 1.0)
+    assert np.allclose(halved[off_diagonal], 0.5 * corr[off_diagonal])
+    # a multiplier past full correlation is capped and stays definite
+    stressed = _adjust_factor_corr(base, 3.0).dense()
+    assert np.allclose(np.diag(stressed), 1.0)
+    assert np.linalg.eigvalsh(stressed).min() > 0
+
+
+def test_universe_requires_one_correlation_spec():
+    assets = [{"id": "WORLD", "mu_annual": 0.07, "sigma_annual": 0.15, "ter_annual": 0.0}]
+    factor_model = {"loadings": {"WORLD": [0.1]}, "idiosyncratic_vol": {"WORLD": 0.05}}
+    with pytest.raises(ValueError, match="exactly one"):
+        UniverseConfig(assets=assets)
+    with pytest.raises(ValueError, match="exactly one"):
+        UniverseConfig(assets=assets, correlations={"matrix": [[1.0]]}, factor_model=factor_model)
+    with pytest.raises(ValueError, match="every asset"):
+        UniverseConfig(assets=assets, factor_model={"loadings": {"SP500": [0.1]}, "idiosyncratic_vol": {"SP500": 0.05}})
+    with pytest.raises(ValueError, match="same non-zero number"):
+        UniverseConfig(
+            assets=assets + [{"id": "SP500", "mu_annual": 0.07, "sigma_annual": 0.15, "ter_annual": 0.0}],
+            factor_model={"loadings": {"WORLD": [0.1], "SP500": [0.1, 0.2]}, "idiosyncratic_vol": {"WORLD": 0.05, "SP500": 0.05}},
+        )
@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from invest_sim.config.schemas import PortfolioPaths, PrecisionTargetConfig, SimulationConfig, VarianceReductionConfig
+from invest_sim.metrics import compute_metrics, horizon_summary, precision_errors, standard_errors
+from invest_sim.metrics.accumulator import NAV_QUANTILES, MetricsAccumulator
+
+
+def _legacy_metrics(nav, sim_config):
+    # reference loop implementation the vectorized compute_metrics replaced
+    daily_returns = nav[1:] / nav[:-1] - 1.0
+    trading_days = sim_config.trading_days_per_year
+    n_steps, n_paths = nav.shape[0] - 1, nav.shape[1]
+    years = float(n_steps) / float(trading_days)
+
+    cashflow = np.zeros((n_steps + 1, n_paths))
+    if sim_config.contributions.enabled:
+        day_index = min(sim_config.contributions.day_of_month - 1, 20)
+        for t in range(n_steps):
+            if t % 21 == day_index:
+                cashflow[t + 1, :] = sim_config.contributions.monthly_amount_eur
+    period_returns = np.zeros((n_steps, n_paths), dtype=nav.dtype)
+    for t in range(n_steps):
+        denom = nav[t].copy()
+        mask = denom > 0
+        period_returns[t, mask] = (nav[t + 1, mask] - cashflow[t + 1, mask]) / denom[mask] - 1.0
+    total_return = np.prod(1.0 + period_returns, axis=0, dtype=np.float64) - 1.0
+
+    running_max = np.maximum.accumulate(nav, axis=0)
+    yearly = [nav[(y + 1) * trading_days] / nav[y * trading_days] - 1.0 for y in range(n_steps // trading_days)]
+    threshold = np.quantile(daily_returns, 0.05, axis=0)
+    mask = daily_returns <= threshold
+    return pd.DataFrame(
+        {
+            "final_value": nav[-1].astype(np.float64),
+            "cagr": (1.0 + total_return) ** (1.0 / years) - 1.0,
+            "annualized_vol": np.std(daily_returns, axis=0, ddof=1, dtype=np.float64) * np.sqrt(trading_days),
+            "max_drawdown": np.max(1.0 - nav / running_max, axis=0),
+            "time_underwater_fraction": (nav < running_max).mean(axis=0),
+            "worst_year_return": np.min(np.stack(yearly), axis=0),
+            "es_95": [daily_returns[mask[:, i], i].mean() for i in range(n_paths)],
+        }
+    ).astype(np.float64)
+
+
+def _sim_config(contributions):
+    return SimulationConfig(
+        run_name="test",
+        time_step="D",
+        n_years=3,
+        trading_days_per_year=252,
+        n_paths=40,
+        seed=1,
+        initial_capital_eur=1000.0,
+        contributions={"enabled": contributions, "monthly_amount_eur": 50.0, "day_of_month": 5},
+        rebalancing={"frequency": "none", "threshold_abs": 0.0},
+        output={"base_dir": "runs", "save_nav_paths": False, "save_weights_paths": False, "save_turnover_paths": False},
+    )
+
+
+@pytest.mark.parametrize("contributions", [False, True])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_vectorized_metrics_match_legacy_loops(contributions, dtype):
+    rng = np.random.default_rng(0)
+    growth = 1.0 + rng.normal(0.0003, 0.01, size=(756, 40))
+    growth[:, :3] = 1.0  # flat paths: every daily return ties at the ES threshold
+    growth[100:, 3] = np.round(growth[100:, 3], 2)  # many ties around the 5% quantile
+    nav = np.vstack([np.full(40, 1000.0), 1000.0 * np.cumprod(growth, axis=0)]).astype(dtype)
+    sim_config = _sim_config(contributions)
+
+    per_path, _ = compute_metrics(PortfolioPaths(nav=nav, asset_ids=["WORLD"]), sim_config)
+    expected = _legacy_metrics(nav, sim_config)
+
+    for column in expected.columns.drop("es_95"):
+        assert np.array_equal(per_path[column].values, expected[column].values), column
+    # the tail mean is summed in partition order instead of time order, and
+    # in float64 where the legacy mean accumulated float32 returns in float32
+    rtol = 1e-12 if dtype == np.float64 else 1e-6
+    assert np.allclose(per_path["es_95"].values, expected["es_95"].values, rtol=rtol, atol=0.0)
+
+
+@pytest.mark.parametrize("contributions", [False, True])
+def test_accumulated_metrics_match_full_nav(contributions):
+    rng = np.random.default_rng(2)
+    growth = 1.0 + rng.normal(0.0003, 0.01, size=(756, 40))
+    nav = np.vstack([np.full(40, 1000.0), 1000.0 * np.cumprod(growth, axis=0)])
+    sim_config = _sim_config(contributions)
+
+    accumulator = MetricsAccumulator(sim_config, 756, nav[0], track_quantiles=True)
+    start = 1
+    for size in (1, 20, 63, 200, 5, 300, 167):
+        accumulator.update(nav[start : start + size])
+        start += size
+    (summary,) = accumulator.summaries()
+
+    expected, _ = compute_metrics(PortfolioPaths(nav=nav, asset_ids=["WORLD"]), sim_config)
+    for column in ("final_value", "max_drawdown", "time_underwater_fraction", "worst_year_return"):
+        assert np.array_equal(summary.per_path[column].values, expected[column].values), column
+    for column in ("cagr", "annualized_vol", "es_95"):
+        assert np.allclose(summary.per_path[column].values, expected[column].values, rtol=1e-12), column
+    assert np.array_equal(summary.nav_quantiles, np.quantile(nav, NAV_QUANTILES, axis=1))
+
+
+@pytest.mark.parametrize("contributions", [False, True])
+def test_horizon_checkpoints_match_nav_prefixes(contributions):
+    rng = np.random.default_rng(4)
+    growth = 1.0 + rng.normal(0.0003, 0.01, size=(756, 40))
+    nav = np.vstack([np.full(40, 1000.0), 1000.0 * np.cumprod(growth, axis=0)])
+    sim_config = _sim_config(contributions).model_copy(update={"horizons_years": [1, 2, 3]})
+
+    per_path, summary = compute_metrics(PortfolioPaths(nav=nav, asset_ids=["WORLD"]), sim_config)
+    one_year = sim_config.model_copy(update={"n_years": 1, "horizons_years": []})
+    prefix, _ = compute_metrics(PortfolioPaths(nav=nav[:253], asset_ids=["WORLD"]), one_year)
+    assert list(per_path.columns[7:14]) == [f"{metric}_1y" for metric in prefix.columns]
+    assert np.array_equal(per_path.filter(like="_1y").values, prefix.values)
+    assert "cagr_3y" not in per_path
+
+    # checkpoints falling inside the fed blocks
+    accumulator = MetricsAccumulator(sim_config, 756, nav[0], checkpoints=sim_config.horizon_checkpoints)
+    start = 1
+    for size in (100, 300, 356):
+        accumulator.update(nav[start : start + size])
+        start += size
+    (accumulated,) = accumulator.summaries()
+    assert list(accumulated.per_path.columns) == list(per_path.columns)
+    assert np.allclose(accumulated.per_path.values, per_path.values, rtol=1e-12, atol=0.0)
+
+    table = horizon_summary(summary, sim_config)
+    assert list(table.index.get_level_values("horizon_years").unique()) == [1, 2, 3]
+    assert table.loc[(1, "median"), "cagr"] == prefix["cagr"].median()
+    assert table.loc[(3, "p95"), "max_drawdown"] == summary.loc["p95", "max_drawdown"]
+
+
+def test_standard_errors_with_antithetic_pairs_and_control_variate():
+    rng = np.random.default_rng(3)
+    control = 1.0 + rng.normal(0.0, 0.1, size=400)
+    # perfectly anti-correlated pairs, and a metric linear in the control
+    control[1::2] = 2.0 - control[0::2]
+    per_path = pd.DataFrame(
+        {"final_value": 1000.0 * control + 5.0, "cagr": 0.05 * control, "max_drawdown": rng.uniform(0.1, 0.5, 400)}
+    )
+    sim_config = _sim_config(False).model_copy(
+        update={"variance_reduction": VarianceReductionConfig(antithetic=True, control_variate=True)}
+    )
+
+    errors = standard_errors(per_path, sim_config, control=control, expected_control=1.0)
+
+    assert errors.loc["final_value", "se_iid"] > 1.0
+    assert errors.loc["final_value", "se_antithetic"] < 1e-9
+    assert errors.loc["final_value", "mean_cv"] == pytest.approx(1005.0)
+    assert errors.loc["cagr", "se_cv"] < 1e-12
+
+    plain = standard_errors(per_path, _sim_config(False))
+    assert list(plain.columns) == ["mean", "se_iid"]
+    assert plain.loc["max_drawdown", "se_iid"] == pytest.approx(per_path["max_drawdown"].std() / 20.0)
+
+
+@pytest.mark.parametrize("method", ["asymptotic", "bootstrap"])
+def test_precision_errors_match_normal_theory(method):
+    n_paths = 4000
+    rng = np.random.default_rng(5)
+    per_path = pd.DataFrame({"cagr": rng.normal(0.05, 0.1, n_paths), "max_drawdown": rng.uniform(0.0, 0.6, n_paths)})
+    targets = [
+        PrecisionTargetConfig(metric="cagr", statistic="mean", tolerance=0.01),
+        PrecisionTargetConfig(metric="cagr", statistic="median", tolerance=0.001),
+        PrecisionTargetConfig(metric="max_drawdown", statistic="p95", tolerance=0.01),
+    ]
+
+    errors = precision_errors(per_path, targets, _sim_config(False), method).set_index("statistic")
+
+    # mean: sigma / sqrt(n); median: sqrt(pi / 2) sigma / sqrt(n);
+    # p95 of U(0, 0.6): 0.6 sqrt(0.95 * 0.05 / n)
+    assert errors.loc["mean", "standard_error"] == pytest.approx(0.1 / np.sqrt(n_paths), rel=0.1)
+    assert errors.loc["median", "standard_error"] == pytest.approx(np.sqrt(np.pi / 2) * 0.1 / np.sqrt(n_paths), rel=0.25)
+    assert errors.loc["p95", "standard_error"] == pytest.approx(0.6 * np.sqrt(0.95 * 0.05 / n_paths), rel=0.25)
+    assert errors["met"].tolist() == [True, False, True]
+    assert (errors["n_paths"] == n_paths).all()
@@ -0,0 +1,121 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+from conftest import make_cost_model, make_sim_config
+
+from invest_sim.config.schemas import CorrelationConfig, MarketPaths, OptimizeConfig, UniverseConfig
+from invest_sim.experiments.optimize import optimize_strategy, search_strategies
+from invest_sim.experiments.surrogate import GaussianProcess, sample_capped_simplex
+
+
+def _universe():
+    return UniverseConfig(
+        assets=[
+            {"id": "BOND", "mu_annual": 0.02, "sigma_annual": 0.05, "ter_annual": 0.0},
+            {"id": "EQUITY", "mu_annual": 0.08, "sigma_annual": 0.2, "ter_annual": 0.0},
+            {"id": "SMALL", "mu_annual": 0.09, "sigma_annual": 0.3, "ter_annual": 0.0},
+        ],
+        correlations=CorrelationConfig(matrix=np.eye(3).tolist()),
+    )
+
+
+def _sim_config():
+    return make_sim_config(n_years=2, n_paths=100, seed=3, rebalancing={"frequency": "monthly", "threshold_abs": 0.0})
+
+
+def _cost_model():
+    return make_cost_model(bps=0.0, slippage_bps=0.0)
+
+
+def test_capped_simplex_samples_respect_caps():
+    rng = np.random.default_rng(0)
+    caps = np.array([0.4, 0.4, 0.4, 1.0])
+    weights = sample_capped_simplex(rng, 500, caps)
+    assert np.allclose(weights.sum(axis=1), 1.0)
+    assert np.all(weights >= 0.0)
+    assert np.all(weights <= caps + 1e-12)
+    around = sample_capped_simplex(rng, 500, caps, concentration=1.0 + 50.0 * np.array([0.4, 0.3, 0.2, 0.1]))
+    assert np.allclose(around.mean(axis=0), [0.4, 0.3, 0.2, 0.1], atol=0.05)
+
+
+def test_gaussian_process_interpolates_observations():
+    rng = np.random.default_rng(1)
+    x = rng.random((20, 2))
+    y = np.sin(3.0 * x[:, 0]) + x[:, 1] ** 2
+    mean, std = GaussianProcess(noise_levels=(1e-6,)).fit(x, y).predict(x)
+    assert np.allclose(mean, y, atol=1e-3)
+    assert np.all(std < 0.05)
+    _, far_std = GaussianProcess(noise_levels=(1e-6,)).fit(x, y).predict(np.array([[3.0, 3.0]]))
+    assert far_std[0] > 10 * std.max()
+
+
+def test_search_respects_constraints_and_common_paths():
+    sim_config = _sim_config()
+    rng = np.random.default_rng(2)
+    sigma = np.array([0.05, 0.2, 0.3]) / np.sqrt(252)
+    mu = np.array([0.02, 0.08, 0.09]) / 252
+    returns = mu[None, :, None] + sigma[None, :, None] * rng.standard_normal((sim_config.t_steps, 3, sim_config.n_paths))
+    market_paths = MarketPaths(returns=returns, asset_ids=["BOND", "EQUITY", "SMALL"])
+    config = OptimizeConfig(
+        assets=["BOND", "EQUITY", "SMALL"],
+        constraints={"max_weight": 0.6, "allow_cash": False},
+        max_drawdown_p95_limit=0.25,
+        n_initial=6,
+        n_iterations=2,
+        batch_size=3,
+        candidate_pool=200,
+    )
+
+    history = search_strategies(market_paths, _universe(), _cost_model(), sim_config, config)
+
+    evaluations = history.evaluations
+    assert len(evaluations) == 6 + 2 * 3
+    assert list(evaluations["iteration"].unique()) == [0, 1, 2]
+    weights = evaluations[["weight_BOND", "weight_EQUITY", "weight_SMALL"]].to_numpy()
+    assert np.allclose(weights.sum(axis=1), 1.0)
+    assert np.all(weights <= 0.6 + 1e-9)
+    assert evaluations["feasible"].equals(evaluations["p95_max_drawdown"] <= 0.25)
+    # the same candidate evaluated again on the same paths gives the same metrics
+    repeat = search_strategies(market_paths, _universe(), _cost_model(), sim_config, config)
+    assert repeat.evaluations["cagr_median"].equals(evaluations["cagr_median"])
+
+
+def test_optimize_rejects_assets_outside_the_universe():
+    config = OptimizeConfig(assets=["BOND", "GOLD"], constraints={"max_weight": 1.0, "allow_cash": False})
+    market_paths = MarketPaths(returns=np.zeros((504, 3, 4)), asset_ids=["BOND", "EQUITY", "SMALL"])
+    with pytest.raises(ValueError, match="GOLD"):
+        search_strategies(market_paths, _universe(), _cost_model(), _sim_config(), config)
+
+
+def test_end_to_end_optimize(tmp_path: Path):
+    base_data = yaml.safe_load(Path("configs/base.yaml").read_text(encoding="utf-8"))
+    base_data["n_years"] = 1
+    base_data["n_paths"] = 50
+    base_data["output"]["base_dir"] = str(tmp_path)
+    temp_base = tmp_path / "base.yaml"
+    temp_base.write_text(yaml.safe_dump(base_data), encoding="utf-8")
+    search = yaml.safe_load(Path("configs/optimize.yaml").read_text(encoding="utf-8"))
+    search.update(n_initial=4, n_iterations=1, batch_size=2, candidate_pool=50)
+    search["vol_targeting"] = {"target_vol_annual": [0.08, 0.2], "max_leverage_multiplier": [1.0, 1.5]}
+    search["constraints"]["allow_cash"] = True
+    temp_search = tmp_path / "optimize.yaml"
+    temp_search.write_text(yaml.safe_dump(search), encoding="utf-8")
+
+    result = optimize_strategy(
+        temp_base,
+        Path("configs/universe.yaml"),
+        Path("configs/cost_model.yaml"),
+        Path("configs/market_models/gbm.yaml"),
+        temp_search,
+        use_cache=False,
+    )
+
+    assert len(result.evaluations) == 6
+    assert (result.output_dir / "evaluations.csv").exists()
+    assert (result.output_dir / "report.md").exists()
+    assert (result.output_dir / "plots" / "optimization_progress.png").exists()
+    if result.best_strategy is not None:
+        assert result.best_strategy.overlays.vol_targeting.enabled
+        assert (result.output_dir / "best_strategy.yaml").exists()
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from conftest import make_cost_model, make_sim_config, make_strategy, world_sp500_universe
+
+from invest_sim.config.schemas import MarketModelConfig
+from invest_sim.experiments.parallel import (
+    shard_configs,
+    simulate_sharded,
+    simulate_strategies_shared,
+    simulate_to_precision,
+)
+from invest_sim.market.gbm import GBMModel
+from invest_sim.metrics import compute_metrics
+from invest_sim.portfolio import simulate_strategies
+
+
+def _strategy():
+    return make_strategy({"WORLD": 0.6, "SP500": 0.4})
+
+
+def _sim_config(save_nav_paths=False, **overrides):
+    data = dict(
+        n_paths=70,
+        seed=7,
+        rebalancing={"frequency": "monthly", "threshold_abs": 0.0},
+        output={"save_nav_paths": save_nav_paths, "save_weights_paths": False, "save_turnover_paths": False},
+        shard_paths=25,
+    )
+    data.update(overrides)
+    return make_sim_config(**data)
+
+
+def _run(sim_config, workers):
+    universe = world_sp500_universe()
+    model = GBMModel()
+    fitted = model.fit(universe, MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"]), sim_config)
+    return simulate_sharded(model, fitted, universe, _strategy(), make_cost_model(), sim_config, workers)
+
+
+def test_shard_configs_cover_paths_with_distinct_seeds():
+    configs = shard_configs(_sim_config(), 25)
+    assert [config.n_paths for config in configs] == [25, 25, 20]
+    assert len({config.seed for config in configs}) == 3
+    assert all(config.shard_paths is None for config in configs)
+    assert [config.seed for config in configs] == [config.seed for config in shard_configs(_sim_config(), 25)]
+
+
+@pytest.mark.parametrize("save_nav_paths", [True, False])
+def test_sharded_results_do_not_depend_on_workers(save_nav_paths):
+    sim_config = _sim_config(save_nav_paths=save_nav_paths)
+    sequential = _run(sim_config, workers=1)
+    pooled = _run(sim_config, workers=2)
+
+    per_path, _ = compute_metrics(sequential, sim_config)
+    pooled_per_path, _ = compute_metrics(pooled, sim_config)
+    assert len(per_path) == sim_config.n_paths
+    np.testing.assert_array_equal(per_path.values, pooled_per_path.values)
+    if save_nav_paths:
+        assert sequential.nav.shape == (sim_config.t_steps + 1, sim_config.n_paths)
+        np.testing.assert_array_equal(sequential.nav, pooled.nav)
+    else:
+        assert sequential.nav is None
+        np.testing.assert_array_equal(sequential.nav_summary.nav_quantiles, pooled.nav_summary.nav_quantiles)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_target_precision_stops_at_the_first_shards_meeting_it(workers):
+    targets = [{"metric": "cagr", "statistic": "median", "tolerance": 0.02}]
+    sim_config = _sim_config(n_paths=200, target_precision={"enabled": True, "targets": targets})
+    universe = world_sp500_universe()
+    model = GBMModel()
+    fitted = model.fit(universe, MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"]), sim_config)
+
+    portfolio_paths, achieved, precision = simulate_to_precision(
+        model, fitted, universe, _strategy(), make_cost_model(), sim_config, workers
+    )
+
+    assert precision["met"].all()
+    assert achieved.n_paths == precision.loc[0, "n_paths"] < sim_config.n_paths
+    assert achieved.n_paths % 25 == 0
+    # the same paths as a sharded run of that size
+    sharded = _run(achieved, workers=1)
+    np.testing.assert_array_equal(
+        compute_metrics(portfolio_paths, achieved)[0].values, compute_metrics(sharded, achieved)[0].values
+    )
+
+
+def test_target_precision_stops_at_the_path_cap():
+    targets = [{"metric": "max_drawdown", "statistic": "p95", "tolerance": 1e-6}]
+    sim_config = _sim_config(target_precision={"enabled": True, "method": "bootstrap", "targets": targets})
+    universe = world_sp500_universe()
+    model = GBMModel()
+    fitted = model.fit(universe, MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"]), sim_config)
+
+    _, achieved, precision = simulate_to_precision(model, fitted, universe, _strategy(), make_cost_model(), sim_config)
+
+    assert achieved.n_paths == sim_config.n_paths
+    assert not precision["met"].any()
+
+
+def test_shared_market_paths_match_single_process_comparison():
+    sim_config = _sim_config(shard_paths=None)
+    universe = world_sp500_universe()
+    model = GBMModel()
+    fitted = model.fit(universe, MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"]), sim_config)
+    strategies = [
+        _strategy().model_copy(update={"name": f"s{index}", "target_weights": {"WORLD": weight, "SP500": 1.0 - weight}})
+        for index, weight in enumerate([1.0, 0.7, 0.5, 0.2, 0.0])
+    ]
+
+    all_paths = simulate_strategies(model.iter_paths(fitted, sim_config), universe, strategies, make_cost_model(), sim_config)
+    shared = simulate_strategies_shared(
+        model.iter_paths(fitted, sim_config), universe, strategies, make_cost_model(), sim_config, workers=2
+    )
+
+    assert len(shared) == len(strategies)
+    for portfolio_paths, (per_path, summary) in zip(all_paths, shared):
+        expected_per_path, expected_summary = compute_metrics(portfolio_paths, sim_config)
+        np.testing.assert_allclose(per_path.values, expected_per_path.values, rtol=1e-12)
+        np.testing.assert_allclose(summary.values, expected_summary.values, rtol=1e-12)
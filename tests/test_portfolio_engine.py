@@ -1,14 +1,42 @@
 import numpy as np
+import pytest
+from conftest import make_cost_model, make_sim_config, make_strategy
 
+from invest_sim.calendar import contribution_days, rebalance_days
 from invest_sim.config.schemas import (
     CorrelationConfig,
     CostModelConfig,
     MarketPaths,
-    SimulationConfig,
     StrategyConfig,
     UniverseConfig,
 )
-from invest_sim.portfolio import simulate_portfolio
+from invest_sim.portfolio import simulate_portfolio, simulate_strategies
+from invest_sim.portfolio.engine import AssetUniverse, _apply_vol_targeting
+
+
+def _universe():
+    return UniverseConfig(
+        assets=[{"id": "WORLD", "mu_annual": 0.07, "sigma_annual": 0.15, "ter_annual": 0.0}],
+        correlations=CorrelationConfig(matrix=[[1.0]]),
+        leveraged_assets=None,
+    )
+
+
+def _strategy():
+    return make_strategy({"WORLD": 1.0})
+
+
+def _cost_model():
+    return make_cost_model(bps=0.0, slippage_bps=0.0)
+
+
+def _sim_config(**overrides):
+    data = dict(
+        n_paths=5,
+        output={"base_dir": "runs", "save_nav_paths": True, "save_weights_paths": True, "save_turnover_paths": True},
+    )
+    data.update(overrides)
+    return make_sim_config(**data)
 
 
 def test_portfolio_invariants():
@@ -16,55 +44,252 @@ def test_portfolio_invariants():
         returns=np.full((10, 1, 5), 0.001),
         asset_ids=["WORLD"],
     )
-    universe = UniverseConfig(
-        assets=[{"id": "WORLD", "mu_annual": 0.07, "sigma_annual": 0.15, "ter_annual": 0.0}],
-        correlations=CorrelationConfig(matrix=[[1.0]]),
-        leveraged_assets=None,
+
+    portfolio = simulate_portfolio(
+        market_paths,
+        _universe(),
+        _strategy(),
+        _cost_model(),
+        _sim_config(),
+    )
+
+    assert (portfolio.nav > 0).all()
+    assert portfolio.weights is not None
+    weights_sum = portfolio.weights.sum(axis=1)
+    assert np.allclose(weights_sum, 1.0, atol=1e-6)
+    assert portfolio.turnover is not None
+    assert (portfolio.turnover >= 0).all()
+
+
+@pytest.mark.parametrize("engine", ["daily", "event"])
+def test_streamed_blocks_match_materialized_paths(engine):
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.0003, 0.01, size=(252, 1, 5))
+    sim_config = _sim_config(
+        rebalancing={"frequency": "monthly", "threshold_abs": 0.0},
+        contributions={"enabled": True, "monthly_amount_eur": 100.0, "day_of_month": 5},
+        engine=engine,
+    )
+    blocks = (
+        MarketPaths(returns=returns[start : start + 40], asset_ids=["WORLD"])
+        for start in range(0, 252, 40)
+    )
+
+    full = simulate_portfolio(
+        MarketPaths(returns=returns, asset_ids=["WORLD"]), _universe(), _strategy(), _cost_model(), sim_config
+    )
+    streamed = simulate_portfolio(blocks, _universe(), _strategy(), _cost_model(), sim_config)
+
+    # event segments are cut at block boundaries, which only changes rounding
+    assert np.allclose(full.nav, streamed.nav, rtol=1e-12)
+    assert np.allclose(full.weights, streamed.weights, rtol=1e-12)
+
+
+def test_float32_precision_tracks_float64():
+    rng = np.random.default_rng(1)
+    returns = rng.normal(0.0003, 0.01, size=(252, 1, 5))
+    sim_config = _sim_config(rebalancing={"frequency": "monthly", "threshold_abs": 0.0})
+    single_config = _sim_config(rebalancing={"frequency": "monthly", "threshold_abs": 0.0}, precision="float32")
+
+    double = simulate_portfolio(
+        MarketPaths(returns=returns, asset_ids=["WORLD"]), _universe(), _strategy(), _cost_model(), sim_config
+    )
+    single = simulate_portfolio(
+        MarketPaths(returns=returns.astype(np.float32), asset_ids=["WORLD"]),
+        _universe(),
+        _strategy(),
+        _cost_model(),
+        single_config,
+    )
+
+    assert single.nav.dtype == np.float32
+    assert single.weights.dtype == np.float32
+    assert single.turnover.dtype == np.float32
+    assert np.allclose(single.nav, double.nav, rtol=1e-6)
+
+
+def _leveraged_universe():
+    return UniverseConfig(
+        assets=[
+            {"id": "WORLD", "mu_annual": 0.07, "sigma_annual": 0.15, "ter_annual": 0.002},
+            {"id": "NASDAQ100", "mu_annual": 0.085, "sigma_annual": 0.22, "ter_annual": 0.002},
+        ],
+        correlations=CorrelationConfig(matrix=[[1.0, 0.9], [0.9, 1.0]]),
+        leveraged_assets=[{"id": "NASDAQ100_X2", "underlying_id": "NASDAQ100", "leverage": 2.0, "ter_annual": 0.006}],
     )
-    strategy = StrategyConfig(
-        name="test",
-        target_weights={"WORLD": 1.0},
-        constraints={"max_weight": 1.0, "allow_cash": False},
+
+
+def _vol_target_strategy():
+    return StrategyConfig(
+        name="vol_target",
+        target_weights={"WORLD": 0.7, "NASDAQ100_X2": 0.2},
+        constraints={"max_weight": 1.0, "allow_cash": True},
         overlays={
             "vol_targeting": {
-                "enabled": False,
+                "enabled": True,
                 "target_vol_annual": 0.12,
-                "lookback_days": 63,
-                "max_leverage_multiplier": 1.0,
-                "min_leverage_multiplier": 0.0,
+                "lookback_days": 21,
+                "max_leverage_multiplier": 1.5,
+                "min_leverage_multiplier": 0.3,
             }
         },
     )
+
+
+@pytest.mark.parametrize("frequency,threshold", [("monthly", 0.0), ("quarterly", 0.02), ("none", 0.0)])
+def test_event_engine_matches_daily_loop(frequency, threshold):
+    rng = np.random.default_rng(2)
+    market_paths = MarketPaths(returns=rng.normal(0.0003, 0.012, size=(504, 2, 20)), asset_ids=["WORLD", "NASDAQ100"])
     cost_model = CostModelConfig(
-        broker={"model": "bps_notional", "fixed_fee_eur": 0.0, "bps": 0.0},
-        slippage_bps=0.0,
+        broker={"model": "bps_notional", "fixed_fee_eur": 0.0, "bps": 2.0},
+        slippage_bps=1.0,
         ter_accrual="daily",
-        min_trade_eur=0.0,
+        min_trade_eur=10.0,
     )
-    sim_config = SimulationConfig(
-        run_name="test",
-        time_step="D",
-        n_years=1,
-        trading_days_per_year=252,
-        n_paths=5,
-        seed=1,
-        initial_capital_eur=1000.0,
-        contributions={"enabled": False, "monthly_amount_eur": 0.0, "day_of_month": 1},
-        rebalancing={"frequency": "none", "threshold_abs": 0.0},
-        output={"base_dir": "runs", "save_nav_paths": False, "save_weights_paths": True, "save_turnover_paths": True},
+    results = {}
+    for engine in ("daily", "event"):
+        sim_config = _sim_config(
+            n_years=2,
+            n_paths=20,
+            rebalancing={"frequency": frequency, "threshold_abs": threshold},
+            contributions={"enabled": True, "monthly_amount_eur": 100.0, "day_of_month": 5},
+            engine=engine,
+        )
+        results[engine] = simulate_portfolio(
+            market_paths, _leveraged_universe(), _vol_target_strategy(), cost_model, sim_config
+        )
+
+    assert np.allclose(results["event"].nav, results["daily"].nav, rtol=1e-10)
+    assert np.allclose(results["event"].weights, results["daily"].weights, rtol=1e-10, atol=1e-12)
+    assert np.allclose(results["event"].turnover, results["daily"].turnover, rtol=1e-10, atol=1e-12)
+
+
+def test_batched_strategies_match_individual_runs():
+    rng = np.random.default_rng(3)
+    market_paths = MarketPaths(returns=rng.normal(0.0003, 0.012, size=(252, 2, 10)), asset_ids=["WORLD", "NASDAQ100"])
+    strategies = [
+        _strategy().model_copy(
+            update={"name": "core_satellite", "target_weights": {"WORLD": 0.8, "NASDAQ100_X2": 0.2}}
+        ),
+        _vol_target_strategy(),
+        _strategy().model_copy(update={"name": "mono", "target_weights": {"NASDAQ100": 1.0}}),
+    ]
+    cost_model = CostModelConfig(
+        broker={"model": "fixed_per_order", "fixed_fee_eur": 1.0, "bps": 0.0},
+        slippage_bps=2.0,
+        ter_accrual="daily",
+        min_trade_eur=10.0,
+    )
+    sim_config = _sim_config(
+        n_paths=10,
+        rebalancing={"frequency": "monthly", "threshold_abs": 0.05},
+        contributions={"enabled": True, "monthly_amount_eur": 100.0, "day_of_month": 5},
     )
 
-    portfolio = simulate_portfolio(
-        market_paths,
-        universe,
-        strategy,
-        cost_model,
-        sim_config,
+    batched = simulate_strategies(market_paths, _leveraged_universe(), strategies, cost_model, sim_config)
+
+    for strategy, paths in zip(strategies, batched):
+        single = simulate_portfolio(market_paths, _leveraged_universe(), strategy, cost_model, sim_config)
+        assert paths.asset_ids == single.asset_ids
+        assert np.allclose(paths.nav, single.nav, rtol=1e-12)
+        assert np.allclose(paths.weights, single.weights, rtol=1e-12, atol=1e-15)
+        assert np.allclose(paths.turnover, single.turnover, rtol=1e-12, atol=1e-15)
+
+
+def test_ewma_vol_targeting_scales_risky_weights():
+    rng = np.random.default_rng(4)
+    market_paths = MarketPaths(returns=rng.normal(0.0003, 0.02, size=(252, 2, 8)), asset_ids=["WORLD", "NASDAQ100"])
+    strategy = _vol_target_strategy()
+    strategy.overlays.vol_targeting.estimator = "ewma"
+    sim_config = _sim_config(n_paths=8, rebalancing={"frequency": "monthly", "threshold_abs": 0.0})
+
+    portfolio = simulate_portfolio(market_paths, _leveraged_universe(), strategy, _cost_model(), sim_config)
+
+    # ~26% realized vol against a 12% target: the first rebalance after the
+    # 21-day warm-up roughly halves the risky sleeve
+    cash = portfolio.asset_ids.index("CASH")
+    assert np.allclose(portfolio.weights[1:22, cash], portfolio.weights[1, cash], atol=0.05)
+    assert np.all(portfolio.weights[22, cash] > 0.4)
+    assert np.all(portfolio.weights[22:, cash] > 0.1)
+    assert np.allclose(portfolio.weights.sum(axis=1), 1.0)
+
+
+def test_threshold_rebalancing_is_decided_per_path():
+    returns = np.zeros((63, 2, 3))
+    returns[:10, 1, 0] = 0.03  # only path 0 drifts away from 50/50
+    returns[:10, 1, 2] = 0.002  # path 2 drifts, but stays inside the band
+    market_paths = MarketPaths(returns=returns, asset_ids=["WORLD", "NASDAQ100"])
+    universe = _leveraged_universe().model_copy(update={"leveraged_assets": None})
+    strategy = _strategy().model_copy(update={"target_weights": {"WORLD": 0.5, "NASDAQ100": 0.5}})
+    sim_config = _sim_config(n_paths=3, rebalancing={"frequency": "monthly", "threshold_abs": 0.05})
+
+    portfolio = simulate_portfolio(market_paths, universe, strategy, _cost_model(), sim_config)
+
+    assert portfolio.turnover[21, 0] > 0
+    assert np.all(portfolio.turnover[:, 1:] == 0)
+    assert np.allclose(portfolio.weights[22, :, 0], 0.5)
+    assert portfolio.weights[22, 1, 2] > 0.5
+
+
+@pytest.mark.parametrize("time_step, steps_per_year", [("W", 52), ("M", 12)])
+def test_coarse_time_step_calendar(time_step, steps_per_year):
+    contributions = {"enabled": True, "monthly_amount_eur": 100.0, "day_of_month": 28}
+    for frequency, per_year in (("monthly", 12), ("quarterly", 4), ("annual", 1)):
+        sim_config = _sim_config(
+            time_step=time_step,
+            n_years=3,
+            contributions=contributions,
+            rebalancing={"frequency": frequency, "threshold_abs": 0.0},
+        )
+        assert sim_config.t_steps == 3 * steps_per_year
+        assert rebalance_days(sim_config, sim_config.t_steps).sum() == 3 * per_year
+        # one contribution per month, never two in the same step
+        assert contribution_days(sim_config, sim_config.t_steps).sum() == 36
+
+    sim_config = _sim_config(time_step=time_step, n_years=3, contributions=contributions)
+    market_paths = MarketPaths(returns=np.zeros((sim_config.t_steps, 1, 5)), asset_ids=["WORLD"])
+    portfolio = simulate_portfolio(market_paths, _universe(), _strategy(), _cost_model(), sim_config)
+    assert np.allclose(portfolio.nav[-1], 1000.0 + 36 * 100.0)
+
+
+def test_vol_targeted_weights_are_capped_at_the_nav():
+    universe = AssetUniverse(
+        asset_ids=["WORLD", "NASDAQ100", "NASDAQ100_X2", "CASH"],
+        base_asset_ids=["WORLD", "NASDAQ100"],
+        leveraged_asset_ids=["NASDAQ100_X2"],
+        cash_included=True,
     )
+    base_weights = np.array([0.7, 0.0, 0.2, 0.1])
+    # multipliers 0.5, 1.0 and 1.5 (6.0 clipped to max_leverage_multiplier)
+    realized_vol = np.array([0.24, 0.12, 0.02])
 
-    assert (portfolio.nav > 0).all()
-    assert portfolio.weights is not None
-    weights_sum = portfolio.weights.sum(axis=1)
-    assert np.allclose(weights_sum, 1.0, atol=1e-6)
-    assert portfolio.turnover is not None
-    assert (portfolio.turnover >= 0).all()
+    weights = _apply_vol_targeting(base_weights, universe, _vol_target_strategy(), realized_vol)
+
+    # de-risking is unchanged: the risky sleeve shrinks and cash takes the rest
+    np.testing.assert_allclose(weights[:, 0], [0.35, 0.0, 0.1, 0.55])
+    np.testing.assert_allclose(weights[:, 1], base_weights)
+    # a 1.5 multiplier used to give risky weights of [1.05, 0, 0.3] (135% of
+    # the NAV, the missing 35% appearing out of nowhere); they are now scaled
+    # back to the NAV, keeping their proportions
+    np.testing.assert_allclose(weights[:, 2], [0.7 / 0.9, 0.0, 0.2 / 0.9, 0.0])
+    np.testing.assert_allclose(weights.sum(axis=0), 1.0)
+
+
+def test_vol_targeting_never_invests_more_than_the_nav():
+    # ~1.6% realized vol against a 12% target asks for the maximum multiplier;
+    # the risky sleeve (90% of NAV) is capped at the NAV instead of 135%
+    rng = np.random.default_rng(5)
+    returns = rng.normal(0.0, 0.001, size=(252, 2, 8))
+    market_paths = MarketPaths(returns=returns, asset_ids=["WORLD", "NASDAQ100"])
+    universe = _leveraged_universe().model_copy(
+        update={"assets": [asset.model_copy(update={"ter_annual": 0.0}) for asset in _leveraged_universe().assets]}
+    )
+    sim_config = _sim_config(n_paths=8, rebalancing={"frequency": "monthly", "threshold_abs": 0.0})
+
+    portfolio = simulate_portfolio(market_paths, universe, _vol_target_strategy(), _cost_model(), sim_config)
+
+    cash = portfolio.asset_ids.index("CASH")
+    assert np.allclose(portfolio.weights[23:, cash], 0.0, atol=0.01)
+    # without new money, the NAV can only move with the market
+    ratio = portfolio.nav[1:] / portfolio.nav[:-1]
+    assert np.all(np.abs(ratio - 1.0) < 0.02)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from conftest import make_cost_model, make_sim_config, make_strategy
+
+from invest_sim.config.schemas import CorrelationConfig, MarketModelConfig, RacingConfig, UniverseConfig
+from invest_sim.experiments.racing import race_budgets, race_strategies
+from invest_sim.market.base import concat_market_paths
+from invest_sim.market.gbm import GBMModel
+from invest_sim.metrics import bootstrap_indices, bootstrap_quantiles, compute_metrics
+from invest_sim.portfolio import simulate_strategies
+
+
+def _universe():
+    return UniverseConfig(
+        assets=[
+            {"id": "GOOD", "mu_annual": 0.08, "sigma_annual": 0.10, "ter_annual": 0.0},
+            {"id": "BAD", "mu_annual": -0.05, "sigma_annual": 0.35, "ter_annual": 0.0},
+        ],
+        correlations=CorrelationConfig(matrix=[[1.0, 0.2], [0.2, 1.0]]),
+        leveraged_assets=None,
+    )
+
+
+def _strategy(name, good_weight):
+    return make_strategy({"GOOD": good_weight, "BAD": 1.0 - good_weight}, name=name)
+
+
+def _sim_config(**overrides):
+    data = dict(
+        n_years=2,
+        n_paths=400,
+        seed=11,
+        rebalancing={"frequency": "quarterly", "threshold_abs": 0.0},
+        racing={"enabled": True, "initial_paths": 50, "growth": 2},
+    )
+    data.update(overrides)
+    return make_sim_config(**data)
+
+
+def _market_paths(sim_config):
+    universe = _universe()
+    model = GBMModel()
+    fitted = model.fit(universe, MarketModelConfig(model_type="gbm", enabled_assets=["GOOD", "BAD"]), sim_config)
+    return concat_market_paths(model.iter_paths(fitted, sim_config), sim_config.t_steps)
+
+
+def test_race_budgets_grow_to_all_paths():
+    racing = RacingConfig(initial_paths=75, growth=3)
+    assert race_budgets(1000, racing) == [75, 225, 675, 1000]
+    assert race_budgets(1000, racing, antithetic=True) == [74, 224, 674, 1000]
+    assert race_budgets(50, racing) == [50]
+
+
+def test_paired_bootstrap_keeps_common_paths():
+    sim_config = _sim_config(variance_reduction={"antithetic": True})
+    rng = np.random.default_rng(0)
+    indices = bootstrap_indices(400, 50, rng, sim_config)
+    assert indices.shape == (50, 400)
+    assert (indices[:, 1::2] == indices[:, ::2] + 1).all()
+
+    # a constant offset between two columns survives every resample
+    values = rng.standard_normal(400)
+    medians = bootstrap_quantiles(np.column_stack([values, values + 0.01]), 0.5, indices)
+    np.testing.assert_allclose(medians[:, 1] - medians[:, 0], 0.01)
+
+
+def test_race_drops_dominated_strategies_and_keeps_full_results():
+    sim_config = _sim_config()
+    market_paths = _market_paths(sim_config)
+    strategies = [_strategy("good", 1.0), _strategy("mixed", 0.8), _strategy("bad", 0.0)]
+
+    race = race_strategies(market_paths, _universe(), strategies, make_cost_model(), sim_config)
+
+    rounds = race.rounds.set_index("strategy")
+    assert rounds.loc["bad", "eliminated_round"] == 1
+    assert rounds.loc["bad", "n_paths"] == 50
+    assert rounds.loc["bad", "dominated_by"] in ("good", "mixed")
+    assert "bad" not in race.metrics
+    assert pd.isna(rounds.loc["good", "eliminated_round"])
+    assert rounds.loc["good", "n_paths"] == sim_config.n_paths
+
+    # survivors ran on all the paths: same metrics as a plain comparison
+    plain = simulate_strategies(market_paths, _universe(), strategies[:1], make_cost_model(), sim_config)
+    per_path, summary = compute_metrics(plain[0], sim_config)
+    pd.testing.assert_frame_equal(race.metrics["good"][0], per_path)
+    pd.testing.assert_frame_equal(race.metrics["good"][1], summary)
+
+
+def test_race_with_workers_matches_single_process():
+    sim_config = _sim_config(n_paths=200)
+    market_paths = _market_paths(sim_config)
+    strategies = [_strategy("good", 1.0), _strategy("mixed", 0.9), _strategy("bad", 0.0)]
+
+    single = race_strategies(market_paths, _universe(), strategies, make_cost_model(), sim_config)
+    shared = race_strategies(market_paths, _universe(), strategies, make_cost_model(), sim_config, workers=2)
+
+    pd.testing.assert_frame_equal(single.rounds, shared.rounds)
+    for name, (per_path, _) in single.metrics.items():
+        pd.testing.assert_frame_equal(shared.metrics[name][0], per_path)
+
+
+def test_finished_strategies_eliminate_without_being_raced():
+    sim_config = _sim_config()
+    market_paths = _market_paths(sim_config)
+    universe = _universe()
+    good = simulate_strategies(market_paths, universe, [_strategy("good", 1.0)], make_cost_model(), sim_config)
+    finished = {"good": compute_metrics(good[0], sim_config)}
+
+    race = race_strategies(
+        market_paths, universe, [_strategy("bad", 0.0)], make_cost_model(), sim_config, finished=finished
+    )
+
+    assert race.rounds.loc[0, "dominated_by"] == "good"
+    assert race.metrics == {}
+
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_cost_model, make_sim_config, make_strategy, world_sp500_universe
+
+from invest_sim.config.schemas import MarketModelConfig, RegimesConfig, StudentTConfig, SweepCaseConfig, SweepConfig
+from invest_sim.experiments.sweep import SWEEP_STATISTICS, apply_case, sweep_deltas, sweep_strategy, unpaired_cases
+from invest_sim.market.base import concat_market_paths
+from invest_sim.market.gbm import GBMModel
+from invest_sim.market.regimes import RegimeSwitchingModel
+from invest_sim.market.student_t import StudentTModel
+
+
+def _sim_config(**overrides):
+    data = dict(n_paths=300, seed=5, block_steps=100)
+    data.update(overrides)
+    return make_sim_config(**data)
+
+
+def _regimes_config():
+    return RegimesConfig(
+        model_type="regimes",
+        enabled_assets=["WORLD", "SP500"],
+        regimes=[
+            {"name": "calm", "mu_multiplier": 1.0, "sigma_multiplier": 1.0, "corr_multiplier": 1.0},
+            {"name": "crisis", "mu_multiplier": 0.0, "sigma_multiplier": 2.0, "corr_multiplier": 1.05},
+        ],
+        transition_matrix=[[0.95, 0.05], [0.2, 0.8]],
+        initial_probs=[0.9, 0.1],
+    )
+
+
+CASES = [
+    (
+        GBMModel(),
+        MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"]),
+        {"name": "case", "assets": {"WORLD": {"sigma_annual": 0.2}}, "correlations": {"matrix": [[1.0, 0.5], [0.5, 1.0]]}},
+    ),
+    (
+        StudentTModel(),
+        StudentTConfig(model_type="student_t", enabled_assets=["WORLD", "SP500"], df=5.0),
+        {"name": "case", "assets": {"SP500": {"mu_annual": 0.02}}, "market": {"df": 3.5}},
+    ),
+    (
+        RegimeSwitchingModel(),
+        _regimes_config(),
+        {
+            "name": "case",
+            "regimes": {"crisis": {"sigma_multiplier": 3.0}},
+            "market": {"transition_matrix": [[0.9, 0.1], [0.3, 0.7]]},
+        },
+    ),
+]
+
+
+@pytest.mark.parametrize("model, market_config, case", CASES)
+@pytest.mark.parametrize("antithetic", [False, True])
+def test_transformed_innovations_match_a_fresh_run(model, market_config, case, antithetic):
+    sim_config = _sim_config(variance_reduction={"antithetic": antithetic})
+    universe = world_sp500_universe()
+    case_universe, case_market = apply_case(universe, market_config, SweepCaseConfig(**case))
+    base_fitted = model.fit(universe, market_config, sim_config)
+    case_fitted = model.fit(case_universe, case_market, sim_config)
+
+    innovations = list(model.iter_innovations(base_fitted, sim_config))
+    swept = concat_market_paths(model.paths_from_innovations(case_fitted, innovations, sim_config), sim_config.t_steps)
+    fresh = concat_market_paths(model.iter_paths(case_fitted, sim_config), sim_config.t_steps)
+    np.testing.assert_allclose(swept.returns, fresh.returns, rtol=1e-12, atol=1e-15)
+    if fresh.regime is not None:
+        np.testing.assert_array_equal(swept.regime, fresh.regime)
+
+
+def test_innovations_of_another_universe_size_are_rejected():
+    sim_config = _sim_config()
+    model = GBMModel()
+    market_config = MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"])
+    innovations = model.iter_innovations(model.fit(world_sp500_universe(), market_config, sim_config), sim_config)
+    single = model.fit(world_sp500_universe(), MarketModelConfig(model_type="gbm", enabled_assets=["WORLD"]), sim_config)
+    with pytest.raises(ValueError, match="normals per step"):
+        next(model.paths_from_innovations(single, innovations, sim_config))
+
+
+def test_sweep_cases_are_validated():
+    market_config = MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"])
+    with pytest.raises(ValueError, match="assets not in the universe"):
+        apply_case(world_sp500_universe(), market_config, SweepCaseConfig(name="x", assets={"NASDAQ": {"mu_annual": 0.1}}))
+    with pytest.raises(ValueError, match="fields not in the gbm model"):
+        apply_case(world_sp500_universe(), market_config, SweepCaseConfig(name="x", market={"df": 4.0}))
+    with pytest.raises(ValueError):
+        SweepCaseConfig(name="x", assets={"WORLD": {"sigma": 0.2}})
+    with pytest.raises(ValueError):
+        SweepCaseConfig(name="x", market={"model_type": "student_t"})
+    with pytest.raises(ValueError):
+        SweepConfig(cases=[{"name": "base"}])
+
+
+def test_common_random_numbers_shrink_the_delta_standard_error():
+    sim_config = _sim_config(n_years=2)
+    universe = world_sp500_universe()
+    strategy = make_strategy({"WORLD": 0.6, "SP500": 0.4}, name="world")
+    cost_model = make_cost_model()
+    sweep_config = SweepConfig(cases=[{"name": "calmer", "assets": {"WORLD": {"sigma_annual": 0.13}}}])
+    per_path = sweep_strategy(
+        GBMModel(),
+        universe,
+        MarketModelConfig(model_type="gbm", enabled_assets=["WORLD", "SP500"]),
+        strategy,
+        cost_model,
+        sim_config,
+        sweep_config,
+    )
+    assert list(per_path) == ["base", "calmer"]
+    table = sweep_deltas(per_path, sim_config).set_index(["case", "metric"])
+    base = table.loc["base"]
+    assert (base["delta"] == 0.0).all()
+    assert (base["delta_se"] == 0.0).all()
+    assert table["paired"].all()
+
+    calmer = table.loc["calmer"]
+    assert calmer.loc["max_drawdown", "delta"] < 0.0
+    assert (calmer["delta_se"] < 0.5 * calmer["delta_se_independent"]).all()
+
+
+def test_cases_changing_the_student_t_df_are_not_paired():
+    universe = world_sp500_universe()
+    market_config = StudentTConfig(model_type="student_t", enabled_assets=["WORLD", "SP500"], df=5.0)
+    sweep_config = SweepConfig(
+        cases=[
+            {"name": "calmer", "assets": {"WORLD": {"sigma_annual": 0.13}}},
+            {"name": "same_df", "market": {"df": 5.0}},
+            {"name": "fat_tails", "market": {"df": 3.5}},
+        ]
+    )
+    unpaired = unpaired_cases(StudentTModel(), universe, market_config, sweep_config)
+    assert unpaired == ["fat_tails"]
+
+    per_path = {
+        name: pd.DataFrame({metric: np.linspace(0.0, 1.0, 10) for metric, _ in SWEEP_STATISTICS})
+        for name in ["base", "calmer", "fat_tails"]
+    }
+    table = sweep_deltas(per_path, _sim_config(), unpaired).drop_duplicates("case").set_index("case")
+    assert table["paired"].to_dict() == {"base": True, "calmer": True, "fat_tails": False}
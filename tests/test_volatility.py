@@ -0,0 +1,39 @@
+import numpy as np
+
+from invest_sim.portfolio.volatility import EwmaVolatility, RollingVolatility
+
+
+def _segments(returns, sizes):
+    start = 0
+    for size in sizes:
+        yield returns[start : start + size]
+        start += size
+
+
+def test_rolling_volatility_matches_window_std():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.0003, 0.01, size=(400, 6))
+    sizes = [1, 5, 21, 63, 70, 1, 1, 30, 100, 108]
+    estimator = RollingVolatility(window=63, n_paths=6)
+
+    seen = 0
+    for segment in _segments(returns, sizes):
+        estimator.update(segment)
+        seen += segment.shape[0]
+        window = returns[max(0, seen - 63) : seen]
+        expected = np.std(window, axis=0, ddof=1) if window.shape[0] > 1 else np.zeros(6)
+        assert np.allclose(estimator.std(), expected, rtol=1e-10)
+
+
+def test_ewma_volatility_matches_daily_recursion():
+    rng = np.random.default_rng(1)
+    returns = rng.normal(0.0, 0.01, size=(200, 4))
+    estimator = EwmaVolatility(decay=0.94, n_paths=4)
+    for segment in _segments(returns, [1, 20, 63, 16, 100]):
+        estimator.update(segment)
+
+    variance = np.zeros(4)
+    for day in returns:
+        variance = 0.94 * variance + 0.06 * day**2
+    expected = np.sqrt(variance / (1.0 - 0.94**200))
+    assert np.allclose(estimator.std(), expected, rtol=1e-12)